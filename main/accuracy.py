@@ -0,0 +1,89 @@
+# backend/main/accuracy.py
+"""
+Model accuracy from user feedback. Feedback sent with the history_id from an analyze
+response is joined to that QueryHistory row, so the model's own verdict and confidence
+are used instead of the label the client copied. Unlinked feedback falls back to its
+own fake_news_label. The per-label figures and the confusion matrix are each one
+GROUP BY query.
+
+user_feedback is either the label the user thinks is right (e.g. "fake news") or a
+yes/no answer. It agrees with the model when it names the predicted label or is one
+of AGREE_FEEDBACK.
+"""
+from django.db.models import Avg, Count, F, Max, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Lower, NullIf
+
+from .models import Feedback, QueryHistory
+
+AGREE_FEEDBACK = ("agree", "correct", "accurate", "yes", "true", "right", "up")
+
+def _feedback(since=None, until=None, linked_only=False):
+    rows = Feedback.objects.all()
+    if since:
+        rows = rows.filter(created_at__gte=since)
+    if until:
+        rows = rows.filter(created_at__lte=until)
+    if linked_only:
+        rows = rows.filter(history__isnull=False)
+    # Labels are grouped as stored; the lowercased copies are only for the agreement test
+    return rows.annotate(
+        predicted=Coalesce(NullIf("history__fake_news_label", Value("")), "fake_news_label"),
+    ).annotate(
+        predicted_key=Lower("predicted"),
+        answer_key=Lower("user_feedback"),
+    )
+
+def accuracy_report(since=None, until=None, linked_only=False):
+    """Per-label agreement and a predicted x feedback confusion matrix."""
+    rows = _feedback(since, until, linked_only)
+    agrees = Q(answer_key=F("predicted_key")) | Q(answer_key__in=AGREE_FEEDBACK)
+    by_label = {}
+    for row in rows.values("predicted").annotate(
+        total=Count("id"),
+        agreed=Count("id", filter=agrees),
+        linked=Count("id", filter=Q(history__isnull=False)),
+        mean_confidence=Avg("history__fake_news_confidence"),
+    ).order_by("predicted"):
+        by_label[row["predicted"]] = {
+            "total": row["total"],
+            "agreed": row["agreed"],
+            "agreement": round(row["agreed"] / row["total"], 4),
+            "linked": row["linked"],
+            "mean_confidence": round(row["mean_confidence"], 4) if row["mean_confidence"] is not None else None,
+        }
+    confusion = {}
+    for row in rows.values("predicted", "user_feedback").annotate(n=Count("id")).order_by("predicted", "user_feedback"):
+        confusion.setdefault(row["predicted"], {})[row["user_feedback"]] = row["n"]
+    total = sum(label["total"] for label in by_label.values())
+    agreed = sum(label["agreed"] for label in by_label.values())
+    return {
+        "total": total,
+        "linked": sum(label["linked"] for label in by_label.values()),
+        "agreement": round(agreed / total, 4) if total else None,
+        "by_label": by_label,
+        "confusion_matrix": confusion,
+    }
+
+def link_feedback(batch_size=1000):
+    """
+    Link feedback sent without a history_id to the latest history row with the same
+    title and label created before it. Returns how many feedback rows were linked.
+    """
+    match = (
+        QueryHistory.objects.filter(
+            source="user",
+            article_title=OuterRef("title"),
+            fake_news_label=OuterRef("fake_news_label"),
+            created_at__lte=OuterRef("created_at"),
+        ).order_by("-created_at").values("public_id")[:1]
+    )
+    unlinked = Feedback.objects.filter(history__isnull=True).exclude(title="")
+    linked, last_id = 0, 0
+    end = unlinked.aggregate(last=Max("id"))["last"] or 0
+    while last_id < end:
+        batch = unlinked.filter(id__gt=last_id, id__lte=last_id + batch_size)
+        before = batch.count()
+        batch.update(history_id=Subquery(match))
+        linked += before - batch.count()
+        last_id += batch_size
+    return linked
@@ -0,0 +1,193 @@
+# backend/main/admission.py
+"""
+Admission control for the analyze endpoints. Each process runs at most
+ANALYZE_MAX_CONCURRENT analyses at once. Up to ANALYZE_MAX_QUEUED more wait, first in
+first out, for at most ANALYZE_QUEUE_TIMEOUT seconds. Anything beyond that is turned
+away at once with 503 and Retry-After instead of piling up behind the workers. A
+batch counts as one analysis per item (up to the whole limit), so large batches can't
+slip past the cap.
+
+Because analyses can never hold more than max concurrent + max queued threads, a
+threaded server with more threads than that (see render.yaml) always has some left
+for health checks, feedback and the admin views.
+"""
+import asyncio
+import threading
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+
+from .metrics import ANALYZE_IN_FLIGHT, ANALYZE_QUEUED, ANALYZE_REJECTED
+
+class Overloaded(Exception):
+    """No analysis slot is free and the wait queue is full (or the wait timed out)."""
+
+    def __init__(self, reason):
+        super().__init__(f"Server busy ({reason}); try again shortly.")
+        self.reason = reason
+
+class _ThreadWaiter:
+    def __init__(self, weight):
+        self.weight = weight
+        self.event = threading.Event()
+        self.granted = False
+
+    def grant(self):
+        self.granted = True
+        self.event.set()
+
+class _AsyncWaiter:
+    def __init__(self, weight):
+        self.weight = weight
+        self.loop = asyncio.get_running_loop()
+        self.future = self.loop.create_future()
+        self.granted = False
+
+    def grant(self):
+        self.granted = True
+        self.loop.call_soon_threadsafe(self._wake)
+
+    def _wake(self):
+        if not self.future.done():
+            self.future.set_result(None)
+
+class Ticket:
+    """One admitted analysis holding weight slots. release() is idempotent so every exit path can call it."""
+
+    def __init__(self, controller, weight=1):
+        self.controller = controller
+        self.weight = weight
+        self.released = False
+
+    def release(self):
+        if not self.released:
+            self.released = True
+            self.controller._release(self.weight)
+
+class AdmissionController:
+    """
+    Counts busy slots and queues waiters. An analysis takes one slot; a batch takes one
+    per item, up to max_active. Freed slots go straight to the oldest waiters, in
+    arrival order, as soon as they fit. Thread and asyncio waiters share one queue.
+    """
+
+    def __init__(self, max_active, max_queued, queue_timeout):
+        self.max_active = max_active
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.waiters = deque()
+        self.lock = threading.Lock()
+
+    def _publish(self):
+        ANALYZE_IN_FLIGHT.set(self.active)
+        ANALYZE_QUEUED.set(len(self.waiters))
+
+    def _enter(self, waiter):
+        """Take a slot (True) or join the queue (False); raises Overloaded when the queue is full. Holds lock."""
+        if self.active + waiter.weight <= self.max_active and not self.waiters:
+            self.active += waiter.weight
+            self._publish()
+            return True
+        if len(self.waiters) >= self.max_queued:
+            ANALYZE_REJECTED.inc(reason="queue_full")
+            raise Overloaded("queue full")
+        self.waiters.append(waiter)
+        self._publish()
+        return False
+
+    def _give_up(self, waiter):
+        """Leave the queue after a timeout or cancellation. Returns True if a slot arrived first."""
+        with self.lock:
+            if waiter.granted:
+                return True
+            self.waiters.remove(waiter)
+            # A large waiter leaving the head may let smaller ones behind it in
+            self._grant_waiters()
+            self._publish()
+            return False
+
+    def _grant_waiters(self):
+        """Hand free slots to waiters from the head of the queue while they fit. Holds lock."""
+        while self.waiters and self.active + self.waiters[0].weight <= self.max_active:
+            waiter = self.waiters.popleft()
+            self.active += waiter.weight
+            waiter.grant()
+
+    def _release(self, weight):
+        with self.lock:
+            self.active -= weight
+            self._grant_waiters()
+            self._publish()
+
+    def _weight(self, weight):
+        # Capped so that a large batch can still run, alone, once everything else is done
+        return max(1, min(weight, self.max_active))
+
+    def acquire(self, weight=1):
+        waiter = _ThreadWaiter(self._weight(weight))
+        with self.lock:
+            if self._enter(waiter):
+                return Ticket(self, waiter.weight)
+        if waiter.event.wait(self.queue_timeout) or self._give_up(waiter):
+            return Ticket(self, waiter.weight)
+        ANALYZE_REJECTED.inc(reason="timeout")
+        raise Overloaded("queue wait timed out")
+
+    async def aacquire(self, weight=1):
+        waiter = _AsyncWaiter(self._weight(weight))
+        with self.lock:
+            if self._enter(waiter):
+                return Ticket(self, waiter.weight)
+        try:
+            await asyncio.wait_for(waiter.future, self.queue_timeout)
+            return Ticket(self, waiter.weight)
+        except asyncio.TimeoutError:
+            if self._give_up(waiter):
+                return Ticket(self, waiter.weight)
+            ANALYZE_REJECTED.inc(reason="timeout")
+            raise Overloaded("queue wait timed out")
+        except asyncio.CancelledError:
+            # The client went away; pass on a slot we may already have been given
+            if self._give_up(waiter):
+                Ticket(self, waiter.weight).release()
+            raise
+
+    @contextmanager
+    def admit(self):
+        ticket = self.acquire()
+        try:
+            yield ticket
+        finally:
+            ticket.release()
+
+    @asynccontextmanager
+    async def aadmit(self):
+        ticket = await self.aacquire()
+        try:
+            yield ticket
+        finally:
+            ticket.release()
+
+analyze_admission = AdmissionController(
+    settings.ANALYZE_MAX_CONCURRENT, settings.ANALYZE_MAX_QUEUED, settings.ANALYZE_QUEUE_TIMEOUT,
+)
+
+class AdmittedStreamingHttpResponse(StreamingHttpResponse):
+    """
+    Holds an admission ticket until the server closes the response. Releasing in the
+    generator's finally block alone would leak the slot when the client disconnects
+    before the first chunk, because an unstarted generator never runs its finally.
+    """
+
+    def __init__(self, *args, ticket, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.ticket = ticket
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            self.ticket.release()
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class MainConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "main"
+
+    def ready(self):
+        # Connects the post_save handlers that keep the rollup tables current
+        from . import rollups  # noqa: F401
+        from .warmup import start_prewarm
+        start_prewarm()
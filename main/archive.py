@@ -0,0 +1,139 @@
+# backend/main/archive.py
+"""
+Hot/cold retention for QueryHistory. Rows older than HISTORY_RETENTION_DAYS (counted
+in whole UTC days) are appended to one gzipped JSONL file per day under ARCHIVE_DIR,
+then deleted from the table, ARCHIVE_BATCH_SIZE rows at a time. Each batch is fsynced
+before its rows are deleted. If a run dies in between, the next run sees those IDs
+already in the file, does not write them again, and finishes the delete.
+
+Rollups are only ever incremented, so deleting archived rows leaves the dashboard
+numbers alone, and rebuild_rollups() keeps the cells of archived days. Restoring a
+partition with `python manage.py restore_history DAY` re-inserts its rows with their
+original IDs and created_at, skipping the rollups since they are already counted
+there. If the rows are still older than the retention age, the next run archives
+them again.
+"""
+import gzip
+import json
+import logging
+import os
+from collections import defaultdict
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ArchivePartition, ArticleFingerprint, QueryHistory
+
+logger = logging.getLogger(__name__)
+
+FIELDS = QueryHistory._meta.concrete_fields
+
+def retention_cutoff(days, now=None):
+    """Start of the UTC day `days` days ago; everything created before it is archived."""
+    today = (now or timezone.now()).astimezone(dt_timezone.utc).date()
+    return datetime.combine(today - timedelta(days=days), time.min, tzinfo=dt_timezone.utc)
+
+def partition_path(day):
+    return os.path.join(settings.ARCHIVE_DIR, "history", f"{day:%Y}", f"{day:%m}", f"{day:%Y-%m-%d}.jsonl.gz")
+
+def read_partition(day):
+    """Archived rows of day as dicts of raw JSON values, in the order they were written."""
+    with gzip.open(partition_path(day), "rt", encoding="utf-8") as archive:
+        for line in archive:
+            if line.strip():
+                yield json.loads(line)
+
+def _append(day, rows, known):
+    """Append rows not yet in day's file (known caches its IDs per run); returns how many were written."""
+    path = partition_path(day)
+    if day not in known:
+        known[day] = {row["id"] for row in read_partition(day)} if os.path.exists(path) else set()
+    rows = [row for row in rows if row["id"] not in known[day]]
+    if not rows:
+        return 0
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Each append adds a gzip member; gzip readers treat the members as one stream
+    with open(path, "ab") as raw:
+        with gzip.GzipFile(fileobj=raw, mode="ab") as archive:
+            for row in rows:
+                archive.write(json.dumps(row, cls=DjangoJSONEncoder, separators=(",", ":")).encode("utf-8") + b"\n")
+        raw.flush()
+        os.fsync(raw.fileno())
+    known[day].update(row["id"] for row in rows)
+    partition, _ = ArchivePartition.objects.get_or_create(day=day)
+    partition.rows += len(rows)
+    partition.size_bytes = os.path.getsize(path)
+    partition.save()
+    return len(rows)
+
+def archive_history(days=None, batch_size=None, dry_run=False):
+    """Move history rows past the retention age into the archive. Returns a summary dict."""
+    days = settings.HISTORY_RETENTION_DAYS if days is None else days
+    batch_size = batch_size or settings.ARCHIVE_BATCH_SIZE
+    cutoff = retention_cutoff(days)
+    expired = QueryHistory.objects.filter(created_at__lt=cutoff)
+    stats = {"cutoff": cutoff.isoformat(), "archived": 0, "deleted": 0, "days": 0}
+    if dry_run:
+        stats["archived"] = expired.count()
+        stats["days"] = expired.dates("created_at", "day").count()
+        return stats
+    known = {}
+    while True:
+        rows = list(expired.order_by("id").values(*[field.attname for field in FIELDS])[:batch_size])
+        if not rows:
+            break
+        by_day = defaultdict(list)
+        for row in rows:
+            by_day[row["created_at"].astimezone(dt_timezone.utc).date()].append(row)
+        for day, day_rows in by_day.items():
+            stats["archived"] += _append(day, day_rows, known)
+        with transaction.atomic():
+            deleted, _ = QueryHistory.objects.filter(id__in=[row["id"] for row in rows]).delete()
+            ArchivePartition.objects.filter(day__in=list(by_day), restored_at__isnull=False).update(restored_at=None)
+        stats["deleted"] += deleted
+    stats["days"] = len(known)
+    logger.info("History archive: %s", stats)
+    return stats
+
+def restore_partition(day, batch_size=None):
+    """Re-insert day's archived rows that are not in the table; returns how many were restored."""
+    batch_size = batch_size or settings.ARCHIVE_BATCH_SIZE
+    rows = {row["id"]: row for row in read_partition(day)}
+    restored = 0
+    ids = sorted(rows)
+    for start in range(0, len(ids), batch_size):
+        chunk = ids[start:start + batch_size]
+        present = set(QueryHistory.objects.filter(id__in=chunk).values_list("id", flat=True))
+        objects = [
+            QueryHistory(**{field.attname: field.to_python(rows[row_id][field.attname])
+                            for field in FIELDS if field.attname in rows[row_id]})
+            for row_id in chunk if row_id not in present
+        ]
+        if not objects:
+            continue
+        created_at = [obj.created_at for obj in objects]
+        with transaction.atomic():
+            # bulk_create stamps auto_now_add fields, so put the original times back after.
+            # It also skips post_save, so the rollups, which never forgot these rows, stay as they are.
+            QueryHistory.objects.bulk_create(objects)
+            for obj, moment in zip(objects, created_at):
+                obj.created_at = moment
+            QueryHistory.objects.bulk_update(objects, ["created_at"])
+        restored += len(objects)
+    ArchivePartition.objects.filter(day=day).update(restored_at=timezone.now())
+    return restored
+
+def prune_fingerprints(batch_size=None):
+    """Delete near-duplicate fingerprints too old to be matched again; returns how many were removed."""
+    batch_size = batch_size or settings.ARCHIVE_BATCH_SIZE
+    since = timezone.now() - timedelta(seconds=settings.NEAR_DUPLICATE_MAX_AGE)
+    pruned = 0
+    while True:
+        ids = list(ArticleFingerprint.objects.filter(created_at__lt=since).values_list("id", flat=True)[:batch_size])
+        if not ids:
+            return pruned
+        ArticleFingerprint.objects.filter(id__in=ids).delete()
+        pruned += len(ids)
@@ -0,0 +1,169 @@
+# backend/main/breaker.py
+"""
+Per-model circuit breakers and a shared "model loading" negative cache for the
+HuggingFace clients.
+
+A breaker opens after HF_BREAKER_FAILURES consecutive timeouts, connection errors or
+5xx answers. While it is open, calls fail at once with CircuitOpenError, which the
+"fallback" backend answers locally. After HF_BREAKER_RESET seconds, one trial call
+is let through (half-open). Its outcome closes the breaker or opens it again; a
+429, a "model loading" answer or an error that is not about the model leaves it
+half-open for the next call to try.
+
+"Model is loading" answers are remembered in the default cache for their
+estimated_time, so every worker sharing the cache answers with the same 503 instead
+of calling HuggingFace again.
+"""
+import json
+import logging
+import threading
+import time
+
+import requests
+from django.conf import settings
+from django.core.cache import caches
+
+from .metrics import CIRCUIT_OPEN, UPSTREAM_SHORT_CIRCUITED
+
+logger = logging.getLogger(__name__)
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised instead of calling a model whose circuit breaker is open."""
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+
+class CircuitBreaker:
+    def __init__(self, model, failure_threshold, reset_timeout):
+        self.model = model
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_running = False
+        self.lock = threading.Lock()
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go ahead now."""
+        with self.lock:
+            if self.state == CLOSED:
+                return
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+                logger.info("Circuit for %s half-open; sending a trial call", self.model)
+            if self.state == HALF_OPEN and not self.trial_running:
+                self.trial_running = True
+                return
+            retry_in = max(0, self.reset_timeout - (time.monotonic() - self.opened_at))
+        UPSTREAM_SHORT_CIRCUITED.inc(model=self.model, reason="open")
+        raise CircuitOpenError(f"{self.model} is unavailable; not retrying for another {retry_in:.0f}s")
+
+    def record_success(self):
+        with self.lock:
+            if self.state != CLOSED:
+                logger.info("Circuit for %s closed", self.model)
+            self.state = CLOSED
+            self.failures = 0
+            self.trial_running = False
+        CIRCUIT_OPEN.set(0, model=self.model)
+
+    def release(self):
+        """The call ended without telling us anything about the model (e.g. rate limited locally)."""
+        with self.lock:
+            self.trial_running = False
+
+    def record_response(self, response):
+        """
+        Settle the call by its answer. A 429 or "model loading" 503 says nothing about
+        whether the model works, so it neither closes nor opens the breaker.
+        """
+        if is_failure(response):
+            self.record_failure()
+        elif response.status_code == 429 or is_loading(response):
+            self.release()
+        else:
+            self.record_success()
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.trial_running = False
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    logger.warning("Circuit for %s opened after %s failures", self.model, self.failures)
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+        if self.state == OPEN:
+            CIRCUIT_OPEN.set(1, model=self.model)
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+def get_breaker(model):
+    breaker = _breakers.get(model)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.setdefault(
+                model, CircuitBreaker(model, settings.HF_BREAKER_FAILURES, settings.HF_BREAKER_RESET),
+            )
+    return breaker
+
+def is_failure(response):
+    """5xx answers other than "model loading" count against the breaker."""
+    return response.status_code >= 500 and not is_loading(response)
+
+def is_loading(response):
+    return response.status_code == 503 and "loading" in response.text.lower()
+
+def _loading_key(model):
+    return f"model-loading:{model}"
+
+def remember_loading(model, seconds):
+    """Answer calls to model with a loading 503 for the next seconds (capped)."""
+    seconds = min(seconds or settings.HF_LOADING_CACHE_MAX, settings.HF_LOADING_CACHE_MAX)
+    if seconds <= 0:
+        return
+    try:
+        caches["default"].set(_loading_key(model), time.time() + seconds, timeout=max(1, int(seconds)))
+    except Exception:
+        logger.exception("Could not record loading state for %s", model)
+
+async def aremember_loading(model, seconds):
+    seconds = min(seconds or settings.HF_LOADING_CACHE_MAX, settings.HF_LOADING_CACHE_MAX)
+    if seconds <= 0:
+        return
+    try:
+        await caches["default"].aset(_loading_key(model), time.time() + seconds, timeout=max(1, int(seconds)))
+    except Exception:
+        logger.exception("Could not record loading state for %s", model)
+
+def _loading_response(model, ready_at):
+    remaining = max(0.0, ready_at - time.time())
+    response = requests.Response()
+    response.status_code = 503
+    response.headers["Content-Type"] = "application/json"
+    response._content = json.dumps({
+        "error": f"Model {model} is currently loading",
+        "estimated_time": round(remaining, 1),
+    }).encode("utf-8")
+    UPSTREAM_SHORT_CIRCUITED.inc(model=model, reason="loading")
+    return response
+
+def cached_loading_response(model):
+    """A synthetic "loading" 503 while model is known to be loading, else None."""
+    try:
+        ready_at = caches["default"].get(_loading_key(model))
+    except Exception:
+        return None
+    if ready_at is None or ready_at <= time.time():
+        return None
+    return _loading_response(model, ready_at)
+
+async def acached_loading_response(model):
+    try:
+        ready_at = await caches["default"].aget(_loading_key(model))
+    except Exception:
+        return None
+    if ready_at is None or ready_at <= time.time():
+        return None
+    return _loading_response(model, ready_at)
@@ -0,0 +1,117 @@
+# backend/main/cache.py
+import hashlib
+import logging
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .utils import is_summary_error
+
+logger = logging.getLogger(__name__)
+
+# Query parameters that only track where a click came from and never change the article
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "msclkid", "mc_cid", "mc_eid", "igshid",
+    "ref", "ref_src", "ref_url", "cmpid", "ocid", "smid", "smtyp", "_ga",
+}
+TRACKING_PREFIXES = ("utm_",)
+
+HITS_KEY = "analyze-cache:hits"
+MISSES_KEY = "analyze-cache:misses"
+
+def normalize_url(url):
+    """Lowercase scheme and host, drop fragments, tracking params and trailing slashes."""
+    parts = urlsplit(url.strip())
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k.lower() not in TRACKING_PARAMS and not k.lower().startswith(TRACKING_PREFIXES)
+    )
+    netloc = parts.netloc.lower()
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((parts.scheme.lower(), netloc, path, urlencode(query), ""))
+
+def normalize_text(text):
+    """Collapse whitespace so re-pasted copies of the same article hash identically."""
+    return " ".join(text.split())
+
+def result_cache_key(url=None, text=None):
+    """Content-addressed key: the normalized URL if given, otherwise the normalized text."""
+    if url:
+        source = "url:" + normalize_url(url)
+    else:
+        source = "text:" + normalize_text(text or "")
+    return "result:" + hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+def is_cacheable(result):
+    """
+    Only cache complete analyses; error strings and local fallback answers should be
+    retried against HuggingFace on the next request.
+    """
+    details = result["details"]
+    return not details.get("error") and not details.get("fallback") and not is_summary_error(result["summary"])
+
+def _count(key):
+    counters = caches["default"]
+    try:
+        counters.add(key, 0, timeout=None)
+        counters.incr(key)
+    except Exception:
+        logger.warning("Could not update cache counter %s", key)
+
+def get_cached_result(key):
+    """Return the cached analysis for key, or None. Cache outages count as misses."""
+    try:
+        result = caches["analyze"].get(key)
+    except Exception:
+        logger.exception("Result cache lookup failed")
+        result = None
+    _count(HITS_KEY if result is not None else MISSES_KEY)
+    return result
+
+def set_cached_result(key, result):
+    if not is_cacheable(result):
+        return
+    try:
+        caches["analyze"].set(key, result, timeout=settings.ANALYZE_CACHE_TTL)
+    except Exception:
+        logger.exception("Result cache write failed")
+
+async def _acount(key):
+    counters = caches["default"]
+    try:
+        await counters.aadd(key, 0, timeout=None)
+        await counters.aincr(key)
+    except Exception:
+        logger.warning("Could not update cache counter %s", key)
+
+async def aget_cached_result(key):
+    """Async variant of get_cached_result for the ASGI analyze view."""
+    try:
+        result = await caches["analyze"].aget(key)
+    except Exception:
+        logger.exception("Result cache lookup failed")
+        result = None
+    await _acount(HITS_KEY if result is not None else MISSES_KEY)
+    return result
+
+async def aset_cached_result(key, result):
+    if not is_cacheable(result):
+        return
+    try:
+        await caches["analyze"].aset(key, result, timeout=settings.ANALYZE_CACHE_TTL)
+    except Exception:
+        logger.exception("Result cache write failed")
+
+def cache_stats():
+    counters = caches["default"]
+    hits = counters.get(HITS_KEY, 0)
+    misses = counters.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": round(hits / total, 4) if total else 0.0,
+        "ttl_seconds": settings.ANALYZE_CACHE_TTL,
+        "max_entries": settings.ANALYZE_CACHE_MAX_ENTRIES,
+    }
@@ -0,0 +1,150 @@
+# backend/main/dedupe.py
+"""
+Near-duplicate article index. Syndicated wire stories appear under many URLs with
+almost the same text, which the exact result cache can't match. Each analyzed article
+gets a MinHash signature over its word 5-shingles. The signature is split into bands,
+and each band is hashed into an ArticleBucket row. A new article is compared only
+against earlier articles that share at least one bucket with it. If the best match
+has an estimated Jaccard similarity of at least NEAR_DUPLICATE_THRESHOLD, its summary
+and verdict are reused.
+
+NUM_PERMUTATIONS, BANDS and the hash seed are baked into every stored signature.
+Changing them makes existing fingerprints useless, so they are constants, not settings.
+"""
+import functools
+import hashlib
+import logging
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .cache import is_cacheable
+from .models import ArticleFingerprint, ArticleBucket
+
+logger = logging.getLogger(__name__)
+
+WORD = re.compile(r"\w+")
+SHINGLE_WORDS = 5
+NUM_PERMUTATIONS = 128
+# 16 bands of 8 rows: pairs at 0.9 similarity share a bucket with probability > 0.9999,
+# pairs at 0.5 only about 6% of the time
+BANDS = 16
+ROWS = NUM_PERMUTATIONS // BANDS
+# Shingles hashed per block, bounding the (NUM_PERMUTATIONS x block) work array to 4 MB
+BLOCK = 4096
+
+@functools.lru_cache(maxsize=None)
+def _hash_parameters():
+    """
+    (multipliers, increments, shingle powers) for multiply-add-shift hashing in uint64
+    (wrapping) arithmetic, of which the top 32 bits are kept. Built on first use so
+    numpy is only imported by processes that analyze articles.
+    """
+    import numpy as np
+    rng = np.random.default_rng(20240611)
+    multipliers = (rng.integers(1, 2 ** 63, NUM_PERMUTATIONS, dtype=np.uint64) << np.uint64(1)) | np.uint64(1)
+    increments = rng.integers(0, 2 ** 63, NUM_PERMUTATIONS, dtype=np.uint64)
+    powers = np.array([1_000_003 ** i % 2 ** 64 for i in range(SHINGLE_WORDS)], dtype=np.uint64)
+    return multipliers, increments, powers
+
+def _word_hashes(words):
+    """Stable 64-bit hash per word; each distinct word is hashed once."""
+    import numpy as np
+    vocabulary, positions = np.unique(np.array(words), return_inverse=True)
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "little")
+         for word in vocabulary),
+        dtype=np.uint64, count=len(vocabulary),
+    )
+    return hashes[positions]
+
+def shingle_hashes(text):
+    """Distinct 64-bit hashes of the text's overlapping SHINGLE_WORDS-word shingles."""
+    import numpy as np
+    words = WORD.findall(text.lower())
+    if len(words) < SHINGLE_WORDS:
+        return np.empty(0, dtype=np.uint64)
+    windows = np.lib.stride_tricks.sliding_window_view(_word_hashes(words), SHINGLE_WORDS)
+    return np.unique((windows * _hash_parameters()[2]).sum(axis=1, dtype=np.uint64))
+
+def minhash(shingles):
+    """MinHash signature (NUM_PERMUTATIONS uint32 values) of a shingle hash array."""
+    import numpy as np
+    multipliers, increments, _ = _hash_parameters()
+    signature = np.full(NUM_PERMUTATIONS, np.iinfo(np.uint32).max, dtype=np.uint64)
+    for start in range(0, len(shingles), BLOCK):
+        block = shingles[start:start + BLOCK]
+        hashed = (multipliers[:, None] * block[None, :] + increments[:, None]) >> np.uint64(32)
+        np.minimum(signature, hashed.min(axis=1), out=signature)
+    return signature.astype(np.uint32)
+
+def bucket_keys(signature):
+    """One signed 64-bit bucket key per band, with the band number mixed in."""
+    keys = []
+    for band, rows in enumerate(signature.reshape(BANDS, ROWS)):
+        digest = hashlib.blake2b(bytes([band]) + rows.tobytes(), digest_size=8).digest()
+        keys.append(int.from_bytes(digest, "little", signed=True))
+    return keys
+
+def similarity(signature, others):
+    """Estimated Jaccard similarity of signature with each row of others."""
+    return (others == signature).mean(axis=1)
+
+def fingerprint(text):
+    """MinHash signature of text, or None if the text is too short to compare reliably."""
+    if len(WORD.findall(text)) < settings.NEAR_DUPLICATE_MIN_WORDS:
+        return None
+    return minhash(shingle_hashes(text))
+
+def find_near_duplicate(text):
+    """(ArticleFingerprint, similarity) of the closest earlier article above the threshold, or None."""
+    if not settings.NEAR_DUPLICATE_DETECTION:
+        return None
+    signature = fingerprint(text)
+    if signature is None:
+        return None
+    since = timezone.now() - timedelta(seconds=settings.NEAR_DUPLICATE_MAX_AGE)
+    try:
+        candidates = list(
+            ArticleFingerprint.objects.filter(buckets__key__in=bucket_keys(signature), created_at__gte=since)
+            .distinct().only("id", "signature")
+        )
+    except Exception:
+        logger.exception("Near-duplicate lookup failed")
+        return None
+    if not candidates:
+        return None
+    import numpy as np
+    others = np.stack([np.frombuffer(bytes(candidate.signature), dtype=np.uint32) for candidate in candidates])
+    scores = similarity(signature, others)
+    best = int(scores.argmax())
+    if scores[best] < settings.NEAR_DUPLICATE_THRESHOLD:
+        return None
+    match = ArticleFingerprint.objects.get(pk=candidates[best].pk)
+    return match, round(float(scores[best]), 4)
+
+def index_article(text, result):
+    """Add an analyzed article to the index so later near-copies can reuse result."""
+    if not settings.NEAR_DUPLICATE_DETECTION or not is_cacheable(result):
+        return
+    signature = fingerprint(text)
+    if signature is None:
+        return
+    try:
+        with transaction.atomic():
+            entry = ArticleFingerprint.objects.create(
+                signature=signature.tobytes(),
+                title=result["title"][:512],
+                summary=result["summary"],
+                fake_news_label=result["fake_news_label"],
+                fake_news_confidence=result["fake_news_confidence"],
+                details=result["details"],
+            )
+            ArticleBucket.objects.bulk_create(
+                [ArticleBucket(fingerprint=entry, key=key) for key in bucket_keys(signature)]
+            )
+    except Exception:
+        logger.exception("Failed to index article fingerprint")
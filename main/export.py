@@ -0,0 +1,76 @@
+# backend/main/export.py
+"""
+Streaming exports of QueryHistory and Feedback. Rows are read with
+.values().iterator() (a server-side cursor on Postgres) and written out as they
+arrive, so memory use stays flat however large the table is.
+"""
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import QueryHistory, Feedback
+
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORTS = {
+    # Rows written by feed ingestion are not user requests, so they are left out
+    "history": (
+        QueryHistory.objects.filter(source="user"),
+        ["id", "public_id", "input_type", "input_value", "summary", "fake_news_label", "fake_news_confidence",
+         "article_title", "created_at", "duration_ms", "cache_hit", "stage_timings"],
+    ),
+    "feedback": (
+        Feedback.objects.all(),
+        ["id", "title", "fake_news_label", "user_feedback", "created_at", "history_id"],
+    ),
+}
+
+class _Echo:
+    """File-like object whose write() hands the line back instead of buffering it."""
+    def write(self, value):
+        return value
+
+def export_rows(table):
+    """Rows of table as dicts, oldest first, fetched EXPORT_CHUNK_SIZE at a time."""
+    rows, fields = EXPORTS[table]
+    return rows.order_by("id").values(*fields).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+def aexport_rows(table):
+    """Async iterator over the same rows, for ASGI."""
+    rows, fields = EXPORTS[table]
+    return rows.order_by("id").values(*fields).aiterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+def _json_item(row, first):
+    return ("[\n" if first else ",\n") + json.dumps(row, cls=DjangoJSONEncoder)
+
+def json_lines(rows):
+    """A JSON array, one element per chunk yielded."""
+    first = True
+    for row in rows:
+        yield _json_item(row, first)
+        first = False
+    yield "[]\n" if first else "\n]\n"
+
+async def ajson_lines(rows):
+    first = True
+    async for row in rows:
+        yield _json_item(row, first)
+        first = False
+    yield "[]\n" if first else "\n]\n"
+
+def _csv_row(row):
+    # JSON columns are written as JSON rather than Python reprs
+    return [json.dumps(value) if isinstance(value, dict) else value for value in row.values()]
+
+def csv_lines(table, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORTS[table][1])
+    for row in rows:
+        yield writer.writerow(_csv_row(row))
+
+async def acsv_lines(table, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORTS[table][1])
+    async for row in rows:
+        yield writer.writerow(_csv_row(row))
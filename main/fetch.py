@@ -0,0 +1,273 @@
+# backend/main/fetch.py
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import socket
+import threading
+import time
+import zlib
+
+import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+
+from .metrics import stage
+
+# newspaper3k (with nltk, PIL, lxml and jieba under it) and httpx are imported where
+# they are used, so a worker can boot and answer cheap endpoints without loading them.
+# main/warmup.py can import them ahead of the first analysis.
+
+logger = logging.getLogger(__name__)
+
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+CHUNK_SIZE = 64 * 1024
+CHARSET = re.compile(r"charset=[\"']?([\w.:-]+)", re.I)
+# <meta charset="..."> or <meta http-equiv="Content-Type" content="text/html; charset=...">
+META_CHARSET = re.compile(rb"<meta[^>]+charset=[\"']?([\w.:-]+)", re.I)
+
+class FetchError(Exception):
+    """The article could not be downloaded or is not an HTML page."""
+
+def user_agent():
+    from newspaper.configuration import Configuration
+    return Configuration().browser_user_agent
+
+def _config(fast):
+    from newspaper.configuration import Configuration
+    config = Configuration()
+    config.memoize_articles = False
+    # Fast mode skips newspaper3k's image downloads; the pipeline never uses images
+    config.fetch_images = not fast
+    return config
+
+def extract_fields(url, html, fast=None):
+    """Parse already-downloaded HTML with newspaper3k and return the fields we use."""
+    from newspaper import Article
+    fast = settings.ARTICLE_EXTRACTION_MODE == "fast" if fast is None else fast
+    article = Article(url, config=_config(fast))
+    article.download(input_html=html)
+    article.parse()
+    return {
+        'text': article.text.strip(),
+        'title': article.title or "",
+        'author': ', '.join(article.authors) or "",
+        'published_date': str(article.publish_date or ""),
+    }
+
+def _cache_key(url):
+    # cache.py imports utils, which imports this module
+    from .cache import normalize_url
+    return "article:" + hashlib.sha256(normalize_url(url).encode("utf-8")).hexdigest()
+
+def _cached_entry(url):
+    try:
+        return caches["articles"].get(_cache_key(url))
+    except Exception:
+        logger.exception("Article cache lookup failed")
+        return None
+
+def _store(url, entry):
+    try:
+        caches["articles"].set(_cache_key(url), entry, timeout=settings.ARTICLE_CACHE_TTL)
+    except Exception:
+        logger.exception("Article cache write failed")
+
+def _is_fresh(entry):
+    return entry is not None and time.time() - entry["validated_at"] < settings.ARTICLE_CACHE_FRESH_SECONDS
+
+def _conditional_headers(entry):
+    headers = {}
+    if entry and entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry and entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+def _check_content_type(url, content_type):
+    content_type = (content_type or "").split(";")[0].strip().lower()
+    # Servers that omit the header are given the benefit of the doubt
+    if content_type and content_type not in HTML_CONTENT_TYPES:
+        raise FetchError(f"URL does not point to an HTML page (content type {content_type}).")
+
+def _charset(content_type, body):
+    """The charset from the Content-Type header, else from a <meta> tag near the top, else None."""
+    match = CHARSET.search(content_type or "") or META_CHARSET.search(body[:4096])
+    if not match:
+        return None
+    charset = match.group(1)
+    return charset.decode("ascii") if isinstance(charset, bytes) else charset
+
+def _decode(body, content_type):
+    """
+    Decode a page body. Without a declared charset, UTF-8 is tried first and Windows-1252
+    used if that fails, instead of the ISO-8859-1 default HTTP libraries assume.
+    """
+    charset = _charset(content_type, body)
+    if charset:
+        try:
+            return body.decode(charset, errors="replace")
+        except LookupError:
+            logger.info("Unknown charset %r; guessing", charset)
+    try:
+        return body.decode("utf-8")
+    except UnicodeDecodeError:
+        return body.decode("cp1252", errors="replace")
+
+def _revalidated(url, entry):
+    """The cached entry, marked as just confirmed unchanged by a 304."""
+    entry = {**entry, "validated_at": time.time()}
+    _store(url, entry)
+    return entry["fields"]
+
+def _new_entry(url, response_headers, html, fields):
+    entry = {
+        "etag": response_headers.get("ETag"),
+        "last_modified": response_headers.get("Last-Modified"),
+        "html": zlib.compress(html.encode("utf-8")),
+        "fields": fields,
+        "validated_at": time.time(),
+    }
+    _store(url, entry)
+    return fields
+
+_session = None
+_session_lock = threading.Lock()
+
+def _get_session():
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = requests.Session()
+                _session.headers["User-Agent"] = user_agent()
+    return _session
+
+def _reset_session():
+    global _session, _session_lock
+    _session = None
+    _session_lock = threading.Lock()
+
+os.register_at_fork(after_in_child=_reset_session)
+
+def _abort(response):
+    """Unblock a read in progress on another thread; shutting the socket down wakes a blocked recv."""
+    sock = getattr(getattr(response.raw, "connection", None), "sock", None)
+    if sock is None:
+        # http.client lets go of the connection's socket once the server says it will
+        # close; the response's file object still wraps it
+        fp = getattr(getattr(response.raw, "_fp", None), "fp", None)
+        sock = getattr(getattr(fp, "raw", None), "_sock", None)
+    if sock is not None:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+def _read_body(url, chunks):
+    body = bytearray()
+    for chunk in chunks:
+        body += chunk
+        if len(body) >= settings.ARTICLE_MAX_BYTES:
+            logger.warning("Article %s exceeds %s bytes; parsing the first part only", url, settings.ARTICLE_MAX_BYTES)
+            del body[settings.ARTICLE_MAX_BYTES:]
+            break
+    return bytes(body)
+
+def _download(url, entry):
+    """
+    Streams the page with one overall deadline and a byte cap. Returns (headers, html),
+    or (None, None) when the server answers 304 Not Modified.
+    """
+    give_up_at = time.monotonic() + settings.ARTICLE_FETCH_DEADLINE
+    response = _get_session().get(
+        url,
+        headers=_conditional_headers(entry),
+        stream=True,
+        allow_redirects=True,
+        timeout=(min(settings.ARTICLE_FETCH_DEADLINE, 7), min(settings.ARTICLE_FETCH_DEADLINE, 7)),
+    )
+    with response:
+        if response.status_code == 304 and entry:
+            return None, None
+        response.raise_for_status()
+        _check_content_type(url, response.headers.get("Content-Type"))
+        # A server that trickles bytes never trips the per-read timeout, so the deadline
+        # is enforced by a timer that cuts the connection
+        timer = threading.Timer(max(0.0, give_up_at - time.monotonic()), _abort, [response])
+        timer.daemon = True
+        timer.start()
+        try:
+            body = _read_body(url, response.iter_content(CHUNK_SIZE))
+        except Exception:
+            if time.monotonic() >= give_up_at:
+                raise FetchError(f"Download took longer than {settings.ARTICLE_FETCH_DEADLINE} seconds.")
+            raise
+        finally:
+            timer.cancel()
+        if time.monotonic() > give_up_at:
+            raise FetchError(f"Download took longer than {settings.ARTICLE_FETCH_DEADLINE} seconds.")
+        return response.headers, _decode(body, response.headers.get("Content-Type"))
+
+def fetch_article(url):
+    """
+    Article fields for url, served from the article cache while fresh and revalidated
+    with ETag/Last-Modified after that, so unchanged pages are never parsed twice.
+    """
+    entry = _cached_entry(url)
+    if _is_fresh(entry):
+        return entry["fields"]
+    with stage("fetch"):
+        headers, html = _download(url, entry)
+    if html is None:
+        return _revalidated(url, entry)
+    with stage("parse"):
+        fields = extract_fields(url, html)
+    return _new_entry(url, headers, html, fields)
+
+async def _read_body_async(url, chunks):
+    body = bytearray()
+    async for chunk in chunks:
+        body += chunk
+        if len(body) >= settings.ARTICLE_MAX_BYTES:
+            logger.warning("Article %s exceeds %s bytes; parsing the first part only", url, settings.ARTICLE_MAX_BYTES)
+            del body[settings.ARTICLE_MAX_BYTES:]
+            break
+    return bytes(body)
+
+async def _download_async(url, entry):
+    import httpx
+    give_up_at = time.monotonic() + settings.ARTICLE_FETCH_DEADLINE
+    async with httpx.AsyncClient(
+        follow_redirects=True,
+        timeout=min(settings.ARTICLE_FETCH_DEADLINE, 7),
+        headers={"User-Agent": user_agent()},
+    ) as client:
+        async with client.stream("GET", url, headers=_conditional_headers(entry)) as response:
+            if response.status_code == 304 and entry:
+                return None, None
+            response.raise_for_status()
+            _check_content_type(url, response.headers.get("Content-Type"))
+            try:
+                body = await asyncio.wait_for(
+                    _read_body_async(url, response.aiter_bytes(CHUNK_SIZE)),
+                    max(0.0, give_up_at - time.monotonic()),
+                )
+            except asyncio.TimeoutError:
+                raise FetchError(f"Download took longer than {settings.ARTICLE_FETCH_DEADLINE} seconds.")
+            return response.headers, _decode(body, response.headers.get("Content-Type"))
+
+async def fetch_article_async(url):
+    """Async variant of fetch_article; only the newspaper3k parse runs on a worker thread."""
+    entry = await sync_to_async(_cached_entry, thread_sensitive=False)(url)
+    if _is_fresh(entry):
+        return entry["fields"]
+    with stage("fetch"):
+        headers, html = await _download_async(url, entry)
+    if html is None:
+        return await sync_to_async(_revalidated, thread_sensitive=False)(url, entry)
+    with stage("parse"):
+        fields = await sync_to_async(extract_fields, thread_sensitive=False)(url, html)
+    return await sync_to_async(_new_entry, thread_sensitive=False)(url, headers, html, fields)
@@ -0,0 +1,162 @@
+# backend/main/history.py
+"""
+Write-behind QueryHistory logging. Request paths hand their rows to save_history(),
+which (in the default "buffered" mode) only appends them to an in-process buffer.
+A background thread writes the buffer with one bulk_create when HISTORY_FLUSH_SIZE
+rows are waiting or HISTORY_FLUSH_INTERVAL seconds have passed, and the buffer is
+flushed again at interpreter exit and when a Celery worker process shuts down.
+
+HISTORY_WRITE_MODE="sync" writes on the request path as before; "celery" hands each
+flushed batch to a Celery task so web processes never write history themselves.
+"""
+import atexit
+import logging
+import os
+import threading
+
+from asgiref.sync import sync_to_async
+from celery.signals import worker_process_shutdown
+from django.conf import settings
+from django.db import InterfaceError, OperationalError, close_old_connections
+
+from .models import QueryHistory
+from .rollups import record_history
+
+logger = logging.getLogger(__name__)
+
+HISTORY_FIELDS = [
+    "input_type", "input_value", "summary", "fake_news_label", "fake_news_confidence",
+    "article_title", "duration_ms", "cache_hit", "stage_timings", "public_id", "source",
+]
+
+def write_rows(rows):
+    """bulk_create rows and add them to the rollups, which bulk_create would otherwise skip."""
+    QueryHistory.objects.bulk_create(rows, batch_size=500)
+    record_history(rows)
+
+class HistoryWriter:
+    def __init__(self, flush_size, flush_interval, max_buffered, max_retries):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.max_buffered = max_buffered
+        self.max_retries = max_retries
+        self.failures = 0
+        self.buffer = []
+        self.condition = threading.Condition()
+        self.flush_lock = threading.Lock()
+        self.thread = None
+
+    def add(self, rows):
+        with self.condition:
+            overflow = len(self.buffer) + len(rows) - self.max_buffered
+            if overflow > 0:
+                # The database has been unreachable for a while; keep the newest rows
+                logger.error("History buffer full, dropping %s rows", overflow)
+                del self.buffer[:overflow]
+            self.buffer.extend(rows)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="history-writer", daemon=True)
+                self.thread.start()
+            if len(self.buffer) >= self.flush_size:
+                self.condition.notify()
+
+    def _run(self):
+        while True:
+            with self.condition:
+                if len(self.buffer) < self.flush_size:
+                    self.condition.wait(self.flush_interval)
+            self.flush()
+            close_old_connections()
+
+    def flush(self):
+        """Write everything buffered so far. Safe to call from any thread."""
+        with self.flush_lock:
+            with self.condition:
+                rows, self.buffer = self.buffer, []
+            if not rows:
+                return
+            try:
+                if settings.HISTORY_WRITE_MODE == "celery":
+                    from .tasks import write_history_task
+                    write_history_task.delay([
+                        {field: getattr(row, field) for field in HISTORY_FIELDS} for row in rows
+                    ])
+                else:
+                    write_rows(rows)
+                self.failures = 0
+            except Exception:
+                self.failures += 1
+                if settings.HISTORY_WRITE_MODE != "celery" and self.failures > self.max_retries:
+                    rows = self._write_one_by_one(rows)
+                else:
+                    logger.exception("Failed to write %s history rows; will retry", len(rows))
+                with self.condition:
+                    self.buffer[:0] = rows
+
+    def _write_one_by_one(self, rows):
+        """
+        Write rows singly so one bad row can't block the rest. Rows rejected for their
+        content are logged and dropped; returns the rows to retry because the database
+        itself was unavailable.
+        """
+        logger.error("History writes failed %s times in a row; writing %s rows one by one",
+                     self.failures, len(rows))
+        self.failures = 0
+        retry = []
+        for row in rows:
+            try:
+                write_rows([row])
+            except (OperationalError, InterfaceError):
+                logger.exception("Database unavailable while writing a history row; will retry")
+                retry.append(row)
+            except Exception:
+                logger.exception("Dropping history row that can't be written: %s", row)
+        return retry
+
+_writer = None
+_writer_lock = threading.Lock()
+
+def get_history_writer():
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = HistoryWriter(
+                    settings.HISTORY_FLUSH_SIZE, settings.HISTORY_FLUSH_INTERVAL, settings.HISTORY_BUFFER_MAX,
+                    settings.HISTORY_FLUSH_RETRIES,
+                )
+    return _writer
+
+def _reset_writer():
+    # The flusher thread does not survive fork, and the parent will flush its own buffer
+    global _writer, _writer_lock
+    _writer = None
+    _writer_lock = threading.Lock()
+
+os.register_at_fork(after_in_child=_reset_writer)
+
+def flush_history():
+    if _writer is not None:
+        _writer.flush()
+
+atexit.register(flush_history)
+
+@worker_process_shutdown.connect
+def _flush_on_worker_shutdown(**kwargs):
+    # Prefork children leave with os._exit, which skips atexit handlers
+    flush_history()
+
+def save_history(*rows):
+    """Record QueryHistory rows according to HISTORY_WRITE_MODE."""
+    if not rows:
+        return
+    if settings.HISTORY_WRITE_MODE == "sync":
+        write_rows(list(rows))
+    else:
+        get_history_writer().add(rows)
+
+async def asave_history(*rows):
+    if settings.HISTORY_WRITE_MODE == "sync":
+        await sync_to_async(write_rows)(list(rows))
+    else:
+        save_history(*rows)
@@ -0,0 +1,298 @@
+# backend/main/inference.py
+import asyncio
+import email.utils
+import logging
+import os
+import random
+import threading
+import time
+import weakref
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+
+from .metrics import UPSTREAM_RESPONSES, UPSTREAM_ERRORS, UPSTREAM_RETRIES
+from .throttle import RateLimiter, RateLimitExceeded, SingleFlight, AsyncSingleFlight, call_key
+from .breaker import (
+    get_breaker, is_loading, remember_loading, aremember_loading,
+    cached_loading_response, acached_loading_response,
+)
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_MODEL = "facebook/bart-large-cnn"
+NLI_MODEL = "facebook/bart-large-mnli"
+
+# HF answers these while a model is cold, overloaded or rate limited
+RETRY_STATUSES = {429, 502, 503, 504}
+
+def _retry_after_seconds(response):
+    """Seconds the upstream asked us to wait, from Retry-After or HF's estimated_time."""
+    header = response.headers.get("Retry-After")
+    if header:
+        if header.strip().isdigit():
+            return float(header)
+        try:
+            return max(0.0, email.utils.parsedate_to_datetime(header).timestamp() - time.time())
+        except (TypeError, ValueError):
+            pass
+    try:
+        data = response.json()
+    except ValueError:
+        return None
+    if isinstance(data, dict) and "estimated_time" in data:
+        try:
+            return float(data["estimated_time"])
+        except (TypeError, ValueError):
+            return None
+    return None
+
+class _RetryPolicy:
+    """Backoff and give-up rules shared by the sync and async clients."""
+
+    def __init__(self, base_url, pool_size, max_retries, deadline, backoff, coalesce=True):
+        self.base_url = base_url.rstrip("/")
+        self.pool_size = pool_size
+        self.max_retries = max_retries
+        self.deadline = deadline
+        self.backoff = backoff
+        self.coalesce = coalesce
+        self.rate_limiter = RateLimiter()
+
+    def _backoff_delay(self, attempt, response=None):
+        hinted = _retry_after_seconds(response) if response is not None else None
+        if hinted is not None:
+            return hinted
+        return self.backoff * (2 ** attempt) * (0.5 + random.random() / 2)
+
+    def _retry_delay(self, model, attempt, give_up_at, response=None):
+        """Seconds to sleep before the next attempt, or None if we should stop now."""
+        if attempt >= self.max_retries:
+            return None
+        delay = self._backoff_delay(attempt, response)
+        if time.monotonic() + delay >= give_up_at:
+            return None
+        UPSTREAM_RETRIES.inc(model=model, reason=str(response.status_code) if response is not None else "network")
+        if response is not None:
+            logger.warning(
+                "Inference call to %s returned %s; retrying in %.1fs",
+                model, response.status_code, delay,
+            )
+        else:
+            logger.warning("Inference call to %s failed; retrying in %.1fs", model, delay)
+        return delay
+
+class InferenceClient(_RetryPolicy):
+    """
+    Keep-alive connection pool for the HuggingFace Inference API.
+    post() retries cold-model, rate-limit and transient errors with backoff, but never
+    past one overall deadline, so callers see the same worst-case latency as a single call.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self.single_flight = SingleFlight()
+
+    def post(self, model, payload, headers=None, deadline=None):
+        """
+        POST payload to the model endpoint and return the final Response.
+        A retryable response that can't be retried in time is returned as-is;
+        requests.exceptions.Timeout is raised if the deadline passes with no response.
+        Identical concurrent calls share one upstream request.
+        """
+        give_up_at = time.monotonic() + (deadline or self.deadline)
+        if not self.coalesce:
+            return self._guarded_post(model, payload, headers, give_up_at)
+        return self.single_flight.run(
+            call_key(model, payload), model, give_up_at,
+            lambda: self._guarded_post(model, payload, headers, give_up_at),
+        )
+
+    def _guarded_post(self, model, payload, headers, give_up_at):
+        """_post behind the model's loading negative cache and circuit breaker."""
+        loading = cached_loading_response(model)
+        if loading is not None:
+            return loading
+        breaker = get_breaker(model)
+        breaker.before_call()
+        try:
+            response = self._post(model, payload, headers, give_up_at)
+        except RateLimitExceeded:
+            breaker.release()
+            raise
+        except requests.exceptions.RequestException:
+            breaker.record_failure()
+            raise
+        except BaseException:
+            # Anything else (a bug, a cancelled task) must still free a half-open trial
+            breaker.release()
+            raise
+        breaker.record_response(response)
+        return response
+
+    def _post(self, model, payload, headers, give_up_at):
+        url = f"{self.base_url}/{model}"
+        attempt = 0
+        while True:
+            self.rate_limiter.acquire(model, give_up_at)
+            remaining = give_up_at - time.monotonic()
+            if remaining <= 0:
+                raise requests.exceptions.Timeout(f"Inference deadline exceeded for {model}")
+            try:
+                response = self.session.post(url, headers=headers, json=payload, timeout=remaining)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                UPSTREAM_ERRORS.inc(
+                    model=model, error="Timeout" if isinstance(e, requests.exceptions.Timeout) else "ConnectionError"
+                )
+                delay = self._retry_delay(model, attempt, give_up_at)
+                if delay is None:
+                    raise
+            else:
+                UPSTREAM_RESPONSES.inc(model=model, status=str(response.status_code))
+                if is_loading(response):
+                    remember_loading(model, _retry_after_seconds(response))
+                if response.status_code not in RETRY_STATUSES:
+                    return response
+                delay = self._retry_delay(model, attempt, give_up_at, response)
+                if delay is None:
+                    return response
+            time.sleep(delay)
+            attempt += 1
+
+def _as_requests_response(response):
+    """Convert an httpx response so the sync response parsers in utils can be reused."""
+    converted = requests.Response()
+    converted.status_code = response.status_code
+    converted._content = response.content
+    converted.headers = requests.structures.CaseInsensitiveDict(response.headers)
+    converted.url = str(response.url)
+    converted.reason = response.reason_phrase
+    converted.encoding = response.encoding
+    return converted
+
+class AsyncInferenceClient(_RetryPolicy):
+    """
+    asyncio counterpart of InferenceClient for the ASGI analyze view. Waiting on
+    HuggingFace holds no thread, and errors are raised as the same requests exceptions.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Imported here so sync-only (WSGI) workers never load httpx
+        import httpx
+        self.client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=self.pool_size, max_keepalive_connections=self.pool_size
+            ),
+        )
+        self.single_flight = AsyncSingleFlight()
+
+    async def post(self, model, payload, headers=None, deadline=None):
+        give_up_at = time.monotonic() + (deadline or self.deadline)
+        if not self.coalesce:
+            return await self._guarded_post(model, payload, headers, give_up_at)
+        return await self.single_flight.run(
+            call_key(model, payload), model, give_up_at,
+            lambda: self._guarded_post(model, payload, headers, give_up_at),
+        )
+
+    async def _guarded_post(self, model, payload, headers, give_up_at):
+        loading = await acached_loading_response(model)
+        if loading is not None:
+            return loading
+        breaker = get_breaker(model)
+        breaker.before_call()
+        try:
+            response = await self._post(model, payload, headers, give_up_at)
+        except RateLimitExceeded:
+            breaker.release()
+            raise
+        except requests.exceptions.RequestException:
+            breaker.record_failure()
+            raise
+        except BaseException:
+            # Anything else (a bug, a cancelled task) must still free a half-open trial
+            breaker.release()
+            raise
+        breaker.record_response(response)
+        return response
+
+    async def _post(self, model, payload, headers, give_up_at):
+        import httpx
+        url = f"{self.base_url}/{model}"
+        attempt = 0
+        while True:
+            await self.rate_limiter.aacquire(model, give_up_at)
+            remaining = give_up_at - time.monotonic()
+            if remaining <= 0:
+                raise requests.exceptions.Timeout(f"Inference deadline exceeded for {model}")
+            try:
+                response = await self.client.post(url, headers=headers, json=payload, timeout=remaining)
+            except (httpx.TimeoutException, httpx.TransportError) as e:
+                UPSTREAM_ERRORS.inc(
+                    model=model, error="Timeout" if isinstance(e, httpx.TimeoutException) else "ConnectionError"
+                )
+                delay = self._retry_delay(model, attempt, give_up_at)
+                if delay is None:
+                    if isinstance(e, httpx.TimeoutException):
+                        raise requests.exceptions.Timeout(str(e)) from e
+                    raise requests.exceptions.ConnectionError(str(e)) from e
+            else:
+                UPSTREAM_RESPONSES.inc(model=model, status=str(response.status_code))
+                if is_loading(response):
+                    await aremember_loading(model, _retry_after_seconds(response))
+                if response.status_code not in RETRY_STATUSES:
+                    return _as_requests_response(response)
+                delay = self._retry_delay(model, attempt, give_up_at, response)
+                if delay is None:
+                    return _as_requests_response(response)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+_client = None
+_client_lock = threading.Lock()
+
+# httpx pools are bound to the event loop that created them
+_async_clients = weakref.WeakKeyDictionary()
+
+def _client_options():
+    return {
+        "base_url": settings.HF_API_BASE,
+        "pool_size": settings.HF_POOL_SIZE,
+        "max_retries": settings.HF_MAX_RETRIES,
+        "deadline": settings.HF_REQUEST_DEADLINE,
+        "backoff": settings.HF_RETRY_BACKOFF,
+        "coalesce": settings.HF_COALESCE_CALLS,
+    }
+
+def get_inference_client():
+    """Return this process's shared client, creating it on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = InferenceClient(**_client_options())
+    return _client
+
+def get_async_inference_client():
+    """Return the async client for the running event loop, creating it on first use."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = _async_clients[loop] = AsyncInferenceClient(**_client_options())
+    return client
+
+def _reset_client():
+    # Pooled sockets must not be shared with processes forked by gunicorn or celery
+    global _client, _client_lock, _async_clients
+    _client = None
+    _client_lock = threading.Lock()
+    _async_clients = weakref.WeakKeyDictionary()
+
+os.register_at_fork(after_in_child=_reset_client)
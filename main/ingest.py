@@ -0,0 +1,155 @@
+# backend/main/ingest.py
+"""
+Feed ingestion: poll the INGEST_FEEDS RSS/Atom feeds and analyze new articles before
+anyone asks for them. The analysis goes through the normal pipeline, so it fills the
+result cache, the near-duplicate index and QueryHistory, and a later /api/analyze/
+request for the same URL is answered from the cache.
+
+Feeds are fetched with If-None-Match / If-Modified-Since from the validators saved in
+FeedState, so an unchanged feed costs one 304. An entry is skipped when its URL is
+already in the result cache or in history. Run one cycle by hand with
+`python manage.py ingest_feeds`.
+
+The results only reach the web processes through a shared cache, so set CACHE_URL
+when INGEST_FEEDS is used; without it only the near-duplicate index carries over.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
+
+import requests
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import connections
+from django.utils import timezone
+
+from .cache import normalize_url, result_cache_key
+from .fetch import user_agent
+from .models import FeedState, QueryHistory
+from .pipeline import analyze
+
+logger = logging.getLogger(__name__)
+
+FEED_TYPES = ("application/rss+xml", "application/atom+xml", "application/rdf+xml")
+
+def discover_feed(url):
+    """
+    The feed URL for url: url itself if it is a feed, else the first feed the page
+    links to with <link rel="alternate">, else url.
+    """
+    import feedparser
+    import lxml.html
+    from lxml.etree import ParserError
+    response = requests.get(url, headers={"User-Agent": user_agent()}, timeout=settings.INGEST_FEED_TIMEOUT)
+    response.raise_for_status()
+    parsed = feedparser.parse(response.content, response_headers={
+        "content-location": response.url,
+        "content-type": response.headers.get("Content-Type", ""),
+    })
+    if parsed.version:
+        return url
+    try:
+        page = lxml.html.fromstring(response.content)
+    except (ParserError, ValueError):
+        return url
+    for link in page.iter("link"):
+        rel = (link.get("rel") or "").lower().split()
+        kind = (link.get("type") or "").split(";")[0].strip().lower()
+        if "alternate" in rel and kind in FEED_TYPES and link.get("href"):
+            return urljoin(response.url, link.get("href").strip())
+    return url
+
+def poll_feed(state):
+    """
+    Article links from the feed, newest first, or [] if it is unchanged since the last
+    poll. Updates and saves state.
+    """
+    if not state.feed_url:
+        state.feed_url = discover_feed(state.url)
+    import feedparser
+    headers = {"User-Agent": user_agent()}
+    if state.etag:
+        headers["If-None-Match"] = state.etag
+    if state.last_modified:
+        headers["If-Modified-Since"] = state.last_modified
+    response = requests.get(state.feed_url, headers=headers, timeout=settings.INGEST_FEED_TIMEOUT)
+    state.last_polled_at = timezone.now()
+    state.last_status = response.status_code
+    if response.status_code == 304:
+        state.save()
+        return []
+    response.raise_for_status()
+    parsed = feedparser.parse(response.content, response_headers={
+        "content-location": response.url,
+        "content-type": response.headers.get("Content-Type", ""),
+    })
+    state.etag = response.headers.get("ETag", "")[:256]
+    state.last_modified = response.headers.get("Last-Modified", "")[:64]
+    state.save()
+    links = [entry.get("link") for entry in parsed.entries if entry.get("link")]
+    return links[:settings.INGEST_MAX_PER_FEED]
+
+def new_links(links):
+    """links minus those already analyzed (cached or in history), in order and without repeats."""
+    unique = {}
+    for link in links:
+        unique.setdefault(normalize_url(link), link)
+    try:
+        cached = caches["analyze"].get_many([result_cache_key(url=link) for link in unique.values()])
+    except Exception:
+        logger.exception("Result cache lookup failed during ingestion")
+        cached = {}
+    seen = set(
+        QueryHistory.objects.filter(input_type="url", input_value__in=list(unique) + list(unique.values()))
+        .values_list("input_value", flat=True)
+    )
+    return [
+        link for normalized, link in unique.items()
+        if link not in seen and normalized not in seen and result_cache_key(url=link) not in cached
+    ]
+
+def _analyze_link(url):
+    try:
+        body, status = analyze(url, "", source="ingest")
+        if status != 200:
+            logger.warning("Ingestion of %s failed: %s", url, body.get("error"))
+        return status == 200
+    except Exception:
+        logger.exception("Ingestion of %s failed", url)
+        return False
+    finally:
+        # Pool threads would otherwise keep their database connections open
+        connections.close_all()
+
+def ingest_feeds(feeds=None):
+    """Run one ingestion cycle over feeds (default INGEST_FEEDS). Returns a summary dict."""
+    feeds = settings.INGEST_FEEDS if feeds is None else feeds
+    if feeds and isinstance(caches["analyze"], LocMemCache):
+        logger.warning(
+            "The analyze cache is local to this process (CACHE_URL is not set), so results "
+            "pre-analyzed here will not be served from the cache by the web processes"
+        )
+    stats = {"feeds": len(feeds), "not_modified": 0, "failed_feeds": 0, "entries": 0, "new": 0,
+             "analyzed": 0, "failed": 0}
+    links = []
+    for url in feeds:
+        state, _ = FeedState.objects.get_or_create(url=url)
+        try:
+            entries = poll_feed(state)
+        except Exception:
+            logger.exception("Could not poll feed %s", url)
+            stats["failed_feeds"] += 1
+            continue
+        if state.last_status == 304:
+            stats["not_modified"] += 1
+        stats["entries"] += len(entries)
+        links += entries
+    links = new_links(links)
+    stats["new"] = len(links)
+    if links:
+        with ThreadPoolExecutor(max_workers=settings.INGEST_CONCURRENCY, thread_name_prefix="ingest") as pool:
+            for ok in pool.map(_analyze_link, links):
+                stats["analyzed" if ok else "failed"] += 1
+    logger.info("Feed ingestion: %s", stats)
+    return stats
@@ -0,0 +1,138 @@
+# backend/main/local_engine.py
+"""
+CPU-only summarizer and classifier used when HuggingFace is not wanted or not reachable.
+Both run in a few milliseconds on a typical article and need no network or model files.
+"""
+import re
+from collections import Counter
+
+import numpy as np
+
+from .utils import split_sentences
+
+WORD = re.compile(r"[a-z0-9']+")
+
+# Function words carry no topical signal for sentence similarity
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are as at be because been before
+being below between both but by can could did do does doing down during each few for from
+further had has have having he her here hers herself him himself his how i if in into is it
+its itself just me more most my myself no nor not now of off on once only or other our ours
+ourselves out over own same she should so some such than that the their theirs them
+themselves then there these they this those through to too under until up very was we were
+what when where which while who whom why will with would you your yours yourself yourselves
+said says mr mrs ms
+""".split())
+
+# Only the opening sentences are ranked so very long articles stay in the millisecond range
+MAX_RANKED_SENTENCES = 200
+
+def _tokens(sentence):
+    return [word for word in WORD.findall(sentence.lower()) if word not in STOPWORDS and len(word) > 1]
+
+def _similarity_matrix(token_lists):
+    """Cosine similarity between TF-IDF sentence vectors, with a zero diagonal."""
+    vocabulary = {}
+    for tokens in token_lists:
+        for token in tokens:
+            vocabulary.setdefault(token, len(vocabulary))
+    counts = np.zeros((len(token_lists), max(len(vocabulary), 1)))
+    for row, tokens in enumerate(token_lists):
+        for token, count in Counter(tokens).items():
+            counts[row, vocabulary[token]] = count
+    document_frequency = np.count_nonzero(counts, axis=0)
+    idf = np.log((1 + len(token_lists)) / (1 + document_frequency)) + 1
+    vectors = counts * idf
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+    similarity = vectors @ vectors.T
+    np.fill_diagonal(similarity, 0.0)
+    return similarity
+
+def _pagerank(similarity, damping=0.85, iterations=100, tolerance=1e-6):
+    """Power iteration over the row-normalized similarity graph."""
+    size = similarity.shape[0]
+    row_sums = similarity.sum(axis=1, keepdims=True)
+    # Sentences that share no words with any other sentence link to everything uniformly
+    transition = np.where(row_sums > 0, similarity / np.where(row_sums > 0, row_sums, 1), 1.0 / size)
+    scores = np.full(size, 1.0 / size)
+    for _ in range(iterations):
+        updated = (1 - damping) / size + damping * (transition.T @ scores)
+        if np.abs(updated - scores).sum() < tolerance:
+            return updated
+        scores = updated
+    return scores
+
+def textrank_summary(text, sentence_count=3):
+    """Extractive summary: the top-ranked sentences by TextRank, in their original order."""
+    sentences = split_sentences(text)[:MAX_RANKED_SENTENCES]
+    if len(sentences) <= sentence_count:
+        return " ".join(sentences)
+    scores = _pagerank(_similarity_matrix([_tokens(sentence) for sentence in sentences]))
+    # Stable sort keeps the earlier sentence on ties, which suits news writing
+    chosen = sorted(np.argsort(-scores, kind="stable")[:sentence_count])
+    return " ".join(sentences[index] for index in chosen)
+
+# Cue phrases and weights per label. Real news leans on attribution and specifics,
+# opinion on first person and judgement, fake news on sensationalism and calls to share.
+LABEL_CUES = {
+    "real news": (
+        ["according to", "said in a statement", "told reporters", "officials said", "reported",
+         "spokesperson", "spokesman", "data show", "percent", "announced", "confirmed"],
+        1.0,
+    ),
+    "opinion": (
+        ["i think", "i believe", "in my view", "in my opinion", "we must", "we should", "should be",
+         "it is time", "frankly", "clearly", "op-ed", "opinion", "editorial"],
+        1.2,
+    ),
+    "fake news": (
+        ["you won't believe", "shocking", "share before", "they don't want you", "wake up",
+         "mainstream media won't", "miracle", "exposed", "banned", "secret cure", "hoax",
+         "100%", "doctors hate", "cover-up", "deep state"],
+        1.5,
+    ),
+    "satire": (
+        ["satire", "satirical", "the onion", "babylon bee", "area man", "area woman",
+         "nation's", "local man", "sources confirm that", "unveils new"],
+        1.8,
+    ),
+}
+
+def _style_scores(text):
+    """Scores from surface features that don't depend on a cue list."""
+    words = WORD.findall(text.lower()) or [""]
+    letters = [char for char in text if char.isalpha()] or ["a"]
+    shouting = sum(char.isupper() for char in letters) / len(letters)
+    exclamations = text.count("!") / max(len(split_sentences(text)), 1)
+    first_person = sum(word in ("i", "me", "my", "we", "our") for word in words) / len(words)
+    quotes = text.count('"') + text.count("“")
+    digits = sum(any(char.isdigit() for char in word) for word in words) / len(words)
+    return {
+        "real news": min(quotes, 6) * 0.25 + min(digits * 8, 1.5),
+        "opinion": first_person * 40,
+        "fake news": max(shouting - 0.15, 0) * 10 + exclamations * 3,
+        "satire": 0.0,
+    }
+
+def classify_text(text, temperature=2.0):
+    """
+    Lexicon and style based zero-shot stand-in. Returns a dict shaped like the
+    HuggingFace zero-shot response: labels sorted by score, scores summing to 1.
+    """
+    lowered = text.lower()
+    scores = _style_scores(text)
+    for label, (cues, weight) in LABEL_CUES.items():
+        # Diminishing returns so long articles don't become certain just by repetition
+        scores[label] += weight * np.log1p(sum(lowered.count(cue) for cue in cues))
+    # Without any signal, plain reporting is the most common case
+    scores["real news"] += 0.5
+    labels = list(scores)
+    logits = np.array([scores[label] for label in labels]) / temperature
+    probabilities = np.exp(logits - logits.max())
+    probabilities /= probabilities.sum()
+    order = np.argsort(-probabilities, kind="stable")
+    return {
+        "labels": [labels[index] for index in order],
+        "scores": [float(probabilities[index]) for index in order],
+    }
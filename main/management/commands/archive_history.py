@@ -0,0 +1,33 @@
+# backend/main/management/commands/archive_history.py
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from main.archive import archive_history, prune_fingerprints
+
+class Command(BaseCommand):
+    help = (
+        "Move history rows older than the retention age into gzipped JSONL files under ARCHIVE_DIR "
+        "and delete them from the table (the Celery beat task, run in-process)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=settings.HISTORY_RETENTION_DAYS,
+                            help="Keep this many whole UTC days of history (default HISTORY_RETENTION_DAYS).")
+        parser.add_argument("--batch-size", type=int, default=settings.ARCHIVE_BATCH_SIZE,
+                            help="Rows archived and deleted per batch.")
+        parser.add_argument("--dry-run", action="store_true", help="Only report what would be archived.")
+
+    def handle(self, *args, **options):
+        if options["days"] <= 0:
+            raise CommandError("Retention is off (HISTORY_RETENTION_DAYS=0); pass --days to archive anyway.")
+        stats = archive_history(options["days"], options["batch_size"], options["dry_run"])
+        if options["dry_run"]:
+            self.stdout.write(
+                f"Would archive {stats['archived']} rows from {stats['days']} days created before {stats['cutoff']}."
+            )
+            return
+        pruned = prune_fingerprints(options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {stats['archived']} rows into {stats['days']} daily partitions and deleted {stats['deleted']} "
+            f"created before {stats['cutoff']}; pruned {pruned} near-duplicate fingerprints."
+        ))
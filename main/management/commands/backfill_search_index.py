@@ -0,0 +1,17 @@
+# backend/main/management/commands/backfill_search_index.py
+from django.core.management.base import BaseCommand
+
+from main.search import backfill_search_index
+
+class Command(BaseCommand):
+    help = (
+        "Index history rows missing from the full-text search index (Postgres), or rebuild "
+        "the FTS5 table from the history table (SQLite)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="Rows updated per statement on Postgres.")
+
+    def handle(self, *args, **options):
+        indexed = backfill_search_index(options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Search index backfilled: {indexed} rows indexed."))
@@ -0,0 +1,242 @@
+# backend/main/management/commands/benchmark.py
+import asyncio
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import requests
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import RequestFactory
+
+from main import inference
+from main.admission import analyze_admission
+from main.history import flush_history
+from main.management.commands.hf_stub import add_stub_arguments, stub_from_options
+from main.utils import summarize_text, classify_fake_news_ensemble, is_summary_error
+
+TARGETS = ("view", "async-view", "summarize", "classify")
+
+WORDS = (
+    "the council said officials report budget transit city plan vote year data new public "
+    "according statement minister election court market growth health school police study"
+).split()
+
+def _article(number, length):
+    """Deterministic synthetic article of roughly length characters."""
+    words, sentences = [], []
+    position = number
+    while sum(len(sentence) + 1 for sentence in sentences) < length:
+        words = [WORDS[(position * 7 + i * 3) % len(WORDS)] for i in range(12)]
+        sentences.append(f"Report {number}: " + " ".join(words).capitalize() + ".")
+        position += 1
+    return " ".join(sentences)[:length]
+
+def _percentile(sorted_values, percent):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(percent / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def _start_stub(options):
+    """Serve the HF stub from a background thread; returns (base URL, stub, server)."""
+    import uvicorn
+    stub = stub_from_options(options)
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(stub, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}", stub, server
+
+class Command(BaseCommand):
+    help = (
+        "Drive the analyze pipeline against a local HuggingFace stub at a given concurrency "
+        "and report throughput, latency percentiles and upstream call counts as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--target", choices=TARGETS, default="view")
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--concurrency", type=int, default=16)
+        parser.add_argument(
+            "--distinct", type=int, default=None,
+            help="Number of distinct inputs to cycle through (default: all distinct, so no cache hits).",
+        )
+        parser.add_argument("--text-length", type=int, default=2000)
+        parser.add_argument(
+            "--stub-url", default=None,
+            help="Use an already running stub (python manage.py hf_stub) instead of starting one.",
+        )
+        parser.add_argument(
+            "--admission-limits", action="store_true",
+            help="Keep the configured ANALYZE_MAX_CONCURRENT/ANALYZE_MAX_QUEUED instead of admitting "
+                 "--concurrency requests at once; 503 rejections are reported separately.",
+        )
+        parser.add_argument("--output", default=None, help="Write the JSON report to this file.")
+        add_stub_arguments(parser)
+
+    def handle(self, *args, **options):
+        server = None
+        if options["stub_url"]:
+            base_url = options["stub_url"].rstrip("/")
+        else:
+            base_url, _, server = _start_stub(options)
+        settings.HF_API_BASE = f"{base_url}/models"
+        os.environ.setdefault("HF_API_KEY", "benchmark")
+        inference._reset_client()
+        caches["analyze"].clear()
+
+        # Measure the pipeline, not load shedding: admit every concurrent request
+        limits = analyze_admission.max_active, analyze_admission.max_queued
+        if not options["admission_limits"]:
+            analyze_admission.max_active = max(analyze_admission.max_active, options["concurrency"])
+
+        # Views write QueryHistory, so run against a throwaway test database. On SQLite it is
+        # a file rather than shared-cache memory, whose table locks ignore the busy timeout
+        # and fail concurrent writers
+        old_name = connection.settings_dict["NAME"]
+        test_file = None
+        if connection.vendor == "sqlite":
+            test_file = os.path.join(tempfile.gettempdir(), f"benchmark-{os.getpid()}.sqlite3")
+            connection.settings_dict.setdefault("TEST", {})["NAME"] = test_file
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            requests.post(f"{base_url}/reset", timeout=5)
+            report = self._run(options)
+            report["upstream"] = requests.get(f"{base_url}/stats", timeout=5).json()
+        finally:
+            # Write buffered history rows while their table still exists
+            flush_history()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            if test_file:
+                for suffix in ("-wal", "-shm"):
+                    if os.path.exists(test_file + suffix):
+                        os.remove(test_file + suffix)
+            analyze_admission.max_active, analyze_admission.max_queued = limits
+            if server:
+                server.should_exit = True
+
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as handle:
+                handle.write(output + "\n")
+        self.stdout.write(output)
+
+    def _run(self, options):
+        total = options["requests"]
+        distinct = options["distinct"] or total
+        texts = [_article(number, options["text_length"]) for number in range(distinct)]
+        inputs = [texts[index % distinct] for index in range(total)]
+        target = options["target"]
+
+        started = time.perf_counter()
+        if target == "async-view":
+            results = asyncio.run(self._run_async(inputs, options["concurrency"]))
+        else:
+            call = {"view": self._call_view, "summarize": self._call_summarize, "classify": self._call_classify}[target]
+            with ThreadPoolExecutor(max_workers=options["concurrency"]) as pool:
+                results = list(pool.map(self._timed(call), inputs))
+        wall = time.perf_counter() - started
+
+        # Requests turned away by admission control say nothing about pipeline latency
+        latencies = sorted(latency for latency, outcome in results if outcome != "rejected")
+        return {
+            "target": target,
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "requests": total,
+            "distinct_inputs": distinct,
+            "concurrency": options["concurrency"],
+            "text_length": options["text_length"],
+            "wall_seconds": round(wall, 3),
+            "throughput_rps": round(total / wall, 2) if wall else 0.0,
+            "latency_ms": {
+                "p50": round(_percentile(latencies, 50), 1),
+                "p95": round(_percentile(latencies, 95), 1),
+                "p99": round(_percentile(latencies, 99), 1),
+                "mean": round(sum(latencies) / len(latencies), 1) if latencies else 0.0,
+                "max": round(latencies[-1], 1) if latencies else 0.0,
+            },
+            "errors": sum(1 for _, outcome in results if outcome == "error"),
+            "rejected": sum(1 for _, outcome in results if outcome == "rejected"),
+            "stub": {
+                "latency": options["latency"],
+                "jitter": options["jitter"],
+                "rate_limit_ratio": options["rate_limit_ratio"],
+                "loading_ratio": options["loading_ratio"],
+                "estimated_time": options["estimated_time"],
+            },
+            "settings": {
+                "INFERENCE_BACKEND": settings.INFERENCE_BACKEND,
+                "PIPELINE_MAX_WORKERS": settings.PIPELINE_MAX_WORKERS,
+                "HF_POOL_SIZE": settings.HF_POOL_SIZE,
+                "HF_MAX_RETRIES": settings.HF_MAX_RETRIES,
+                "HF_REQUEST_DEADLINE": settings.HF_REQUEST_DEADLINE,
+                "SUMMARY_LONG_DOCUMENTS": settings.SUMMARY_LONG_DOCUMENTS,
+                "ANALYZE_MAX_CONCURRENT": analyze_admission.max_active,
+                "ANALYZE_MAX_QUEUED": analyze_admission.max_queued,
+            },
+        }
+
+    @staticmethod
+    def _timed(call):
+        def run(text):
+            started = time.perf_counter()
+            outcome = call(text)
+            return (time.perf_counter() - started) * 1000, outcome
+        return run
+
+    @staticmethod
+    def _outcome(status, data):
+        """"ok", "rejected" (503 from admission control) or "error" for one analyze response."""
+        if status == 503:
+            return "rejected"
+        ok = status == 200 and not is_summary_error(data["summary"]) and not data["details"].get("error")
+        return "ok" if ok else "error"
+
+    @staticmethod
+    def _call_view(text):
+        from main.views import AnalyzeView
+        request = RequestFactory().post(
+            "/api/analyze/", data=json.dumps({"text": text}), content_type="application/json"
+        )
+        response = AnalyzeView.as_view()(request)
+        return Command._outcome(response.status_code, response.data)
+
+    @staticmethod
+    def _call_summarize(text):
+        return "error" if is_summary_error(summarize_text(text)) else "ok"
+
+    @staticmethod
+    def _call_classify(text):
+        return "error" if classify_fake_news_ensemble(text)[2].get("error") else "ok"
+
+    async def _run_async(self, inputs, concurrency):
+        from main.views import analyze_async_view
+        semaphore = asyncio.Semaphore(concurrency)
+        factory = RequestFactory()
+
+        async def one(text):
+            async with semaphore:
+                request = factory.post(
+                    "/api/analyze/", data=json.dumps({"text": text}), content_type="application/json"
+                )
+                started = time.perf_counter()
+                response = await analyze_async_view(request)
+                latency = (time.perf_counter() - started) * 1000
+                return latency, self._outcome(response.status_code, json.loads(response.content))
+
+        return await asyncio.gather(*[one(text) for text in inputs])
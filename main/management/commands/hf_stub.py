@@ -0,0 +1,146 @@
+# backend/main/management/commands/hf_stub.py
+import asyncio
+import json
+import random
+import threading
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+
+class HFStub:
+    """
+    ASGI app that mimics the HuggingFace Inference API for bart-large-cnn and
+    bart-large-mnli, with configurable latency, 429s and "model loading" answers.
+    GET /stats returns call counts by model and status; POST /reset clears them.
+    """
+
+    def __init__(self, latency=0.5, jitter=0.1, rate_limit_ratio=0.0, loading_ratio=0.0,
+                 estimated_time=2.0, retry_after=1, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit_ratio = rate_limit_ratio
+        self.loading_ratio = loading_ratio
+        self.estimated_time = estimated_time
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.calls = Counter()
+        self.inputs = Counter()
+        self.lock = threading.Lock()
+
+    def stats(self):
+        with self.lock:
+            calls = {}
+            for (model, status), count in self.calls.items():
+                calls.setdefault(model, {})[str(status)] = count
+            return {"calls": calls, "inputs": dict(self.inputs)}
+
+    def reset(self):
+        with self.lock:
+            self.calls.clear()
+            self.inputs.clear()
+
+    def _summary(self, text):
+        return {"summary_text": " ".join(str(text).split()[:30])}
+
+    def _classification(self, text):
+        scores = sorted((self.random.random() for _ in range(4)), reverse=True)
+        total = sum(scores)
+        return {
+            "sequence": text,
+            "labels": ["real news", "fake news", "opinion", "satire"],
+            "scores": [score / total for score in scores],
+        }
+
+    def _answer(self, model, body):
+        roll = self.random.random()
+        if roll < self.rate_limit_ratio:
+            return 429, {"error": "Rate limit reached. Please log in or use a HF API token"}, [
+                (b"retry-after", str(self.retry_after).encode()),
+            ]
+        if roll < self.rate_limit_ratio + self.loading_ratio:
+            return 503, {
+                "error": f"Model {model} is currently loading",
+                "estimated_time": self.estimated_time,
+            }, []
+        inputs = body.get("inputs", "")
+        build = self._summary if "cnn" in model else self._classification
+        if isinstance(inputs, list):
+            return 200, [build(item) for item in inputs], []
+        return 200, [build(inputs)] if "cnn" in model else build(inputs), []
+
+    async def _read_body(self, receive):
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                return body
+
+    async def _send(self, send, status, payload, headers=()):
+        data = json.dumps(payload).encode()
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json"), *headers],
+        })
+        await send({"type": "http.response.body", "body": data})
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                await send({"type": message["type"] + ".complete"})
+                if message["type"] == "lifespan.shutdown":
+                    return
+        path = scope["path"]
+        body = await self._read_body(receive)
+        if path == "/stats":
+            return await self._send(send, 200, self.stats())
+        if path == "/reset":
+            self.reset()
+            return await self._send(send, 200, {"reset": True})
+        model = path.split("/models/", 1)[-1]
+        try:
+            payload = json.loads(body or b"{}")
+        except ValueError:
+            return await self._send(send, 400, {"error": "Invalid JSON"})
+        await asyncio.sleep(max(0.0, self.random.gauss(self.latency, self.jitter)))
+        status, answer, headers = self._answer(model, payload)
+        inputs = payload.get("inputs")
+        with self.lock:
+            self.calls[(model, status)] += 1
+            self.inputs[model] += len(inputs) if isinstance(inputs, list) else 1
+        await self._send(send, status, answer, headers)
+
+def add_stub_arguments(parser):
+    parser.add_argument("--latency", type=float, default=0.5, help="Mean upstream latency in seconds.")
+    parser.add_argument("--jitter", type=float, default=0.1, help="Standard deviation of the latency.")
+    parser.add_argument("--rate-limit-ratio", type=float, default=0.0, help="Share of calls answered with 429.")
+    parser.add_argument("--loading-ratio", type=float, default=0.0, help="Share of calls answered with 503 model loading.")
+    parser.add_argument("--estimated-time", type=float, default=2.0, help="estimated_time sent with loading answers.")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with 429 answers.")
+    parser.add_argument("--seed", type=int, default=None)
+
+def stub_from_options(options):
+    return HFStub(
+        latency=options["latency"],
+        jitter=options["jitter"],
+        rate_limit_ratio=options["rate_limit_ratio"],
+        loading_ratio=options["loading_ratio"],
+        estimated_time=options["estimated_time"],
+        retry_after=options["retry_after"],
+        seed=options["seed"],
+    )
+
+class Command(BaseCommand):
+    help = "Run a local stand-in for the HuggingFace Inference API (point HF_API_BASE at http://host:port/models)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8001)
+        add_stub_arguments(parser)
+
+    def handle(self, *args, **options):
+        import uvicorn
+        self.stdout.write(f"HF stub listening on http://{options['host']}:{options['port']}/models")
+        uvicorn.run(stub_from_options(options), host=options["host"], port=options["port"], log_level="warning")
@@ -0,0 +1,17 @@
+# backend/main/management/commands/link_feedback.py
+from django.core.management.base import BaseCommand
+
+from main.accuracy import link_feedback
+
+class Command(BaseCommand):
+    help = (
+        "Link feedback saved without a history_id to the history row it is about, matched on "
+        "article title and label (the latest analysis before the feedback)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="Feedback rows updated per statement.")
+
+    def handle(self, *args, **options):
+        linked = link_feedback(options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Linked {linked} feedback rows to history."))
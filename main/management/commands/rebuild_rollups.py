@@ -0,0 +1,11 @@
+# backend/main/management/commands/rebuild_rollups.py
+from django.core.management.base import BaseCommand
+
+from main.rollups import rebuild_rollups
+
+class Command(BaseCommand):
+    help = "Recompute the hourly/daily history, latency and feedback rollups from the full tables."
+
+    def handle(self, *args, **options):
+        written = rebuild_rollups()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt rollups: {written} rows written."))
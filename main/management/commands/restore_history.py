@@ -0,0 +1,33 @@
+# backend/main/management/commands/restore_history.py
+import os
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from main.archive import partition_path, restore_partition
+from main.models import ArchivePartition
+
+class Command(BaseCommand):
+    help = "Reload archived history rows for one or more UTC days back into the history table."
+
+    def add_arguments(self, parser):
+        parser.add_argument("days", nargs="*", help="Partition days as YYYY-MM-DD.")
+        parser.add_argument("--list", action="store_true", help="List archived partitions instead.")
+
+    def handle(self, *args, **options):
+        if options["list"]:
+            for partition in ArchivePartition.objects.order_by("day"):
+                restored = f", restored {partition.restored_at:%Y-%m-%d %H:%M}" if partition.restored_at else ""
+                self.stdout.write(f"{partition.day}  {partition.rows} rows  {partition.size_bytes} bytes{restored}")
+            return
+        if not options["days"]:
+            raise CommandError("Give at least one day (YYYY-MM-DD), or --list.")
+        for value in options["days"]:
+            try:
+                day = date.fromisoformat(value)
+            except ValueError:
+                raise CommandError(f"Not a YYYY-MM-DD date: {value}")
+            if not os.path.exists(partition_path(day)):
+                raise CommandError(f"No archive partition for {day} at {partition_path(day)}")
+            restored = restore_partition(day)
+            self.stdout.write(self.style.SUCCESS(f"Restored {restored} rows from {day}."))
@@ -0,0 +1,140 @@
+# backend/main/management/commands/startup_benchmark.py
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from main.management.commands.benchmark import _free_port
+
+# Run in a fresh interpreter: Django setup plus everything the URLconf imports
+IMPORT_SCRIPT = """
+import json, os, time
+started = time.perf_counter()
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "news_summarizer.settings")
+import django
+django.setup()
+setup_done = time.perf_counter()
+import news_summarizer.urls
+print(json.dumps({
+    "setup_ms": (setup_done - started) * 1000,
+    "urlconf_ms": (time.perf_counter() - setup_done) * 1000,
+}))
+"""
+
+IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+SERVERS = {
+    "wsgi": ["-m", "gunicorn", "news_summarizer.wsgi:application", "--workers", "1", "--bind"],
+    "asgi": ["-m", "uvicorn", "news_summarizer.asgi:application", "--workers", "1", "--log-level", "warning",
+             "--port"],
+}
+
+def _slowest_imports(stderr, count):
+    """Top-level imports from -X importtime output, slowest first, in milliseconds."""
+    modules = {}
+    for self_us, cumulative_us, indent, name in IMPORT_LINE.findall(stderr):
+        if len(indent) == 1:
+            modules[name] = round(int(cumulative_us) / 1000, 1)
+    return dict(sorted(modules.items(), key=lambda item: -item[1])[:count])
+
+def _summary(values):
+    values = sorted(values)
+    return {"median": round(statistics.median(values), 1), "min": round(values[0], 1), "max": round(values[-1], 1)}
+
+class Command(BaseCommand):
+    help = (
+        "Measure cold-start cost in fresh processes: import time of Django setup and the "
+        "URLconf, and time from launching a server to its first /api/ response. Reports JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=3)
+        parser.add_argument("--server", choices=sorted(SERVERS), default="wsgi")
+        parser.add_argument(
+            "--prewarm", choices=["", "background", "eager"], default=None,
+            help="PREWARM_IMPORTS for the measured processes (default: current setting).",
+        )
+        parser.add_argument("--top", type=int, default=10, help="How many of the slowest imports to list.")
+        parser.add_argument("--timeout", type=float, default=60)
+        parser.add_argument(
+            "--max-first-response-ms", type=float, default=None,
+            help="Exit with an error when the median time to the first /api/ response is above this.",
+        )
+        parser.add_argument("--output", default=None, help="Write the JSON report to this file.")
+
+    def handle(self, *args, **options):
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": "news_summarizer.settings"}
+        env["PREWARM_IMPORTS"] = settings.PREWARM_IMPORTS if options["prewarm"] is None else options["prewarm"]
+        imports, slowest, first, second = [], {}, [], []
+        for _ in range(options["runs"]):
+            measured, slowest = self._measure_imports(env, options["top"])
+            imports.append(measured)
+            first_ms, second_ms = self._measure_server(env, options["server"], options["timeout"])
+            first.append(first_ms)
+            second.append(second_ms)
+        report = {
+            "server": options["server"],
+            "prewarm": env["PREWARM_IMPORTS"] or "off",
+            "runs": options["runs"],
+            "django_setup_ms": _summary([run["setup_ms"] for run in imports]),
+            "urlconf_import_ms": _summary([run["urlconf_ms"] for run in imports]),
+            "first_response_ms": _summary(first),
+            "second_response_ms": _summary(second),
+            "slowest_imports_ms": slowest,
+        }
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as handle:
+                handle.write(output + "\n")
+        self.stdout.write(output)
+        limit = options["max_first_response_ms"]
+        if limit is not None and report["first_response_ms"]["median"] > limit:
+            raise CommandError(
+                f"Median time to first response {report['first_response_ms']['median']}ms exceeds {limit}ms."
+            )
+
+    def _measure_imports(self, env, top):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", IMPORT_SCRIPT],
+            env=env, cwd=settings.BASE_DIR, capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            raise CommandError(f"Import run failed:\n{result.stderr[-2000:]}")
+        return json.loads(result.stdout.strip().splitlines()[-1]), _slowest_imports(result.stderr, top)
+
+    def _measure_server(self, env, server, timeout):
+        """(ms from launch to the first 200 from /api/, ms for the next request)."""
+        port = _free_port()
+        address = f"127.0.0.1:{port}" if server == "wsgi" else str(port)
+        url = f"http://127.0.0.1:{port}/api/"
+        started = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, *SERVERS[server], address],
+            env=env, cwd=settings.BASE_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+        )
+        try:
+            while True:
+                if process.poll() is not None:
+                    raise CommandError(f"{server} server exited early:\n{process.stderr.read().decode()[-2000:]}")
+                if time.perf_counter() - started > timeout:
+                    raise CommandError(f"No response from {url} within {timeout}s.")
+                try:
+                    if requests.get(url, timeout=timeout).status_code == 200:
+                        break
+                except requests.exceptions.ConnectionError:
+                    pass
+                time.sleep(0.01)
+            first_ms = (time.perf_counter() - started) * 1000
+            again = time.perf_counter()
+            requests.get(url, timeout=timeout)
+            return first_ms, (time.perf_counter() - again) * 1000
+        finally:
+            process.terminate()
+            process.wait(timeout=10)
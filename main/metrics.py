@@ -0,0 +1,182 @@
+# backend/main/metrics.py
+"""
+In-process request metrics, rendered in the Prometheus text format at /api/metrics/.
+Every worker process keeps its own numbers, so scrape each worker (or sum them).
+
+Pipeline code wraps its work in `with stage("fetch"): ...`. The duration always goes
+into the stage histogram, and into the request's StageTimer when one is active, which
+is how the Server-Timing header and QueryHistory.stage_timings are filled in.
+"""
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds; spans cache lookups through slow upstream calls
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+
+def _label_text(labels):
+    if not labels:
+        return ""
+    escaped = (
+        (name, str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'))
+        for name, value in labels
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self):
+        with self.lock:
+            return [(self.name, key, value) for key, value in sorted(self.values.items())]
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with self.lock:
+            self.values[tuple(sorted(labels.items()))] = value
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            series = self.series.setdefault(key, {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0})
+            # Bucket counts are cumulative, as the exposition format expects
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["buckets"][index] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def samples(self):
+        samples = []
+        with self.lock:
+            for key, series in sorted(self.series.items()):
+                for bound, count in zip(self.buckets, series["buckets"]):
+                    samples.append((f"{self.name}_bucket", key + (("le", _number(float(bound))),), count))
+                samples.append((f"{self.name}_bucket", key + (("le", "+Inf"),), series["count"]))
+                samples.append((f"{self.name}_sum", key, series["sum"]))
+                samples.append((f"{self.name}_count", key, series["count"]))
+        return samples
+
+REGISTRY = []
+
+def register(metric):
+    REGISTRY.append(metric)
+    return metric
+
+STAGE_SECONDS = register(Histogram(
+    "analyze_stage_duration_seconds", "Time spent in each analyze pipeline stage.",
+))
+REQUEST_SECONDS = register(Histogram(
+    "analyze_request_duration_seconds", "End-to-end analyze request time.",
+))
+REQUESTS = register(Counter("analyze_requests_total", "Analyze requests by HTTP status and cache outcome."))
+UPSTREAM_RESPONSES = register(Counter(
+    "upstream_responses_total", "HuggingFace responses by model and HTTP status.",
+))
+UPSTREAM_ERRORS = register(Counter(
+    "upstream_errors_total", "HuggingFace calls that got no response, by model and error.",
+))
+UPSTREAM_RETRIES = register(Counter("upstream_retries_total", "HuggingFace retries by model and reason."))
+UPSTREAM_THROTTLED = register(Counter(
+    "upstream_throttled_total", "Times a HuggingFace call waited for the per-model rate limit.",
+))
+UPSTREAM_SHORT_CIRCUITED = register(Counter(
+    "upstream_short_circuited_total", "HuggingFace calls skipped because the circuit was open or the model loading.",
+))
+CIRCUIT_OPEN = register(Gauge("upstream_circuit_open", "1 while a model's circuit breaker is open."))
+UPSTREAM_COALESCED = register(Counter(
+    "upstream_coalesced_total", "HuggingFace calls answered by an identical call already in flight.",
+))
+ANALYZE_IN_FLIGHT = register(Gauge("analyze_in_flight", "Analyses running in this process."))
+ANALYZE_QUEUED = register(Gauge("analyze_queued", "Analyses waiting for a slot in this process."))
+ANALYZE_REJECTED = register(Counter(
+    "analyze_rejected_total", "Analyses turned away with 503 because the process was at capacity.",
+))
+
+def render():
+    """All registered metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.help_text}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for name, labels, value in metric.samples():
+            lines.append(f"{name}{_label_text(labels)} {_number(value)}")
+    return "\n".join(lines) + "\n"
+
+_current_timer = contextvars.ContextVar("stage_timer", default=None)
+
+class StageTimer:
+    """Stage durations for one request, in milliseconds, in the order they finished."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.lock = threading.Lock()
+
+    def record(self, name, milliseconds):
+        with self.lock:
+            self.stages[name] = round(self.stages.get(name, 0) + milliseconds, 1)
+
+    def total_ms(self):
+        return round((time.perf_counter() - self.started) * 1000, 1)
+
+    def timings(self):
+        with self.lock:
+            return dict(self.stages)
+
+    def server_timing(self):
+        """Server-Timing header value, ending with the total so far."""
+        parts = [f"{name};dur={duration}" for name, duration in self.timings().items()]
+        return ", ".join(parts + [f"total;dur={self.total_ms()}"])
+
+    @contextmanager
+    def activate(self):
+        token = _current_timer.set(self)
+        try:
+            yield self
+        finally:
+            _current_timer.reset(token)
+
+@contextmanager
+def stage(name):
+    """Time the enclosed block as pipeline stage name."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, stage=name)
+        timer = _current_timer.get()
+        if timer is not None:
+            timer.record(name, elapsed * 1000)
+
+def observe_request(status, cache_hit, seconds):
+    REQUESTS.inc(status=status, cache_hit=str(bool(cache_hit)).lower())
+    REQUEST_SECONDS.observe(seconds)
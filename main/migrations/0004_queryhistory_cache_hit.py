@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0003_queryhistory_duration_ms"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="queryhistory",
+            name="cache_hit",
+            field=models.BooleanField(default=False),
+        ),
+    ]
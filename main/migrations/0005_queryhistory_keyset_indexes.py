@@ -0,0 +1,25 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0004_queryhistory_cache_hit"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="queryhistory",
+            index=models.Index(fields=["-created_at", "-id"], name="history_created_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="queryhistory",
+            index=models.Index(fields=["fake_news_label", "-created_at", "-id"], name="history_label_created_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="queryhistory",
+            index=models.Index(fields=["input_type", "-created_at", "-id"], name="history_type_created_idx"),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0005_queryhistory_keyset_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FeedbackRollup",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("period", models.CharField(choices=[("hour", "Hour"), ("day", "Day")], max_length=4)),
+                ("bucket_start", models.DateTimeField()),
+                ("fake_news_label", models.CharField(max_length=16)),
+                ("user_feedback", models.CharField(max_length=16)),
+                ("count", models.IntegerField(default=0)),
+            ],
+            options={
+                "constraints": [models.UniqueConstraint(fields=("period", "bucket_start", "fake_news_label", "user_feedback"), name="feedback_rollup_cell")],
+            },
+        ),
+        migrations.CreateModel(
+            name="HistoryRollup",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("period", models.CharField(choices=[("hour", "Hour"), ("day", "Day")], max_length=4)),
+                ("bucket_start", models.DateTimeField()),
+                ("fake_news_label", models.CharField(max_length=16)),
+                ("input_type", models.CharField(max_length=10)),
+                ("count", models.IntegerField(default=0)),
+                ("cache_hits", models.IntegerField(default=0)),
+                ("duration_total_ms", models.BigIntegerField(default=0)),
+            ],
+            options={
+                "constraints": [models.UniqueConstraint(fields=("period", "bucket_start", "fake_news_label", "input_type"), name="history_rollup_cell")],
+            },
+        ),
+        migrations.CreateModel(
+            name="LatencyRollup",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("period", models.CharField(choices=[("hour", "Hour"), ("day", "Day")], max_length=4)),
+                ("bucket_start", models.DateTimeField()),
+                ("le_ms", models.IntegerField()),
+                ("count", models.IntegerField(default=0)),
+            ],
+            options={
+                "constraints": [models.UniqueConstraint(fields=("period", "bucket_start", "le_ms"), name="latency_rollup_cell")],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0006_analytics_rollups"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="queryhistory",
+            name="stage_timings",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0007_queryhistory_stage_timings"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArticleFingerprint",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("signature", models.BinaryField()),
+                ("title", models.CharField(blank=True, max_length=512)),
+                ("summary", models.TextField()),
+                ("fake_news_label", models.CharField(max_length=16)),
+                ("fake_news_confidence", models.FloatField()),
+                ("details", models.JSONField(blank=True, default=dict)),
+                ("created_at", models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="ArticleBucket",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("key", models.BigIntegerField(db_index=True)),
+                ("fingerprint", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="buckets", to="main.articlefingerprint")),
+            ],
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0008_near_duplicate_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FeedState",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("url", models.URLField(max_length=1024, unique=True)),
+                ("feed_url", models.URLField(blank=True, max_length=1024)),
+                ("etag", models.CharField(blank=True, max_length=256)),
+                ("last_modified", models.CharField(blank=True, max_length=64)),
+                ("last_polled_at", models.DateTimeField(blank=True, null=True)),
+                ("last_status", models.IntegerField(blank=True, null=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,88 @@
+# Full-text index over QueryHistory.article_title and summary, kept in sync by
+# database triggers: a GIN-indexed tsvector column on Postgres, an FTS5 table on SQLite.
+
+from django.db import migrations
+
+POSTGRES_INSTALL = [
+    "ALTER TABLE main_queryhistory ADD COLUMN search_vector tsvector",
+    """
+    CREATE FUNCTION main_queryhistory_search_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('english', coalesce(NEW.article_title, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(NEW.summary, '')), 'B');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER main_queryhistory_search_update
+    BEFORE INSERT OR UPDATE OF article_title, summary ON main_queryhistory
+    FOR EACH ROW EXECUTE FUNCTION main_queryhistory_search_update()
+    """,
+    "CREATE INDEX history_search_idx ON main_queryhistory USING GIN (search_vector)",
+    # Index the rows that already exist
+    "UPDATE main_queryhistory SET article_title = article_title",
+]
+
+POSTGRES_REMOVE = [
+    "DROP TRIGGER IF EXISTS main_queryhistory_search_update ON main_queryhistory",
+    "DROP FUNCTION IF EXISTS main_queryhistory_search_update()",
+    "ALTER TABLE main_queryhistory DROP COLUMN IF EXISTS search_vector",
+]
+
+SQLITE_INSTALL = [
+    """
+    CREATE VIRTUAL TABLE main_queryhistory_fts USING fts5(
+        article_title, summary, content='main_queryhistory', content_rowid='id',
+        tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER main_queryhistory_fts_insert AFTER INSERT ON main_queryhistory BEGIN
+        INSERT INTO main_queryhistory_fts(rowid, article_title, summary)
+        VALUES (new.id, new.article_title, new.summary);
+    END
+    """,
+    """
+    CREATE TRIGGER main_queryhistory_fts_delete AFTER DELETE ON main_queryhistory BEGIN
+        INSERT INTO main_queryhistory_fts(main_queryhistory_fts, rowid, article_title, summary)
+        VALUES ('delete', old.id, old.article_title, old.summary);
+    END
+    """,
+    """
+    CREATE TRIGGER main_queryhistory_fts_update AFTER UPDATE OF article_title, summary ON main_queryhistory BEGIN
+        INSERT INTO main_queryhistory_fts(main_queryhistory_fts, rowid, article_title, summary)
+        VALUES ('delete', old.id, old.article_title, old.summary);
+        INSERT INTO main_queryhistory_fts(rowid, article_title, summary)
+        VALUES (new.id, new.article_title, new.summary);
+    END
+    """,
+    "INSERT INTO main_queryhistory_fts(main_queryhistory_fts) VALUES ('rebuild')",
+]
+
+SQLITE_REMOVE = [
+    "DROP TRIGGER IF EXISTS main_queryhistory_fts_insert",
+    "DROP TRIGGER IF EXISTS main_queryhistory_fts_delete",
+    "DROP TRIGGER IF EXISTS main_queryhistory_fts_update",
+    "DROP TABLE IF EXISTS main_queryhistory_fts",
+]
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):
+        for statement in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return run
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0009_feed_state"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run({"postgresql": POSTGRES_INSTALL, "sqlite": SQLITE_INSTALL}),
+            _run({"postgresql": POSTGRES_REMOVE, "sqlite": SQLITE_REMOVE}),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0010_queryhistory_search_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArchivePartition",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("day", models.DateField(unique=True)),
+                ("rows", models.IntegerField(default=0)),
+                ("size_bytes", models.BigIntegerField(default=0)),
+                ("archived_at", models.DateTimeField(auto_now=True)),
+                ("restored_at", models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
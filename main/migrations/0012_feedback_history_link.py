@@ -0,0 +1,63 @@
+# Generated by Django 5.2.4 on 2026-10-18 11:02
+
+import uuid
+from importlib import import_module
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# The FTS5 triggers from 0010. Making public_id unique makes SQLite rebuild the history
+# table, which drops its triggers, so they are created again afterwards.
+search_index = import_module("main.migrations.0010_queryhistory_search_index")
+SQLITE_TRIGGERS = [statement for statement in search_index.SQLITE_INSTALL if "CREATE TRIGGER" in statement]
+
+def create_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        for statement in SQLITE_TRIGGERS:
+            schema_editor.execute(statement)
+
+def fill_public_ids(apps, schema_editor):
+    QueryHistory = apps.get_model("main", "QueryHistory")
+    while True:
+        rows = list(QueryHistory.objects.filter(public_id__isnull=True).only("id")[:1000])
+        if not rows:
+            return
+        for row in rows:
+            row.public_id = uuid.uuid4()
+        QueryHistory.objects.bulk_update(rows, ["public_id"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0011_archive_partition"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="queryhistory",
+            name="public_id",
+            field=models.UUIDField(editable=False, null=True),
+        ),
+        migrations.RunPython(fill_public_ids, migrations.RunPython.noop),
+        # Reversing the AlterField below rebuilds the table again
+        migrations.RunPython(migrations.RunPython.noop, create_triggers),
+        migrations.AlterField(
+            model_name="queryhistory",
+            name="public_id",
+            field=models.UUIDField(default=uuid.uuid4, editable=False, unique=True),
+        ),
+        migrations.RunPython(create_triggers, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="queryhistory",
+            index=models.Index(fields=["article_title", "-created_at"], name="history_title_created_idx"),
+        ),
+        migrations.AddField(
+            model_name="feedback",
+            name="history",
+            field=models.ForeignKey(
+                blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING,
+                related_name="feedback", to="main.queryhistory", to_field="public_id",
+            ),
+        ),
+    ]
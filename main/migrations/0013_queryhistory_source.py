@@ -0,0 +1,33 @@
+# Generated by Django 5.2.4 on 2026-10-18 11:13
+
+from importlib import import_module
+
+from django.db import migrations, models
+
+# Adding a column with a default makes SQLite rebuild the history table, which drops
+# the FTS5 triggers from 0010, so they are created again afterwards (as in 0012).
+# Triggers that already exist are left alone.
+SQLITE_TRIGGERS = import_module("main.migrations.0012_feedback_history_link").SQLITE_TRIGGERS
+
+def create_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        for statement in SQLITE_TRIGGERS:
+            schema_editor.execute(statement.replace("CREATE TRIGGER ", "CREATE TRIGGER IF NOT EXISTS ", 1))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0012_feedback_history_link"),
+    ]
+
+    operations = [
+        # In case reversing the AddField below rebuilds the table too
+        migrations.RunPython(migrations.RunPython.noop, create_triggers),
+        migrations.AddField(
+            model_name="queryhistory",
+            name="source",
+            field=models.CharField(choices=[("user", "User"), ("ingest", "Ingestion")], default="user", max_length=8),
+        ),
+        migrations.RunPython(create_triggers, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,12 @@
 # backend/main/models.py
+import uuid
+
 from django.db import models
 
 class QueryHistory(models.Model):
+    # Assigned when the row is built, so the analyze response can return it before
+    # the write-behind buffer has written the row
+    public_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
     input_type = models.CharField(max_length=10, choices=[('url', 'URL'), ('text', 'Text')])
     input_value = models.TextField()
     summary = models.TextField()
@@ -10,6 +15,21 @@ class QueryHistory(models.Model):
     article_title = models.CharField(max_length=512, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     duration_ms = models.IntegerField(default=0)
+    cache_hit = models.BooleanField(default=False)
+    # Milliseconds per pipeline stage (cache, fetch, parse, summary, classify)
+    stage_timings = models.JSONField(default=dict, blank=True)
+    # "ingest" rows were pre-analyzed from feeds; the user-facing analytics leave them out
+    source = models.CharField(max_length=8, choices=[('user', 'User'), ('ingest', 'Ingestion')], default='user')
+
+    class Meta:
+        # Keyset pagination on the admin history list, optionally filtered by label or input type
+        indexes = [
+            models.Index(fields=["-created_at", "-id"], name="history_created_idx"),
+            models.Index(fields=["fake_news_label", "-created_at", "-id"], name="history_label_created_idx"),
+            models.Index(fields=["input_type", "-created_at", "-id"], name="history_type_created_idx"),
+            # Matching old feedback to history by title (manage.py link_feedback)
+            models.Index(fields=["article_title", "-created_at"], name="history_title_created_idx"),
+        ]
 
     def __str__(self):
         return f'Query: {self.article_title or self.input_value[:32]}...'
@@ -19,5 +39,99 @@ class Feedback(models.Model):
     fake_news_label = models.CharField(max_length=16)
     user_feedback = models.CharField(max_length=16)
     created_at = models.DateTimeField(auto_now_add=True)
+    # The analysis this feedback is about, by the history_id the analyze response returned.
+    # No database constraint: the row may still be in the write-behind buffer, or archived.
+    history = models.ForeignKey(
+        QueryHistory, to_field="public_id", db_constraint=False, null=True, blank=True,
+        on_delete=models.DO_NOTHING, related_name="feedback",
+    )
+
     def __str__(self):
         return f'Feedback: {self.title[:32]}... - {self.user_feedback}'
+
+# Rollups are maintained incrementally by main/rollups.py and rebuilt with
+# `python manage.py rebuild_rollups`. Each row is one (period, bucket) cell.
+ROLLUP_PERIODS = [('hour', 'Hour'), ('day', 'Day')]
+
+class HistoryRollup(models.Model):
+    period = models.CharField(max_length=4, choices=ROLLUP_PERIODS)
+    bucket_start = models.DateTimeField()
+    fake_news_label = models.CharField(max_length=16)
+    input_type = models.CharField(max_length=10)
+    count = models.IntegerField(default=0)
+    cache_hits = models.IntegerField(default=0)
+    duration_total_ms = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["period", "bucket_start", "fake_news_label", "input_type"], name="history_rollup_cell",
+            ),
+        ]
+
+class LatencyRollup(models.Model):
+    """duration_ms histogram: count of requests with duration <= le_ms and above the previous bound."""
+    period = models.CharField(max_length=4, choices=ROLLUP_PERIODS)
+    bucket_start = models.DateTimeField()
+    le_ms = models.IntegerField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["period", "bucket_start", "le_ms"], name="latency_rollup_cell"),
+        ]
+
+class FeedbackRollup(models.Model):
+    period = models.CharField(max_length=4, choices=ROLLUP_PERIODS)
+    bucket_start = models.DateTimeField()
+    fake_news_label = models.CharField(max_length=16)
+    user_feedback = models.CharField(max_length=16)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["period", "bucket_start", "fake_news_label", "user_feedback"], name="feedback_rollup_cell",
+            ),
+        ]
+
+# Near-duplicate index maintained by main/dedupe.py: one fingerprint per analyzed
+# article plus one bucket row per LSH band of its MinHash signature.
+class ArticleFingerprint(models.Model):
+    signature = models.BinaryField()
+    title = models.CharField(max_length=512, blank=True)
+    summary = models.TextField()
+    fake_news_label = models.CharField(max_length=16)
+    fake_news_confidence = models.FloatField()
+    details = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f'Fingerprint: {self.title[:32]}...'
+
+class ArticleBucket(models.Model):
+    fingerprint = models.ForeignKey(ArticleFingerprint, on_delete=models.CASCADE, related_name="buckets")
+    key = models.BigIntegerField(db_index=True)
+
+class FeedState(models.Model):
+    """Conditional GET validators and discovered feed URL for one INGEST_FEEDS entry."""
+    url = models.URLField(max_length=1024, unique=True)
+    feed_url = models.URLField(max_length=1024, blank=True)
+    etag = models.CharField(max_length=256, blank=True)
+    last_modified = models.CharField(max_length=64, blank=True)
+    last_polled_at = models.DateTimeField(null=True, blank=True)
+    last_status = models.IntegerField(null=True, blank=True)
+
+    def __str__(self):
+        return f'Feed: {self.url}'
+
+class ArchivePartition(models.Model):
+    """One UTC day of QueryHistory rows moved to ARCHIVE_DIR by main/archive.py."""
+    day = models.DateField(unique=True)
+    rows = models.IntegerField(default=0)
+    size_bytes = models.BigIntegerField(default=0)
+    archived_at = models.DateTimeField(auto_now=True)
+    restored_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f'Archive: {self.day} ({self.rows} rows)'
@@ -0,0 +1,13 @@
+# backend/main/pagination.py
+from rest_framework.pagination import CursorPagination
+
+class HistoryCursorPagination(CursorPagination):
+    """
+    Keyset pagination, newest first. The cursor encodes the last created_at seen, so
+    every page is an index range scan instead of an ever larger OFFSET; id breaks ties
+    between rows created in the same instant.
+    """
+    ordering = ("-created_at", "-id")
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 500
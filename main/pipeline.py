@@ -0,0 +1,303 @@
+# backend/main/pipeline.py
+import asyncio
+import contextvars
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .cache import result_cache_key, get_cached_result, set_cached_result
+from .models import QueryHistory
+from .history import save_history
+from .dedupe import find_near_duplicate, index_article
+from .metrics import StageTimer, stage, observe_request
+from .utils import (
+    get_text_from_url, summarize_with_backend, classify_with_backend, summarize_with_backend_async,
+    classify_with_backend_async, summarize_texts_with_backend, classify_texts_with_backend,
+    local_summary, local_classification, SUMMARY_TIMEOUT_MESSAGE, NLI_TIMEOUT_MESSAGE,
+)
+
+logger = logging.getLogger(__name__)
+
+FETCH_ERROR = "Failed to fetch article from the provided URL. This site may block bots, or the link is invalid. Error details: {}"
+EMPTY_ARTICLE_ERROR = "Could not extract article text from the provided URL. Please check the link or try another article."
+
+# Shared by all requests in this process so concurrent analyses can't spawn unbounded threads
+_executor = ThreadPoolExecutor(
+    max_workers=settings.PIPELINE_MAX_WORKERS, thread_name_prefix="analyze-pipeline"
+)
+
+# Article downloads for batch requests; kept apart so slow sites can't starve inference
+_fetch_executor = ThreadPoolExecutor(
+    max_workers=settings.BATCH_FETCH_WORKERS, thread_name_prefix="article-fetch"
+)
+
+def _wait(future, deadline):
+    """Wait for future until the monotonic deadline; raises TimeoutError if it passes."""
+    try:
+        return future.result(timeout=max(0, deadline - time.monotonic()))
+    except FutureTimeoutError:
+        future.cancel()
+        raise
+
+def _summary_timed_out(text):
+    """Stage timeout result: the local summary in fallback mode, else the timeout message."""
+    if settings.INFERENCE_BACKEND == "fallback":
+        return local_summary(text), "local"
+    return SUMMARY_TIMEOUT_MESSAGE, "remote"
+
+def _classification_timed_out(text):
+    if settings.INFERENCE_BACKEND == "fallback":
+        return (*local_classification(text), "local")
+    return "UNSURE", 0, {"error": NLI_TIMEOUT_MESSAGE}, "remote"
+
+def with_engines(details, summary_engine, classify_engine):
+    """Record in details which engines answered whenever the local engine was involved."""
+    if summary_engine == classify_engine == "remote":
+        return details
+    details = {**details, "engines": {"summary": summary_engine, "classification": classify_engine}}
+    if settings.INFERENCE_BACKEND == "fallback":
+        details["fallback"] = True
+    return details
+
+def _in_stage(name, function, *args):
+    with stage(name):
+        return function(*args)
+
+def _submit_stage(name, function, *args):
+    """Run function on the pipeline pool, timed as stage name for the current request."""
+    return _executor.submit(contextvars.copy_context().run, _in_stage, name, function, *args)
+
+async def _ain_stage(name, awaitable):
+    with stage(name):
+        return await awaitable
+
+def start_inference(text):
+    """Submit summarization and classification; returns (started, summary_future, verdict_future)."""
+    return (
+        time.monotonic(),
+        _submit_stage("summary", summarize_with_backend, text),
+        _submit_stage("classify", classify_with_backend, text),
+    )
+
+def summary_outcome(text, started, summary_future):
+    """(summary, engine) from start_inference, or the timeout result if the stage ran over."""
+    try:
+        return _wait(summary_future, started + settings.SUMMARY_STAGE_TIMEOUT)
+    except FutureTimeoutError:
+        logger.error("Summary stage exceeded %ss", settings.SUMMARY_STAGE_TIMEOUT)
+        return _summary_timed_out(text)
+
+def verdict_outcome(text, started, verdict_future):
+    """(verdict, confidence, details, engine) from start_inference, or the timeout result."""
+    try:
+        return _wait(verdict_future, started + settings.CLASSIFY_STAGE_TIMEOUT)
+    except FutureTimeoutError:
+        logger.error("Classification stage exceeded %ss", settings.CLASSIFY_STAGE_TIMEOUT)
+        return _classification_timed_out(text)
+
+def run_inference(text):
+    """
+    Runs summarization and classification in parallel and returns
+    (summary, verdict, confidence, details).
+    A stage that misses its timeout yields the same message as an upstream timeout,
+    so the other stage's result is still returned. Unexpected exceptions propagate.
+    """
+    started, summary_future, verdict_future = start_inference(text)
+    summary, summary_engine = summary_outcome(text, started, summary_future)
+    verdict, confidence, details, classify_engine = verdict_outcome(text, started, verdict_future)
+    return summary, verdict, confidence, with_engines(details, summary_engine, classify_engine)
+
+def input_error(url, text):
+    """Validation message for an analyze request, or None if the input is usable."""
+    if not url and not text:
+        return "No input provided. Paste a news article link or text."
+    if not url and len(text) < 5:
+        return "Please provide more article text for analysis."
+    return None
+
+def analysis_result(article, summary, verdict, confidence, details):
+    return {
+        "title": article.get("title", ""),
+        "author": article.get("author", ""),
+        "published_date": article.get("published_date", ""),
+        "summary": summary,
+        "fake_news_label": verdict,
+        "fake_news_confidence": confidence,
+        "details": details,
+    }
+
+def near_duplicate_result(article, text):
+    """
+    The summary and verdict of an earlier near-copy of text, as an analysis result for
+    article with a "near_duplicate" note, or None if there is no close enough match.
+    """
+    with stage("dedupe"):
+        match = find_near_duplicate(text)
+    if match is None:
+        return None
+    entry, similarity = match
+    result = analysis_result(article, entry.summary, entry.fake_news_label, entry.fake_news_confidence, entry.details)
+    result["near_duplicate"] = {
+        "similarity": similarity,
+        "title": entry.title,
+        "analyzed_at": entry.created_at.isoformat(),
+    }
+    return result
+
+async def anear_duplicate_result(article, text):
+    return await sync_to_async(near_duplicate_result)(article, text)
+
+def remember_result(text, result):
+    """Index a fresh analysis so later near-copies of text can reuse it."""
+    with stage("db"):
+        index_article(text, result)
+
+async def aremember_result(text, result):
+    await sync_to_async(remember_result)(text, result)
+
+def history_row(url, text, result, duration_ms, cache_hit=False, stage_timings=None, source="user"):
+    return QueryHistory(
+        input_type='url' if url else 'text',
+        input_value=url or (text[:100] + "..."),
+        summary=result["summary"],
+        fake_news_label=result["fake_news_label"],
+        fake_news_confidence=result["fake_news_confidence"],
+        article_title=result["title"],
+        duration_ms=duration_ms,
+        cache_hit=cache_hit,
+        stage_timings=stage_timings or {},
+        source=source,
+    )
+
+def analyze(url, text, start_time=None, timer=None, source="user"):
+    """
+    Full analyze pipeline for one URL or text: validation, result cache, article fetch,
+    inference and the QueryHistory write. Returns (response body, HTTP status).
+    Stage durations are collected on timer (pass one in to build a Server-Timing header);
+    source is stored on the history row ("ingest" for feed pre-analysis).
+    """
+    start_time = start_time or time.time()
+    timer = timer or StageTimer()
+    with timer.activate():
+        body, status = _analyze(url, text, start_time, timer, source)
+    observe_request(status, body.get("cache_hit"), time.time() - start_time)
+    return body, status
+
+def _analyze(url, text, start_time, timer, source):
+    error = input_error(url, text)
+    if error:
+        return {"error": error}, 400
+    # A cache hit skips both the article fetch and the inference calls
+    cache_key = result_cache_key(url=url) if url else result_cache_key(text=text)
+    with stage("cache"):
+        cached = get_cached_result(cache_key)
+    if cached is not None:
+        duration_ms = int((time.time() - start_time) * 1000)
+        with stage("db"):
+            row = history_row(url, text, cached, duration_ms, cache_hit=True,
+                              stage_timings=timer.timings(), source=source)
+            save_history(row)
+        return {**cached, "history_id": str(row.public_id), "duration_ms": duration_ms, "cache_hit": True}, 200
+    # Defensive: support only one being present
+    if url:
+        try:
+            article = get_text_from_url(url)
+        except Exception as e:
+            logger.error("Analyze URL fetch error: %s", e)
+            return {"error": FETCH_ERROR.format(str(e))}, 400
+        text = article["text"]
+        if not text:
+            return {"error": EMPTY_ARTICLE_ERROR}, 400
+    else:
+        article = {}
+    # A syndicated copy of an article analyzed earlier reuses that analysis
+    reused = near_duplicate_result(article, text)
+    if reused is not None:
+        set_cached_result(cache_key, reused)
+        duration_ms = int((time.time() - start_time) * 1000)
+        with stage("db"):
+            row = history_row(url, text, reused, duration_ms, cache_hit=True,
+                              stage_timings=timer.timings(), source=source)
+            save_history(row)
+        return {**reused, "history_id": str(row.public_id), "duration_ms": duration_ms, "cache_hit": True}, 200
+    try:
+        summary, verdict, confidence, details = run_inference(text)
+    except Exception as e:
+        logger.error("Analyze pipeline error: %s", e)
+        return {"error": f"AI failed: {str(e)}"}, 500
+    result = analysis_result(article, summary, verdict, confidence, details)
+    set_cached_result(cache_key, result)
+    remember_result(text, result)
+    duration_ms = int((time.time() - start_time) * 1000)
+    with stage("db"):
+        row = history_row(url, text, result, duration_ms, stage_timings=timer.timings(), source=source)
+        save_history(row)
+    return {**result, "history_id": str(row.public_id), "duration_ms": duration_ms, "cache_hit": False}, 200
+
+def submit_fetch(url):
+    """Start downloading an article on the fetch pool; returns a Future of get_text_from_url."""
+    return _fetch_executor.submit(get_text_from_url, url)
+
+def run_batch_inference(texts):
+    """
+    Batched run_inference: one multi-input call per model for all texts, both calls
+    in parallel. Returns a (summary, verdict, confidence, details) tuple per text.
+    """
+    started = time.monotonic()
+    summary_future = _submit_stage("summary", summarize_texts_with_backend, texts)
+    verdict_future = _submit_stage("classify", classify_texts_with_backend, texts)
+    try:
+        summaries = _wait(summary_future, started + settings.SUMMARY_STAGE_TIMEOUT)
+    except FutureTimeoutError:
+        logger.error("Batch summary stage exceeded %ss", settings.SUMMARY_STAGE_TIMEOUT)
+        summaries = [_summary_timed_out(text) for text in texts]
+    try:
+        verdicts = _wait(verdict_future, started + settings.CLASSIFY_STAGE_TIMEOUT)
+    except FutureTimeoutError:
+        logger.error("Batch classification stage exceeded %ss", settings.CLASSIFY_STAGE_TIMEOUT)
+        verdicts = [_classification_timed_out(text) for text in texts]
+    return [
+        (summary, verdict, confidence, with_engines(details, summary_engine, classify_engine))
+        for (summary, summary_engine), (verdict, confidence, details, classify_engine)
+        in zip(summaries, verdicts)
+    ]
+
+def start_inference_async(text):
+    """asyncio version of start_inference; must be called with the event loop running."""
+    return (
+        time.monotonic(),
+        asyncio.ensure_future(_ain_stage("summary", summarize_with_backend_async(text))),
+        asyncio.ensure_future(_ain_stage("classify", classify_with_backend_async(text))),
+    )
+
+async def asummary_outcome(text, started, summary_task):
+    try:
+        return await asyncio.wait_for(
+            summary_task, max(0, started + settings.SUMMARY_STAGE_TIMEOUT - time.monotonic())
+        )
+    except asyncio.TimeoutError:
+        logger.error("Summary stage exceeded %ss", settings.SUMMARY_STAGE_TIMEOUT)
+        return _summary_timed_out(text)
+
+async def averdict_outcome(text, started, verdict_task):
+    try:
+        return await asyncio.wait_for(
+            verdict_task, max(0, started + settings.CLASSIFY_STAGE_TIMEOUT - time.monotonic())
+        )
+    except asyncio.TimeoutError:
+        logger.error("Classification stage exceeded %ss", settings.CLASSIFY_STAGE_TIMEOUT)
+        return _classification_timed_out(text)
+
+async def run_inference_async(text):
+    """asyncio version of run_inference with the same per-stage timeouts and results."""
+    started, summary_task, verdict_task = start_inference_async(text)
+    try:
+        summary, summary_engine = await asummary_outcome(text, started, summary_task)
+    except Exception:
+        verdict_task.cancel()
+        raise
+    verdict, confidence, details, classify_engine = await averdict_outcome(text, started, verdict_task)
+    return summary, verdict, confidence, with_engines(details, summary_engine, classify_engine)
@@ -0,0 +1,241 @@
+# backend/main/rollups.py
+"""
+Hourly and daily rollups of QueryHistory and Feedback for the admin dashboard.
+
+Saving a row through the ORM updates the rollups from a post_save signal. bulk_create
+does not send signals, so code that bulk-inserts history must call record_history()
+itself. Dashboard queries read only the rollup cells in the requested range, so their
+cost does not grow with the size of the history table. Rows written by feed ingestion
+(source="ingest") are left out, so the dashboard counts only user requests.
+"""
+import logging
+from collections import Counter
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, F, IntegerField, Max, Q, Sum, Value, When
+from django.db.models.functions import TruncDay, TruncHour
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import QueryHistory, Feedback, HistoryRollup, LatencyRollup, FeedbackRollup, ArchivePartition
+
+logger = logging.getLogger(__name__)
+
+PERIODS = ("hour", "day")
+TRUNCATE = {"hour": TruncHour, "day": TruncDay}
+
+# Upper bounds of the duration_ms histogram; the last bucket catches everything slower
+DURATION_BUCKETS_MS = (50, 100, 250, 500, 1000, 2000, 3000, 5000, 7500, 10000, 15000, 20000, 30000, 45000, 60000)
+OVERFLOW_BUCKET_MS = 2 ** 31 - 1
+
+def bucket_start(moment, period):
+    start = moment.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+    return start.replace(hour=0) if period == "day" else start
+
+def duration_bucket(duration_ms):
+    for bound in DURATION_BUCKETS_MS:
+        if duration_ms <= bound:
+            return bound
+    return OVERFLOW_BUCKET_MS
+
+def _bump(model, keys, increments):
+    """Add increments to the rollup cell identified by keys, creating it if needed."""
+    changes = {field: F(field) + amount for field, amount in increments.items()}
+    if model.objects.filter(**keys).update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**keys, **increments)
+    except IntegrityError:
+        # Another worker created the cell first
+        model.objects.filter(**keys).update(**changes)
+
+def record_history(rows):
+    """Add saved QueryHistory rows to the rollups. Feed ingestion rows are not counted."""
+    cells = Counter()
+    latency = Counter()
+    for row in rows:
+        if row.source != "user":
+            continue
+        for period in PERIODS:
+            start = bucket_start(row.created_at, period)
+            key = (period, start, row.fake_news_label, row.input_type)
+            cells[key + ("count",)] += 1
+            cells[key + ("cache_hits",)] += int(row.cache_hit)
+            cells[key + ("duration_total_ms",)] += row.duration_ms
+            latency[(period, start, duration_bucket(row.duration_ms))] += 1
+    increments = {}
+    for (*key, field), amount in cells.items():
+        increments.setdefault(tuple(key), {})[field] = amount
+    try:
+        for (period, start, label, input_type), fields in increments.items():
+            _bump(HistoryRollup, {
+                "period": period, "bucket_start": start, "fake_news_label": label, "input_type": input_type,
+            }, fields)
+        for (period, start, le_ms), count in latency.items():
+            _bump(LatencyRollup, {"period": period, "bucket_start": start, "le_ms": le_ms}, {"count": count})
+    except Exception:
+        logger.exception("Failed to update history rollups")
+
+def record_feedback(rows):
+    """Add saved Feedback rows to the rollups."""
+    cells = Counter(
+        (period, bucket_start(row.created_at, period), row.fake_news_label, row.user_feedback)
+        for row in rows for period in PERIODS
+    )
+    try:
+        for (period, start, label, feedback), count in cells.items():
+            _bump(FeedbackRollup, {
+                "period": period, "bucket_start": start, "fake_news_label": label, "user_feedback": feedback,
+            }, {"count": count})
+    except Exception:
+        logger.exception("Failed to update feedback rollups")
+
+@receiver(post_save, sender=QueryHistory)
+def _history_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        record_history([instance])
+
+@receiver(post_save, sender=Feedback)
+def _feedback_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        record_feedback([instance])
+
+def _duration_bucket_expression():
+    return Case(
+        *[When(duration_ms__lte=bound, then=Value(bound)) for bound in DURATION_BUCKETS_MS],
+        default=Value(OVERFLOW_BUCKET_MS),
+        output_field=IntegerField(),
+    )
+
+def archive_horizon():
+    """Start of the UTC day after the newest archived history partition, or None."""
+    latest = ArchivePartition.objects.aggregate(day=Max("day"))["day"]
+    if latest is None:
+        return None
+    return datetime.combine(latest + timedelta(days=1), time.min, tzinfo=dt_timezone.utc)
+
+@transaction.atomic
+def rebuild_rollups():
+    """
+    Recompute the rollups from the history and feedback tables. Returns rollup rows written.
+    History cells before the archive horizon are kept, since their rows live in the archive.
+    """
+    horizon = archive_horizon()
+    rows = QueryHistory.objects.filter(source="user")
+    if horizon is None:
+        HistoryRollup.objects.all().delete()
+        LatencyRollup.objects.all().delete()
+    else:
+        HistoryRollup.objects.filter(bucket_start__gte=horizon).delete()
+        LatencyRollup.objects.filter(bucket_start__gte=horizon).delete()
+        rows = rows.filter(created_at__gte=horizon)
+    FeedbackRollup.objects.all().delete()
+    written = 0
+    for period in PERIODS:
+        start = TRUNCATE[period]("created_at", tzinfo=dt_timezone.utc)
+        history = (
+            rows.annotate(start=start)
+            .values("start", "fake_news_label", "input_type")
+            .annotate(count=Count("id"), cache_hits=Count("id", filter=Q(cache_hit=True)),
+                      duration_total_ms=Sum("duration_ms"))
+            .order_by()
+        )
+        written += len(HistoryRollup.objects.bulk_create([
+            HistoryRollup(period=period, bucket_start=row["start"], fake_news_label=row["fake_news_label"],
+                          input_type=row["input_type"], count=row["count"], cache_hits=row["cache_hits"],
+                          duration_total_ms=row["duration_total_ms"] or 0)
+            for row in history.iterator()
+        ], batch_size=1000))
+        latency = (
+            rows.annotate(start=start, le_ms=_duration_bucket_expression())
+            .values("start", "le_ms").annotate(count=Count("id")).order_by()
+        )
+        written += len(LatencyRollup.objects.bulk_create([
+            LatencyRollup(period=period, bucket_start=row["start"], le_ms=row["le_ms"], count=row["count"])
+            for row in latency.iterator()
+        ], batch_size=1000))
+        feedback = (
+            Feedback.objects.annotate(start=start)
+            .values("start", "fake_news_label", "user_feedback").annotate(count=Count("id")).order_by()
+        )
+        written += len(FeedbackRollup.objects.bulk_create([
+            FeedbackRollup(period=period, bucket_start=row["start"], fake_news_label=row["fake_news_label"],
+                           user_feedback=row["user_feedback"], count=row["count"])
+            for row in feedback.iterator()
+        ], batch_size=1000))
+    return written
+
+def histogram_percentile(buckets, percent):
+    """
+    Estimate a percentile from [(le_ms, count), ...] sorted by le_ms, interpolating
+    linearly inside the bucket it falls in. Overflow values report the last finite bound.
+    """
+    total = sum(count for _, count in buckets)
+    if not total:
+        return None
+    target = percent / 100 * total
+    seen = 0
+    for le_ms, count in buckets:
+        if count and seen + count >= target:
+            finite = [bound for bound in DURATION_BUCKETS_MS if bound < le_ms]
+            lower = finite[-1] if finite else 0
+            if le_ms == OVERFLOW_BUCKET_MS:
+                return float(lower)
+            return lower + (le_ms - lower) * (target - seen) / count
+        seen += count
+    return None
+
+def dashboard_stats(period="day", since=None, until=None):
+    """Counts, latency percentiles and feedback agreement for rollup buckets in [since, until]."""
+    until = until or timezone.now()
+    since = since or until - timedelta(days=30)
+    cells = {"period": period, "bucket_start__gte": bucket_start(since, period), "bucket_start__lte": until}
+
+    history = HistoryRollup.objects.filter(**cells)
+    totals = history.aggregate(count=Sum("count"), cache_hits=Sum("cache_hits"), duration=Sum("duration_total_ms"))
+    total = totals["count"] or 0
+    by_label = {row["fake_news_label"]: row["n"] for row in
+                history.values("fake_news_label").annotate(n=Sum("count")).order_by()}
+    by_input_type = {row["input_type"]: row["n"] for row in
+                     history.values("input_type").annotate(n=Sum("count")).order_by()}
+    series = {}
+    for row in history.values("bucket_start", "fake_news_label").annotate(n=Sum("count")).order_by("bucket_start"):
+        point = series.setdefault(row["bucket_start"], {"bucket_start": row["bucket_start"], "count": 0, "by_label": {}})
+        point["count"] += row["n"]
+        point["by_label"][row["fake_news_label"]] = row["n"]
+
+    buckets = [
+        (row["le_ms"], row["n"]) for row in
+        LatencyRollup.objects.filter(**cells).values("le_ms").annotate(n=Sum("count")).order_by("le_ms")
+    ]
+    p50, p95 = histogram_percentile(buckets, 50), histogram_percentile(buckets, 95)
+
+    feedback = {}
+    for row in FeedbackRollup.objects.filter(**cells).values("fake_news_label", "user_feedback") \
+            .annotate(n=Sum("count")).order_by():
+        feedback.setdefault(row["fake_news_label"], {})[row["user_feedback"]] = row["n"]
+
+    return {
+        "period": period,
+        "since": since,
+        "until": until,
+        "total": total,
+        "cache_hits": totals["cache_hits"] or 0,
+        "by_label": by_label,
+        "by_input_type": by_input_type,
+        "latency_ms": {
+            "mean": round(totals["duration"] / total, 1) if total else None,
+            "p50": round(p50, 1) if p50 is not None else None,
+            "p95": round(p95, 1) if p95 is not None else None,
+            "histogram": [{"le_ms": None if le_ms == OVERFLOW_BUCKET_MS else le_ms, "count": count}
+                          for le_ms, count in buckets],
+        },
+        "feedback": {
+            "total": sum(sum(counts.values()) for counts in feedback.values()),
+            "by_label": feedback,
+        },
+        "series": list(series.values()),
+    }
@@ -0,0 +1,95 @@
+# backend/main/search.py
+"""
+Ranked full-text search over QueryHistory.article_title and summary.
+
+On Postgres, a search_vector tsvector column (title weighted A, summary B) is filled by
+a trigger and indexed with GIN. On SQLite, an FTS5 table (main_queryhistory_fts)
+mirrors the two columns through insert/update/delete triggers. Both are created by
+migration 0010. Because the triggers live in the database, bulk_create and raw
+deletes keep the index in sync too. `python manage.py backfill_search_index` indexes
+rows that existed before the migration, or rebuilds the SQLite table.
+"""
+import re
+
+from django.db import connection
+
+from .models import QueryHistory
+
+TABLE = QueryHistory._meta.db_table
+FTS_TABLE = f"{TABLE}_fts"
+
+# Double-quoted phrases, or single terms optionally prefixed with "-" to exclude them
+QUERY_PART = re.compile(r'(-?)"([^"]*)"|(-?)(\S+)')
+WORD = re.compile(r"\w+")
+
+def _fts5_query(query):
+    """
+    FTS5 MATCH expression for a web-search style query: every word or "quoted phrase"
+    must match, and -word excludes. Terms are quoted, so punctuation in user input can't
+    form FTS5 syntax. Returns None if nothing searchable is left.
+    """
+    required, excluded = [], []
+    for phrase_minus, phrase, word_minus, word in QUERY_PART.findall(query):
+        words = WORD.findall(phrase or word)
+        if not words:
+            continue
+        term = '"' + " ".join(words) + '"'
+        (excluded if (phrase_minus or word_minus) else required).append(term)
+    if not required:
+        return None
+    return " AND ".join(required) + "".join(f" NOT {term}" for term in excluded)
+
+def search_history(query, offset, limit):
+    """(total matches, [(history id, rank)]) for query, best match first. Feed ingestion rows are skipped."""
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute(
+                f"SELECT count(*) FROM {TABLE} WHERE search_vector @@ websearch_to_tsquery('english', %s) "
+                f"AND source = 'user'",
+                [query],
+            )
+            total = cursor.fetchone()[0]
+            cursor.execute(
+                f"SELECT id, ts_rank_cd(search_vector, q) AS rank "
+                f"FROM {TABLE}, websearch_to_tsquery('english', %s) q "
+                f"WHERE search_vector @@ q AND source = 'user' ORDER BY rank DESC, id DESC LIMIT %s OFFSET %s",
+                [query, limit, offset],
+            )
+            return total, [(row_id, float(rank)) for row_id, rank in cursor.fetchall()]
+        match = _fts5_query(query)
+        if match is None:
+            return 0, []
+        cursor.execute(
+            f"SELECT count(*) FROM {FTS_TABLE} JOIN {TABLE} ON {TABLE}.id = {FTS_TABLE}.rowid "
+            f"WHERE {FTS_TABLE} MATCH %s AND {TABLE}.source = 'user'",
+            [match],
+        )
+        total = cursor.fetchone()[0]
+        # bm25() is lower-is-better; weight title matches 10x over summary matches
+        cursor.execute(
+            f"SELECT {FTS_TABLE}.rowid, bm25({FTS_TABLE}, 10.0, 1.0) AS rank FROM {FTS_TABLE} "
+            f"JOIN {TABLE} ON {TABLE}.id = {FTS_TABLE}.rowid "
+            f"WHERE {FTS_TABLE} MATCH %s AND {TABLE}.source = 'user' "
+            f"ORDER BY rank, {FTS_TABLE}.rowid DESC LIMIT %s OFFSET %s",
+            [match, limit, offset],
+        )
+        return total, [(row_id, -rank) for row_id, rank in cursor.fetchall()]
+
+def backfill_search_index(batch_size=1000):
+    """Index rows missing from the search index; returns how many rows were (re)indexed."""
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            indexed = 0
+            while True:
+                # Touching the columns fires the trigger, which recomputes search_vector
+                cursor.execute(
+                    f"UPDATE {TABLE} SET article_title = article_title WHERE id IN ("
+                    f"SELECT id FROM {TABLE} WHERE search_vector IS NULL ORDER BY id LIMIT %s)",
+                    [batch_size],
+                )
+                if not cursor.rowcount:
+                    return indexed
+                indexed += cursor.rowcount
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+        cursor.execute(f"SELECT count(*) FROM {TABLE}")
+        return cursor.fetchone()[0]
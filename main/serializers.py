@@ -24,6 +24,12 @@ class QueryHistorySerializer(serializers.ModelSerializer):
     class Meta:
         model = QueryHistory
         fields = [
-            'id', 'input_type', 'input_value', 'summary', 'fake_news_label',
-            'fake_news_confidence', 'article_title', 'created_at', 'duration_ms'
-        ]
\ No newline at end of file
+            'id', 'public_id', 'input_type', 'input_value', 'summary', 'fake_news_label',
+            'fake_news_confidence', 'article_title', 'created_at', 'duration_ms',
+            'cache_hit', 'stage_timings', 'source'
+        ]
+
+class QueryHistoryListSerializer(QueryHistorySerializer):
+    """History rows without the summary text, for lean admin listings."""
+    class Meta(QueryHistorySerializer.Meta):
+        fields = [field for field in QueryHistorySerializer.Meta.fields if field != 'summary']
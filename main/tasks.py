@@ -1,17 +1,88 @@
 # backend/main/tasks.py
 
-from celery import shared_task
-from .utils import summarize_text, classify_fake_news
+import logging
+import uuid
+
+from celery import shared_task, states
+from celery.result import AsyncResult
+from django.core.cache import caches
+from django.conf import settings
+
+from .archive import archive_history, prune_fingerprints
+from .cache import result_cache_key
+from .history import write_rows
+from .ingest import ingest_feeds
+from .models import QueryHistory
+from .pipeline import analyze
+
+logger = logging.getLogger(__name__)
+
+def _inflight_key(url, text):
+    return "job:" + (result_cache_key(url=url) if url else result_cache_key(text=text))
+
+@shared_task
+def analyze_article_task(url, text, inflight_key=None):
+    """Runs the full fetch -> summarize -> classify pipeline and writes its QueryHistory row."""
+    try:
+        body, status = analyze(url, text)
+        return {"status_code": status, "body": body}
+    finally:
+        if inflight_key:
+            caches["default"].delete(inflight_key)
+
+def enqueue_analysis(url, text):
+    """
+    Queue an analysis and return its job ID. While a job for the same normalized
+    input is still in flight, its ID is returned instead of queueing a duplicate.
+    The worker clears the key when it finishes, but only a shared CACHE_URL lets it
+    reach the web process's copy, so a key whose job has already finished is replaced.
+    """
+    inflight_key = _inflight_key(url, text)
+    job_id = str(uuid.uuid4())
+    jobs = caches["default"]
+    if not jobs.add(inflight_key, job_id, timeout=settings.JOB_DEDUP_TTL):
+        existing = jobs.get(inflight_key)
+        if existing and AsyncResult(existing).state not in states.READY_STATES:
+            return existing
+        jobs.set(inflight_key, job_id, timeout=settings.JOB_DEDUP_TTL)
+    try:
+        analyze_article_task.apply_async(args=[url, text], kwargs={"inflight_key": inflight_key}, task_id=job_id)
+    except Exception:
+        jobs.delete(inflight_key)
+        raise
+    return job_id
+
+@shared_task
+def write_history_task(rows):
+    """Writes a batch of history rows flushed by a web process in HISTORY_WRITE_MODE=celery."""
+    write_rows([QueryHistory(**row) for row in rows])
+
+INGEST_LOCK_KEY = "ingest:running"
+
+@shared_task
+def ingest_feeds_task():
+    """Celery beat entry point for feed ingestion. A cycle still running makes the next one a no-op."""
+    locks = caches["default"]
+    if not locks.add(INGEST_LOCK_KEY, True, timeout=settings.INGEST_INTERVAL * 2):
+        logger.info("Previous feed ingestion still running; skipping this cycle")
+        return None
+    try:
+        return ingest_feeds()
+    finally:
+        locks.delete(INGEST_LOCK_KEY)
+
+ARCHIVE_LOCK_KEY = "archive:running"
 
 @shared_task
-def analyze_article_task(text, title, author, published_date):
-    summary = summarize_text(text)
-    label, confidence = classify_fake_news(text)
-    return {
-        'summary': summary,
-        'fake_news_label': label,
-        'fake_news_confidence': confidence,
-        'article_title': title,
-        'article_author': author,
-        'published_date': published_date,
-    }
+def archive_history_task():
+    """Celery beat entry point for history retention; skipped while a previous run holds the lock."""
+    locks = caches["default"]
+    if not locks.add(ARCHIVE_LOCK_KEY, True, timeout=settings.ARCHIVE_INTERVAL):
+        logger.info("Previous history archive run still going; skipping this one")
+        return None
+    try:
+        stats = archive_history()
+        stats["fingerprints_pruned"] = prune_fingerprints()
+        return stats
+    finally:
+        locks.delete(ARCHIVE_LOCK_KEY)
@@ -1,3 +1,94 @@
-from django.test import TestCase
+import asyncio
+from unittest import mock
 
-# Create your tests here.
+import requests
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+
+from .breaker import CLOSED, HALF_OPEN, CircuitBreaker
+from .inference import AsyncInferenceClient, InferenceClient
+from .throttle import RateLimiter, RateLimitExceeded
+
+def _response(status, body=b"{}"):
+    response = requests.Response()
+    response.status_code = status
+    response._content = body
+    return response
+
+class HalfOpenTrialTests(SimpleTestCase):
+    """The half-open trial call must be settled however it ends."""
+
+    def setUp(self):
+        # Opens after one failure and goes half-open on the next call
+        self.breaker = CircuitBreaker("test-model", failure_threshold=1, reset_timeout=0)
+        self.breaker.record_failure()
+        patcher = mock.patch("main.inference.get_breaker", return_value=self.breaker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        options = dict(base_url="http://hf.invalid", pool_size=1, max_retries=0, deadline=5, backoff=0, coalesce=False)
+        self.client = InferenceClient(**options)
+        self.async_client = AsyncInferenceClient(**options)
+
+    def _post(self, outcome):
+        with mock.patch.object(InferenceClient, "_post", side_effect=[outcome]):
+            return self.client.post("test-model", {"inputs": "x"})
+
+    def _apost(self, outcome):
+        async def post(*args):
+            if isinstance(outcome, BaseException):
+                raise outcome
+            return outcome
+        with mock.patch.object(AsyncInferenceClient, "_post", post):
+            return asyncio.run(self.async_client.post("test-model", {"inputs": "x"}))
+
+    def test_unexpected_error_frees_the_trial(self):
+        with self.assertRaises(ValueError):
+            self._post(ValueError("bad JSON"))
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        self.assertFalse(self.breaker.trial_running)
+        self._post(_response(200))
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_async_cancellation_frees_the_trial(self):
+        with self.assertRaises(asyncio.CancelledError):
+            self._apost(asyncio.CancelledError())
+        self.assertFalse(self.breaker.trial_running)
+        self._apost(_response(200))
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_rate_limited_or_loading_answer_does_not_close(self):
+        for response in (_response(429), _response(503, b'{"error": "Model is currently loading"}')):
+            self._post(response)
+            self.assertEqual(self.breaker.state, HALF_OPEN)
+            self.assertFalse(self.breaker.trial_running)
+
+class TokenBucketTests(SimpleTestCase):
+    def setUp(self):
+        caches["default"].delete("ratelimit:test-model")
+        self.limiter = RateLimiter()
+        self.now = 1000.0
+        patcher = mock.patch("main.throttle.time.time", side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _waits(self, rate, times):
+        waits = []
+        for at in times:
+            self.now = 1000.0 + at
+            waits.append(round(self.limiter._take("test-model", rate), 3))
+        return waits
+
+    @override_settings(HF_RATE_BURST=2)
+    def test_no_double_burst_across_a_second_boundary(self):
+        # Two calls drain the bucket; at the next second only one more has been refilled
+        self.assertEqual(self._waits(2, [0.99, 0.99, 0.99, 1.0, 1.0]), [0, 0, 0.5, 0.49, 0.49])
+
+    @override_settings(HF_RATE_BURST=1)
+    def test_fractional_rate(self):
+        self.assertEqual(self._waits(2.5, [0, 0, 0.4, 0.4, 0.8]), [0, 0.4, 0, 0.4, 0])
+
+    @override_settings(HF_RATE_LIMIT_RPS=1, HF_RATE_LIMITS={}, HF_RATE_BURST=1)
+    def test_gives_up_at_the_deadline(self):
+        self.limiter.acquire("test-model", give_up_at=float("inf"))
+        with self.assertRaises(RateLimitExceeded):
+            self.limiter.acquire("test-model", give_up_at=0)
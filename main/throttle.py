@@ -0,0 +1,177 @@
+# backend/main/throttle.py
+"""
+Upstream call shaping for the inference clients: a per-model token bucket shared by
+all workers through the cache, and single-flight coalescing of identical calls.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import random
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+
+from .metrics import UPSTREAM_THROTTLED, UPSTREAM_COALESCED
+
+logger = logging.getLogger(__name__)
+
+class RateLimitExceeded(requests.exceptions.Timeout):
+    """The model's request budget had no room before the caller's deadline."""
+
+def rate_limit_for(model):
+    """Requests per second allowed for model; 0 means unlimited."""
+    return settings.HF_RATE_LIMITS.get(model, settings.HF_RATE_LIMIT_RPS)
+
+def _bucket(rate):
+    """(seconds per call, bucket size in calls) for a budget of rate calls per second."""
+    return 1.0 / rate, max(1.0, settings.HF_RATE_BURST)
+
+# Takes one call from the bucket stored at KEYS[1] as the time it will be full again.
+# ARGV: now, seconds per call, bucket size. Returns 0, or the seconds until a call is
+# free (as a string, since Redis truncates Lua numbers to integers).
+TAKE_SCRIPT = """
+local now, interval, size = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local full_at = math.max(tonumber(redis.call("GET", KEYS[1]) or 0), now) + interval
+local wait = full_at - size * interval - now
+if wait > 0 then
+    return tostring(wait)
+end
+redis.call("SET", KEYS[1], tostring(full_at), "PX", math.ceil((full_at - now) * 1000) + 1000)
+return "0"
+"""
+
+_bucket_lock = threading.Lock()
+
+class RateLimiter:
+    """
+    Token bucket in the "default" cache: each model gets `rate` calls per second across
+    every process sharing the cache, and at most HF_RATE_BURST of them back to back.
+    The bucket is kept as the time it will be full again. It is updated by a Lua script
+    on Redis, and under a process lock on other caches (local memory is per process
+    anyway). Callers that find it empty wait for the next call, but never past their
+    own deadline. If the cache itself fails, calls are let through rather than blocked.
+    """
+
+    def __init__(self):
+        self.script = None
+
+    def _take(self, model, rate):
+        """Take a call from model's bucket; returns 0, or the seconds until one is free."""
+        interval, size = _bucket(rate)
+        cache = caches["default"]
+        now = time.time()
+        if isinstance(cache, RedisCache):
+            key = cache.make_and_validate_key(f"ratelimit:{model}")
+            client = cache._cache.get_client(key, write=True)
+            if self.script is None:
+                self.script = client.register_script(TAKE_SCRIPT)
+            return float(self.script(keys=[key], args=[now, interval, size], client=client))
+        key = f"ratelimit:{model}"
+        with _bucket_lock:
+            full_at = max(cache.get(key, 0), now) + interval
+            wait = full_at - size * interval - now
+            if wait > 0:
+                return wait
+            cache.set(key, full_at, timeout=int(full_at - now) + 1)
+            return 0
+
+    def _delay(self, model, rate, give_up_at):
+        """Seconds to sleep before trying again, or None if the call may go ahead."""
+        try:
+            wait = self._take(model, rate)
+        except Exception:
+            logger.exception("Rate limiter cache unavailable; not limiting")
+            return None
+        if not wait:
+            return None
+        # Small jitter so waiters don't all retry at the same instant
+        delay = wait + random.uniform(0, 0.05)
+        if time.monotonic() + delay >= give_up_at:
+            raise RateLimitExceeded(f"Rate limit budget for {model} exhausted")
+        UPSTREAM_THROTTLED.inc(model=model)
+        return delay
+
+    def acquire(self, model, give_up_at):
+        rate = rate_limit_for(model)
+        if not rate:
+            return
+        while True:
+            delay = self._delay(model, rate, give_up_at)
+            if delay is None:
+                return
+            time.sleep(delay)
+
+    async def aacquire(self, model, give_up_at):
+        rate = rate_limit_for(model)
+        if not rate:
+            return
+        while True:
+            delay = await sync_to_async(self._delay)(model, rate, give_up_at)
+            if delay is None:
+                return
+            await asyncio.sleep(delay)
+
+def call_key(model, payload):
+    body = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(f"{model}\n{body}".encode("utf-8")).hexdigest()
+
+class SingleFlight:
+    """
+    Concurrent calls with the same key share one execution: the first caller runs it
+    and the others wait for its result (or exception) until their own deadline.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+
+    def run(self, key, model, give_up_at, function):
+        with self.lock:
+            future = self.calls.get(key)
+            leader = future is None
+            if leader:
+                future = self.calls[key] = Future()
+        if not leader:
+            UPSTREAM_COALESCED.inc(model=model)
+            try:
+                return future.result(timeout=max(0, give_up_at - time.monotonic()))
+            except FutureTimeoutError:
+                raise requests.exceptions.Timeout(f"Inference deadline exceeded for {model}")
+        try:
+            result = function()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self.lock:
+                self.calls.pop(key, None)
+
+class AsyncSingleFlight:
+    """SingleFlight for coroutines. Async clients are per event loop, and so is this."""
+
+    def __init__(self):
+        self.calls = {}
+
+    async def run(self, key, model, give_up_at, function):
+        calls = self.calls
+        task = calls.get(key)
+        if task is None:
+            task = calls[key] = asyncio.ensure_future(function())
+            task.add_done_callback(lambda _: calls.pop(key, None))
+        else:
+            UPSTREAM_COALESCED.inc(model=model)
+        try:
+            # shield: a waiter giving up must not cancel the call for everyone else
+            return await asyncio.wait_for(asyncio.shield(task), max(0, give_up_at - time.monotonic()))
+        except asyncio.TimeoutError:
+            raise requests.exceptions.Timeout(f"Inference deadline exceeded for {model}")
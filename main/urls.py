@@ -1,14 +1,25 @@
 # backend/main/urls.py
+from django.conf import settings
 from django.urls import path 
-from .views import AnalyzeView, feedback_view, temp_create_superuser, AllQueryHistoryView, AllFeedbackView, change_admin_password, health_check,list_superusers, admin_check, temp_reset_superuser_password
+from .views import AnalyzeView, AnalyzeBatchView, AnalyzeStreamView, analyze_async_view, analyze_stream_async_view, job_status_view, feedback_view, temp_create_superuser, AllQueryHistoryView, AllFeedbackView, change_admin_password, health_check,list_superusers, cache_stats_view, export_view, history_search_view, stats_view, accuracy_view, metrics_view, admin_check, temp_reset_superuser_password
 from rest_framework.authtoken.views import obtain_auth_token
 
 urlpatterns = [
     path('', health_check, name='health_check'),
-    path("analyze/", AnalyzeView.as_view()),
+    # Under ASGI the analyze endpoint is served by the native async view
+    path("analyze/", analyze_async_view if settings.ASGI_MODE else AnalyzeView.as_view()),
+    path("analyze/batch/", AnalyzeBatchView.as_view()),
+    path("analyze/stream/", analyze_stream_async_view if settings.ASGI_MODE else AnalyzeStreamView.as_view()),
+    path("jobs/<str:job_id>/", job_status_view),
     path("feedback/", feedback_view),
     path("all-history/", AllQueryHistoryView.as_view()),
+    path("history/search/", history_search_view),
     path("all-feedback/", AllFeedbackView.as_view()),
+    path("cache-stats/", cache_stats_view),
+    path("export/<str:table>/", export_view),
+    path("stats/", stats_view),
+    path("accuracy/", accuracy_view),
+    path("metrics/", metrics_view),
     path("admin-token/", obtain_auth_token),  # This is for admin login
     path("change-password/", change_admin_password),
     path("admin-check/", admin_check),  
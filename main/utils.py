@@ -1,121 +1,444 @@
 # backend/main/utils.py
+import asyncio
 import os
+import re
 import requests
 import logging
-from newspaper import Article
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from .fetch import fetch_article, fetch_article_async
+from .breaker import CircuitOpenError
+from .inference import get_inference_client, get_async_inference_client, SUMMARY_MODEL, NLI_MODEL
 
 # Set up logging for error tracing
 logger = logging.getLogger(__name__)
 
+# Every error string summarize_text can return starts with one of these
+SUMMARY_ERROR_PREFIXES = (
+    "Summary unavailable",
+    "Summary model is loading",
+    "Summary error",
+    "Summary API error",
+)
+
+SUMMARY_TIMEOUT_MESSAGE = "Summary unavailable: The summarization service timed out. Please try again later."
+NLI_TIMEOUT_MESSAGE = "The fake news classification service timed out. Please try again later."
+NLI_CANDIDATE_LABELS = ["real news", "fake news", "opinion", "satire"]
+SUMMARY_NO_KEY_MESSAGE = "Summary unavailable: HF_API_KEY not configured. Please contact the administrator."
+NLI_NO_KEY_MESSAGE = "HF_API_KEY not configured. Please contact the administrator."
+SUMMARY_UNAVAILABLE_MESSAGE = "Summary unavailable: The summarization service is temporarily unavailable. Please try again later."
+NLI_UNAVAILABLE_MESSAGE = "The fake news classification service is temporarily unavailable. Please try again later."
+
+# Bounded parallelism for the map step of long-document summaries
+_chunk_executor = ThreadPoolExecutor(
+    max_workers=settings.SUMMARY_MAP_CONCURRENCY, thread_name_prefix="summary-chunk"
+)
+
+def is_summary_error(summary):
+    """Return True if summarize_text returned an error message instead of a summary."""
+    return summary.startswith(SUMMARY_ERROR_PREFIXES)
+
 def get_text_from_url(url):
-    """Extract article text and metadata from the provided URL using newspaper3k."""
-    article = Article(url)
+    """
+    Extract article text and metadata from the provided URL. Downloads are streamed with a
+    byte cap and deadline, and results are cached and revalidated (see fetch.py).
+    """
     try:
-        article.download()
-        article.parse()
+        return fetch_article(url)
     except Exception as e:
         logger.exception("Failed to fetch article from URL: %s", url)
         raise RuntimeError(f"Could not fetch article. Error: {str(e)}")
-    return {
-        'text': article.text.strip(),
-        'title': article.title or "",
-        'author': ', '.join(article.authors) or "",
-        'published_date': str(article.publish_date or ""),
-    }
 
-def summarize_text(text):
+async def get_text_from_url_async(url):
     """
-    Calls HuggingFace summarization API and returns summary text or an error message.
-    Handles missing API key, rate limits, model loading, and other common issues gracefully.
+    Async variant of get_text_from_url: the download is awaited with httpx and only
+    the CPU-bound newspaper3k parse runs on a worker thread.
     """
-    api_url = "https://api-inference.huggingface.co/models/facebook/bart-large-cnn"
+    try:
+        return await fetch_article_async(url)
+    except Exception as e:
+        logger.exception("Failed to fetch article from URL: %s", url)
+        raise RuntimeError(f"Could not fetch article. Error: {str(e)}")
+
+def _hf_headers():
     api_key = os.getenv('HF_API_KEY')
     if not api_key:
         logger.error("HF_API_KEY not set in environment")
-        return "Summary unavailable: HF_API_KEY not configured. Please contact the administrator."
+        return None
+    return {"Authorization": f"Bearer {api_key}"}
 
-    headers = {"Authorization": f"Bearer {api_key}"}
-    payload = {"inputs": text[:1024]}
-    try:
-        response = requests.post(api_url, headers=headers, json=payload, timeout=30)
-        if response.status_code == 429:
-            logger.warning("HuggingFace API rate limited: %s", response.text)
-            return "Summary unavailable: Rate limit exceeded. Please wait and try again later."
-        response.raise_for_status()
-        data = response.json()
-        if isinstance(data, list) and "summary_text" in data[0]:
-            return data[0]["summary_text"]
-        if "error" in data:
-            logger.error("HuggingFace API error: %s", data["error"])
-            # Special case: model is loading on HuggingFace
-            if "currently loading" in data["error"].lower() or "loading" in data["error"].lower():
-                return "Summary model is loading. Please try again in a few moments."
-            return f"Summary error: {data['error']}"
-        if "estimated_time" in data:
+def _summary_input(text, max_chars=1024):
+    return text[:max_chars]
+
+def _summary_payload(inputs, parameters=None):
+    payload = {"inputs": inputs}
+    if parameters:
+        payload["parameters"] = parameters
+    return payload
+
+def _parse_summary_response(response):
+    if response.status_code == 429:
+        logger.warning("HuggingFace API rate limited: %s", response.text)
+        return "Summary unavailable: Rate limit exceeded. Please wait and try again later."
+    if response.status_code == 503 and "loading" in response.text.lower():
+        return "Summary model is loading. Please try again in a few moments."
+    response.raise_for_status()
+    data = response.json()
+    if isinstance(data, list) and "summary_text" in data[0]:
+        return data[0]["summary_text"]
+    if "error" in data:
+        logger.error("HuggingFace API error: %s", data["error"])
+        # Special case: model is loading on HuggingFace
+        if "currently loading" in data["error"].lower() or "loading" in data["error"].lower():
             return "Summary model is loading. Please try again in a few moments."
-        # Fallback for any unexpected API response
-        return f"Summary unavailable: Unexpected API response. ({str(data)})"
-    except requests.exceptions.HTTPError as http_err:
-        logger.error("Summary API HTTP error: %s", http_err)
-        return f"Summary API error: {str(http_err)}"
-    except requests.exceptions.Timeout:
+        return f"Summary error: {data['error']}"
+    if "estimated_time" in data:
+        return "Summary model is loading. Please try again in a few moments."
+    # Fallback for any unexpected API response
+    return f"Summary unavailable: Unexpected API response. ({str(data)})"
+
+def _parse_summary_batch(response, count):
+    """Per-input summaries from a list-input call; whole-call errors apply to every input."""
+    if response.status_code == 200:
+        data = response.json()
+        if isinstance(data, list) and len(data) == count:
+            return [
+                item["summary_text"] if isinstance(item, dict) and "summary_text" in item
+                else f"Summary unavailable: Unexpected API response. ({str(item)})"
+                for item in data
+            ]
+    return [_parse_summary_response(response)] * count
+
+def _summary_failure(e):
+    """Map an exception raised while summarizing to the user-facing message."""
+    if isinstance(e, CircuitOpenError):
+        logger.warning("Summary call skipped: %s", e)
+        return SUMMARY_UNAVAILABLE_MESSAGE
+    if isinstance(e, requests.exceptions.HTTPError):
+        logger.error("Summary API HTTP error: %s", e)
+        return f"Summary API error: {str(e)}"
+    if isinstance(e, requests.exceptions.Timeout):
         logger.error("Summary API request timed out")
-        return "Summary unavailable: The summarization service timed out. Please try again later."
+        return SUMMARY_TIMEOUT_MESSAGE
+    logger.exception("Summarization error: %s", e)
+    return f"Summary unavailable: {str(e)}"
+
+def summarize_text(text, max_chars=1024, parameters=None):
+    """
+    Calls HuggingFace summarization API and returns summary text or an error message.
+    Handles missing API key, rate limits, model loading, and other common issues gracefully.
+    """
+    headers = _hf_headers()
+    if headers is None:
+        return SUMMARY_NO_KEY_MESSAGE
+    payload = _summary_payload(_summary_input(text, max_chars), parameters)
+    try:
+        response = get_inference_client().post(SUMMARY_MODEL, payload, headers=headers)
+        return _parse_summary_response(response)
     except Exception as e:
-        logger.exception("Summarization error: %s", e)
-        return f"Summary unavailable: {str(e)}"
+        return _summary_failure(e)
 
-def classify_fake_news_ensemble(text):
+async def summarize_text_async(text, max_chars=1024, parameters=None):
+    """Async variant of summarize_text with identical results and error messages."""
+    headers = _hf_headers()
+    if headers is None:
+        return SUMMARY_NO_KEY_MESSAGE
+    payload = _summary_payload(_summary_input(text, max_chars), parameters)
+    try:
+        response = await get_async_inference_client().post(SUMMARY_MODEL, payload, headers=headers)
+        return _parse_summary_response(response)
+    except Exception as e:
+        return _summary_failure(e)
+
+# Sentence ends: terminal punctuation, optionally followed by a closing quote or bracket
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+|(?<=[.!?]["\'”’)\]])\s+')
+
+def split_sentences(text):
+    return [sentence.strip() for sentence in SENTENCE_BOUNDARY.split(text) if sentence.strip()]
+
+def chunk_sentences(text, max_chars):
+    """Group whole sentences into chunks of at most max_chars; overlong sentences are hard-split."""
+    chunks, current = [], ""
+    for sentence in split_sentences(text):
+        while len(sentence) > max_chars:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(sentence[:max_chars])
+            sentence = sentence[max_chars:]
+        if current and len(current) + 1 + len(sentence) > max_chars:
+            chunks.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        chunks.append(current)
+    return chunks
+
+def _map_parameters():
+    return {"max_length": settings.SUMMARY_MAP_MAX_TOKENS}
+
+def _combine_partials(partials):
+    """Joined partial summaries, or the first error message if every chunk failed."""
+    good = [partial for partial in partials if not is_summary_error(partial)]
+    if not good:
+        return None, partials[0]
+    return " ".join(good), None
+
+def summarize_long_text(text):
     """
-    Calls HuggingFace zero-shot classification API and returns the verdict, confidence, and details.
-    Handles API key, rate limit, loading, and error messages in a user-friendly way.
+    Map-reduce summary for articles longer than one model input. The text is split on
+    sentence boundaries, chunks are summarized concurrently, and the joined partial
+    summaries are summarized again (repeating while they are still too long).
+    At most SUMMARY_MAX_CALLS upstream calls are made; past that budget the leading
+    chunks are kept, since news articles front-load the important facts.
     """
-    api_url = "https://api-inference.huggingface.co/models/facebook/bart-large-mnli"
-    api_key = os.getenv('HF_API_KEY')
-    if not api_key:
-        logger.error("HF_API_KEY not set in environment")
-        return "UNSURE", 0, {"error": "HF_API_KEY not configured. Please contact the administrator."}
-    headers = {"Authorization": f"Bearer {api_key}"}
-    payload = {
-        "inputs": text[:512],
+    chunk_chars = settings.SUMMARY_CHUNK_CHARS
+    budget = settings.SUMMARY_MAX_CALLS
+    pieces = chunk_sentences(text, chunk_chars)
+    while len(pieces) > 1 and budget > 1:
+        # Always keep one call in reserve for the final summary
+        pieces = pieces[:budget - 1]
+        partials = list(_chunk_executor.map(
+            lambda chunk: summarize_text(chunk, max_chars=chunk_chars, parameters=_map_parameters()),
+            pieces,
+        ))
+        budget -= len(pieces)
+        joined, error = _combine_partials(partials)
+        if error:
+            return error
+        pieces = chunk_sentences(joined, chunk_chars)
+    return summarize_text(" ".join(pieces), max_chars=chunk_chars)
+
+async def summarize_long_text_async(text):
+    """Async variant of summarize_long_text with the same chunking and call budget."""
+    chunk_chars = settings.SUMMARY_CHUNK_CHARS
+    budget = settings.SUMMARY_MAX_CALLS
+    semaphore = asyncio.Semaphore(settings.SUMMARY_MAP_CONCURRENCY)
+
+    async def summarize_chunk(chunk):
+        async with semaphore:
+            return await summarize_text_async(chunk, max_chars=chunk_chars, parameters=_map_parameters())
+
+    pieces = chunk_sentences(text, chunk_chars)
+    while len(pieces) > 1 and budget > 1:
+        pieces = pieces[:budget - 1]
+        partials = await asyncio.gather(*[summarize_chunk(chunk) for chunk in pieces])
+        budget -= len(pieces)
+        joined, error = _combine_partials(partials)
+        if error:
+            return error
+        pieces = chunk_sentences(joined, chunk_chars)
+    return await summarize_text_async(" ".join(pieces), max_chars=chunk_chars)
+
+def summarize_article(text):
+    """Summarize with long-document mode when it is enabled and the text needs it."""
+    if settings.SUMMARY_LONG_DOCUMENTS and len(text) > 1024:
+        return summarize_long_text(text)
+    return summarize_text(text)
+
+async def summarize_article_async(text):
+    if settings.SUMMARY_LONG_DOCUMENTS and len(text) > 1024:
+        return await summarize_long_text_async(text)
+    return await summarize_text_async(text)
+
+def _nli_input(text):
+    return text[:512]
+
+def _nli_payload(inputs):
+    return {
+        "inputs": inputs,
         "parameters": {
-            "candidate_labels": ["real news", "fake news", "opinion", "satire"],
+            "candidate_labels": NLI_CANDIDATE_LABELS,
             "multi_label": False,
         },
     }
-    try:
-        response = requests.post(api_url, headers=headers, json=payload, timeout=30)
-        if response.status_code == 429:
-            logger.warning("NLI API rate limited: %s", response.text)
-            return "UNSURE", 0, {"error": "NLI service rate limited. Please wait and try again later."}
-        response.raise_for_status()
-        nli_result = response.json()
-        if "error" in nli_result:
-            logger.error("NLI API error: %s", nli_result["error"])
-            if "currently loading" in nli_result["error"].lower() or "loading" in nli_result["error"].lower():
-                return "UNSURE", 0, {"error": "The AI model is loading. Please try again in a few moments."}
-            return "UNSURE", 0, {"error": nli_result["error"]}
-        if "labels" not in nli_result or not nli_result["labels"]:
-            logger.error("NLI API response missing labels: %s", nli_result)
-            return "UNSURE", 0, {"error": "NLI API returned no labels."}
-        label = nli_result["labels"][0]
-        confidence = round(nli_result["scores"][0] * 100, 1)
-        if label in ["fake news", "opinion", "satire"] and confidence > 60:
-            verdict = label.upper()
-        elif label == "real news" and confidence > 60:
-            verdict = "REAL NEWS"
-        else:
-            verdict = "UNSURE"
-        return verdict, confidence, {
-            "nli_label": label,
-            "nli_confidence": confidence,
-        }
-    except requests.exceptions.HTTPError as http_err:
-        logger.error("NLI API HTTP error: %s", http_err)
-        return "UNSURE", 0, {"error": str(http_err)}
-    except requests.exceptions.Timeout:
+
+def _parse_nli_response(response):
+    if response.status_code == 429:
+        logger.warning("NLI API rate limited: %s", response.text)
+        return "UNSURE", 0, {"error": "NLI service rate limited. Please wait and try again later."}
+    if response.status_code == 503 and "loading" in response.text.lower():
+        return "UNSURE", 0, {"error": "The AI model is loading. Please try again in a few moments."}
+    response.raise_for_status()
+    nli_result = response.json()
+    if "error" in nli_result:
+        logger.error("NLI API error: %s", nli_result["error"])
+        if "currently loading" in nli_result["error"].lower() or "loading" in nli_result["error"].lower():
+            return "UNSURE", 0, {"error": "The AI model is loading. Please try again in a few moments."}
+        return "UNSURE", 0, {"error": nli_result["error"]}
+    return _verdict_from_nli(nli_result)
+
+def _verdict_from_nli(nli_result):
+    if "labels" not in nli_result or not nli_result["labels"]:
+        logger.error("NLI API response missing labels: %s", nli_result)
+        return "UNSURE", 0, {"error": "NLI API returned no labels."}
+    label = nli_result["labels"][0]
+    confidence = round(nli_result["scores"][0] * 100, 1)
+    if label in ["fake news", "opinion", "satire"] and confidence > 60:
+        verdict = label.upper()
+    elif label == "real news" and confidence > 60:
+        verdict = "REAL NEWS"
+    else:
+        verdict = "UNSURE"
+    return verdict, confidence, {
+        "nli_label": label,
+        "nli_confidence": confidence,
+    }
+
+def _parse_nli_batch(response, count):
+    """Per-input verdicts from a list-input call; whole-call errors apply to every input."""
+    if response.status_code == 200:
+        data = response.json()
+        if isinstance(data, list) and len(data) == count:
+            return [_verdict_from_nli(item) for item in data]
+    return [_parse_nli_response(response)] * count
+
+def _nli_failure(e):
+    """Map an exception raised while classifying to the (verdict, confidence, details) result."""
+    if isinstance(e, CircuitOpenError):
+        logger.warning("NLI call skipped: %s", e)
+        return "UNSURE", 0, {"error": NLI_UNAVAILABLE_MESSAGE}
+    if isinstance(e, requests.exceptions.HTTPError):
+        logger.error("NLI API HTTP error: %s", e)
+        return "UNSURE", 0, {"error": str(e)}
+    if isinstance(e, requests.exceptions.Timeout):
         logger.error("NLI API request timed out")
-        return "UNSURE", 0, {"error": "The fake news classification service timed out. Please try again later."}
+        return "UNSURE", 0, {"error": NLI_TIMEOUT_MESSAGE}
+    logger.exception("NLI classification error: %s", e)
+    return "UNSURE", 0, {"error": str(e)}
+
+def classify_fake_news_ensemble(text):
+    """
+    Calls HuggingFace zero-shot classification API and returns the verdict, confidence, and details.
+    Handles API key, rate limit, loading, and error messages in a user-friendly way.
+    """
+    headers = _hf_headers()
+    if headers is None:
+        return "UNSURE", 0, {"error": NLI_NO_KEY_MESSAGE}
+    payload = _nli_payload(_nli_input(text))
+    try:
+        response = get_inference_client().post(NLI_MODEL, payload, headers=headers)
+        return _parse_nli_response(response)
     except Exception as e:
-        logger.exception("NLI classification error: %s", e)
-        return "UNSURE", 0, {"error": str(e)}
\ No newline at end of file
+        return _nli_failure(e)
+
+async def classify_fake_news_ensemble_async(text):
+    """Async variant of classify_fake_news_ensemble with identical results and error messages."""
+    headers = _hf_headers()
+    if headers is None:
+        return "UNSURE", 0, {"error": NLI_NO_KEY_MESSAGE}
+    payload = _nli_payload(_nli_input(text))
+    try:
+        response = await get_async_inference_client().post(NLI_MODEL, payload, headers=headers)
+        return _parse_nli_response(response)
+    except Exception as e:
+        return _nli_failure(e)
+
+def summarize_texts(texts):
+    """
+    Summarizes several texts with one multi-input HuggingFace call.
+    Returns one summary or error message per text, in order.
+    """
+    headers = _hf_headers()
+    if headers is None:
+        return [SUMMARY_NO_KEY_MESSAGE] * len(texts)
+    payload = _summary_payload([_summary_input(text) for text in texts])
+    try:
+        response = get_inference_client().post(SUMMARY_MODEL, payload, headers=headers)
+        return _parse_summary_batch(response, len(texts))
+    except Exception as e:
+        return [_summary_failure(e)] * len(texts)
+
+def classify_fake_news_batch(texts):
+    """
+    Classifies several texts with one multi-input zero-shot call.
+    Returns one (verdict, confidence, details) tuple per text, in order.
+    """
+    headers = _hf_headers()
+    if headers is None:
+        return [("UNSURE", 0, {"error": NLI_NO_KEY_MESSAGE})] * len(texts)
+    payload = _nli_payload([_nli_input(text) for text in texts])
+    try:
+        response = get_inference_client().post(NLI_MODEL, payload, headers=headers)
+        return _parse_nli_batch(response, len(texts))
+    except Exception as e:
+        return [_nli_failure(e)] * len(texts)
+
+def local_summary(text):
+    """Extractive TextRank summary computed in-process, without calling HuggingFace."""
+    from .local_engine import textrank_summary
+    return textrank_summary(text, settings.LOCAL_SUMMARY_SENTENCES)
+
+def local_classification(text):
+    """(verdict, confidence, details) from the in-process classifier, same thresholds as NLI."""
+    from .local_engine import classify_text
+    return _verdict_from_nli(classify_text(text))
+
+# INFERENCE_BACKEND picks the engine: "remote" (HuggingFace only), "local" (in-process
+# only) or "fallback" (HuggingFace, switching to local whenever the remote call fails).
+# The *_with_backend functions also return which engine produced the result.
+
+def summarize_with_backend(text):
+    backend = settings.INFERENCE_BACKEND
+    if backend == "local":
+        return local_summary(text), "local"
+    summary = summarize_article(text)
+    if backend == "fallback" and is_summary_error(summary):
+        logger.warning("Remote summary failed (%s); using local summarizer", summary)
+        return local_summary(text), "local"
+    return summary, "remote"
+
+async def summarize_with_backend_async(text):
+    backend = settings.INFERENCE_BACKEND
+    if backend == "local":
+        return local_summary(text), "local"
+    summary = await summarize_article_async(text)
+    if backend == "fallback" and is_summary_error(summary):
+        logger.warning("Remote summary failed (%s); using local summarizer", summary)
+        return local_summary(text), "local"
+    return summary, "remote"
+
+def classify_with_backend(text):
+    backend = settings.INFERENCE_BACKEND
+    if backend == "local":
+        return (*local_classification(text), "local")
+    verdict, confidence, details = classify_fake_news_ensemble(text)
+    if backend == "fallback" and details.get("error"):
+        logger.warning("Remote classification failed (%s); using local classifier", details["error"])
+        return (*local_classification(text), "local")
+    return verdict, confidence, details, "remote"
+
+async def classify_with_backend_async(text):
+    backend = settings.INFERENCE_BACKEND
+    if backend == "local":
+        return (*local_classification(text), "local")
+    verdict, confidence, details = await classify_fake_news_ensemble_async(text)
+    if backend == "fallback" and details.get("error"):
+        logger.warning("Remote classification failed (%s); using local classifier", details["error"])
+        return (*local_classification(text), "local")
+    return verdict, confidence, details, "remote"
+
+def summarize_texts_with_backend(texts):
+    backend = settings.INFERENCE_BACKEND
+    if backend == "local":
+        return [(local_summary(text), "local") for text in texts]
+    summaries = summarize_texts(texts)
+    if backend == "fallback":
+        return [
+            (local_summary(text), "local") if is_summary_error(summary) else (summary, "remote")
+            for text, summary in zip(texts, summaries)
+        ]
+    return [(summary, "remote") for summary in summaries]
+
+def classify_texts_with_backend(texts):
+    backend = settings.INFERENCE_BACKEND
+    if backend == "local":
+        return [(*local_classification(text), "local") for text in texts]
+    results = classify_fake_news_batch(texts)
+    if backend == "fallback":
+        return [
+            (*local_classification(text), "local") if result[2].get("error") else (*result, "remote")
+            for text, result in zip(texts, results)
+        ]
+    return [(*result, "remote") for result in results]
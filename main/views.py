@@ -6,15 +6,47 @@ from rest_framework.permissions import IsAdminUser, AllowAny, IsAuthenticated
 from rest_framework.generics import ListAPIView
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.authtoken.models import Token
-from .utils import get_text_from_url, summarize_text, classify_fake_news_ensemble
+from rest_framework.exceptions import ValidationError
+from rest_framework.utils.urls import replace_query_param
+from .utils import get_text_from_url, get_text_from_url_async
+from .pipeline import (
+    analyze, run_inference_async, run_batch_inference, submit_fetch, input_error,
+    analysis_result, history_row, FETCH_ERROR, EMPTY_ARTICLE_ERROR, start_inference, summary_outcome,
+    verdict_outcome, start_inference_async, asummary_outcome, averdict_outcome, with_engines,
+    near_duplicate_result, anear_duplicate_result, remember_result, aremember_result,
+)
+from .cache import (
+    result_cache_key, get_cached_result, set_cached_result, aget_cached_result,
+    aset_cached_result, cache_stats,
+)
+from .tasks import enqueue_analysis
+from .rollups import dashboard_stats, PERIODS
+from .history import save_history, asave_history
+from .admission import analyze_admission, Overloaded, AdmittedStreamingHttpResponse
+from .metrics import StageTimer, stage, observe_request, render as render_metrics
+from .export import EXPORTS, export_rows, aexport_rows, json_lines, ajson_lines, csv_lines, acsv_lines
 from .models import QueryHistory, Feedback
-from .serializers import QueryHistorySerializer
+from .serializers import QueryHistorySerializer, QueryHistoryListSerializer
+from .pagination import HistoryCursorPagination
+from .search import search_history
+from .accuracy import accuracy_report
 from django.contrib.auth.models import User
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
+import asyncio
+import json
 import sys
+import threading
 import time
-from django.http import HttpResponse
+import uuid
+from concurrent.futures import wait, FIRST_COMPLETED
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from datetime import datetime, time as dt_time
 
 def health_check(request):
     return HttpResponse(
@@ -24,63 +56,646 @@ def health_check(request):
         content_type="text/html"
     )
 
+def _wants_job(request):
+    return request.GET.get("async", "").lower() in ("1", "true")
+
+def _enqueue(url, text):
+    """Queue the analysis on Celery; returns (response body, HTTP status)."""
+    error = input_error(url, text)
+    if error:
+        return {"error": error}, 400
+    try:
+        job_id = enqueue_analysis(url, text)
+    except Exception as e:
+        print("AnalyzeView enqueue error:", e, file=sys.stderr)
+        return {"error": "Background analysis is unavailable right now. Please retry without async mode."}, 503
+    return {"job_id": job_id, "status": "PENDING", "status_url": f"/api/jobs/{job_id}/"}, 202
+
+def _overloaded(response_class, error):
+    """503 for an analysis turned away by admission control."""
+    response = response_class({"error": str(error)}, status=503)
+    response["Retry-After"] = str(settings.ANALYZE_RETRY_AFTER)
+    return response
+
 class AnalyzeView(APIView):
+    """POST a url or text. With ?async=1 the analysis runs on Celery and a job ID is returned."""
     permission_classes = [AllowAny]
     def post(self, request):
         start_time = time.time()
         url = (request.data.get("url") or "").strip()
         text = (request.data.get("text") or "").strip()
-        # Defensive: support only one being present
+        if _wants_job(request):
+            body, status = _enqueue(url, text)
+            return Response(body, status=status)
+        timer = StageTimer()
+        try:
+            with analyze_admission.admit():
+                body, status = analyze(url, text, start_time, timer)
+        except Overloaded as e:
+            return _overloaded(Response, e)
+        response = Response(body, status=status)
+        response["Server-Timing"] = timer.server_timing()
+        return response
+
+@api_view(["GET"])
+def job_status_view(request, job_id):
+    """Status of an async analysis; once finished, "result" holds the usual analyze response."""
+    from celery.result import AsyncResult
+    job = AsyncResult(job_id)
+    body = {"job_id": job_id, "status": job.status}
+    if job.successful():
+        body["result"] = job.result["body"]
+        body["result_status"] = job.result["status_code"]
+    elif job.failed():
+        body["error"] = f"AI failed: {str(job.result)}"
+    return Response(body)
+
+def _ndjson(obj):
+    return json.dumps(obj, default=str) + "\n"
+
+def _stream_batch(items):
+    """
+    Yields one NDJSON line per item as it finishes. Cached items come back first,
+    the rest are fetched concurrently and sent through batched inference calls.
+    History rows for the whole batch are handed to the history writer together.
+    """
+    start_time = time.time()
+    rows = []
+    ready = []
+    size = settings.BATCH_INFERENCE_SIZE
+
+    def finish(index, item, result, cache_hit=False):
+        duration_ms = int((time.time() - start_time) * 1000)
+        row = history_row(item["url"], item["text"], result, duration_ms, cache_hit)
+        rows.append(row)
+        return _ndjson({
+            "index": index,
+            "input": item["url"] or item["text"][:100],
+            **result,
+            "history_id": str(row.public_id),
+            "duration_ms": duration_ms,
+            "cache_hit": cache_hit,
+        })
+
+    def flush():
+        while ready:
+            batch = ready[:size]
+            del ready[:size]
+            try:
+                outputs = run_batch_inference([text for _, _, _, text, _ in batch])
+            except Exception as e:
+                print("AnalyzeBatchView pipeline error:", e, file=sys.stderr)
+                for index, *_ in batch:
+                    yield _ndjson({"index": index, "error": f"AI failed: {str(e)}"})
+                continue
+            for (index, item, article, text, cache_key), output in zip(batch, outputs):
+                result = analysis_result(article, *output)
+                set_cached_result(cache_key, result)
+                remember_result(text, result)
+                yield finish(index, {**item, "text": text}, result)
+
+    def queue(index, item, article, text, cache_key):
+        """Queue text for inference unless a near-duplicate was analyzed before."""
+        reused = near_duplicate_result(article, text)
+        if reused is None:
+            ready.append((index, item, article, text, cache_key))
+            return []
+        set_cached_result(cache_key, reused)
+        return [finish(index, {**item, "text": text}, reused, cache_hit=True)]
+
+    try:
+        fetches = {}
+        for index, item in enumerate(items):
+            error = input_error(item["url"], item["text"])
+            if error:
+                yield _ndjson({"index": index, "error": error})
+                continue
+            cache_key = result_cache_key(url=item["url"]) if item["url"] else result_cache_key(text=item["text"])
+            cached = get_cached_result(cache_key)
+            if cached is not None:
+                yield finish(index, item, cached, cache_hit=True)
+            elif item["url"]:
+                fetches[submit_fetch(item["url"])] = (index, item, cache_key)
+            else:
+                yield from queue(index, item, {}, item["text"], cache_key)
+        # Pasted texts don't need fetching, so send them while the downloads run
+        yield from flush()
+        pending = set(fetches)
+        while pending:
+            done, pending = wait(
+                pending, timeout=settings.BATCH_LINGER if ready else None, return_when=FIRST_COMPLETED
+            )
+            for future in done:
+                index, item, cache_key = fetches[future]
+                try:
+                    article = future.result()
+                except Exception as e:
+                    print("AnalyzeBatchView URL fetch error:", e, file=sys.stderr)
+                    yield _ndjson({"index": index, "error": FETCH_ERROR.format(str(e))})
+                    continue
+                if not article["text"]:
+                    yield _ndjson({"index": index, "error": EMPTY_ARTICLE_ERROR})
+                    continue
+                yield from queue(index, item, article, article["text"], cache_key)
+            if len(ready) >= size or not done or not pending:
+                yield from flush()
+    finally:
+        save_history(*rows)
+
+async def _astream_batch(items):
+    """
+    _stream_batch for ASGI, which would buffer a sync iterator whole. The generator runs
+    on its own thread (so it keeps one database connection) and each line is handed to
+    the event loop as soon as it is ready.
+    """
+    loop = asyncio.get_running_loop()
+    lines = asyncio.Queue()
+    stop = threading.Event()
+    done = object()
+
+    def put(item):
+        try:
+            loop.call_soon_threadsafe(lines.put_nowait, item)
+        except RuntimeError:
+            # The event loop is gone; nobody is reading any more
+            stop.set()
+
+    def run():
+        generator = _stream_batch(items)
+        try:
+            for line in generator:
+                put(line)
+                if stop.is_set():
+                    break
+        except Exception as e:
+            print("AnalyzeBatchView stream error:", e, file=sys.stderr)
+            put(_ndjson({"error": f"Batch failed: {str(e)}"}))
+        finally:
+            # Runs _stream_batch's finally, which hands the history rows to the writer
+            generator.close()
+            connections.close_all()
+            put(done)
+
+    threading.Thread(target=run, name="batch-stream", daemon=True).start()
+    try:
+        while (line := await lines.get()) is not done:
+            yield line
+    finally:
+        # The client went away; the thread stops after the item it is working on
+        stop.set()
+
+class AnalyzeBatchView(APIView):
+    """
+    POST {"urls": [...], "texts": [...]} and receive newline-delimited JSON, one line
+    per input as soon as it is analyzed. Each line carries the input's "index" (urls
+    first, then texts) and either the usual analyze fields or an "error".
+    """
+    permission_classes = [AllowAny]
+    def post(self, request):
+        urls = request.data.get("urls") or []
+        texts = request.data.get("texts") or []
+        if not isinstance(urls, list) or not isinstance(texts, list):
+            return Response({"error": "urls and texts must be lists."}, status=400)
+        items = [{"url": str(url or "").strip(), "text": ""} for url in urls]
+        items += [{"url": "", "text": str(text or "").strip()} for text in texts]
+        if not items:
+            return Response({"error": "No input provided. Send a list of urls and/or texts."}, status=400)
+        if len(items) > settings.BATCH_MAX_ITEMS:
+            return Response({"error": f"Too many items. The limit is {settings.BATCH_MAX_ITEMS} per batch."}, status=400)
+        try:
+            ticket = analyze_admission.acquire(len(items))
+        except Overloaded as e:
+            return _overloaded(Response, e)
+        # The batch holds one slot per item (up to the limit) until the stream closes
+        lines = _astream_batch(items) if settings.ASGI_MODE else _stream_batch(items)
+        response = AdmittedStreamingHttpResponse(lines, content_type="application/x-ndjson", ticket=ticket)
+        response["Cache-Control"] = "no-cache"
+        # Stop reverse proxies from buffering the stream
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+def _request_data(request):
+    if request.content_type == "application/json":
+        return json.loads(request.body or b"{}")
+    return request.POST
+
+@csrf_exempt
+async def analyze_async_view(request):
+    """
+    Native async version of AnalyzeView for ASGI deployments. The article fetch,
+    both inference calls and the ORM write are awaited, so slow upstream calls
+    don't hold a worker thread. Request and response format match AnalyzeView.
+    """
+    if request.method != "POST":
+        return JsonResponse({"detail": f'Method "{request.method}" not allowed.'}, status=405)
+    start_time = time.time()
+    try:
+        data = _request_data(request)
+    except ValueError as e:
+        return JsonResponse({"detail": f"JSON parse error - {str(e)}"}, status=400)
+    url = (data.get("url") or "").strip()
+    text = (data.get("text") or "").strip()
+    if _wants_job(request):
+        body, status = await sync_to_async(_enqueue)(url, text)
+        return JsonResponse(body, status=status)
+    timer = StageTimer()
+    try:
+        async with analyze_admission.aadmit():
+            with timer.activate():
+                body, status = await _analyze_async(url, text, start_time, timer)
+    except Overloaded as e:
+        return _overloaded(JsonResponse, e)
+    observe_request(status, body.get("cache_hit"), time.time() - start_time)
+    response = JsonResponse(body, status=status)
+    response["Server-Timing"] = timer.server_timing()
+    return response
+
+async def _analyze_async(url, text, start_time, timer):
+    """Body of analyze_async_view; returns (response body, HTTP status) like pipeline.analyze."""
+    error = input_error(url, text)
+    if error:
+        return {"error": error}, 400
+    cache_key = result_cache_key(url=url) if url else result_cache_key(text=text)
+    with stage("cache"):
+        cached = await aget_cached_result(cache_key)
+    if cached is not None:
+        duration_ms = int((time.time() - start_time) * 1000)
+        with stage("db"):
+            row = history_row(url, text, cached, duration_ms, cache_hit=True, stage_timings=timer.timings())
+            await asave_history(row)
+        return {**cached, "history_id": str(row.public_id), "duration_ms": duration_ms, "cache_hit": True}, 200
+    if url:
+        try:
+            article = await get_text_from_url_async(url)
+        except Exception as e:
+            print("AnalyzeView URL fetch error:", e, file=sys.stderr)
+            return {"error": FETCH_ERROR.format(str(e))}, 400
+        text = article["text"]
+        if not text:
+            return {"error": EMPTY_ARTICLE_ERROR}, 400
+    else:
+        article = {}
+    reused = await anear_duplicate_result(article, text)
+    if reused is not None:
+        await aset_cached_result(cache_key, reused)
+        duration_ms = int((time.time() - start_time) * 1000)
+        with stage("db"):
+            row = history_row(url, text, reused, duration_ms, cache_hit=True, stage_timings=timer.timings())
+            await asave_history(row)
+        return {**reused, "history_id": str(row.public_id), "duration_ms": duration_ms, "cache_hit": True}, 200
+    try:
+        summary, verdict, confidence, details = await run_inference_async(text)
+    except Exception as e:
+        print("AnalyzeView pipeline error:", e, file=sys.stderr)
+        return {"error": f"AI failed: {str(e)}"}, 500
+    result = analysis_result(article, summary, verdict, confidence, details)
+    await aset_cached_result(cache_key, result)
+    await aremember_result(text, result)
+    duration_ms = int((time.time() - start_time) * 1000)
+    with stage("db"):
+        row = history_row(url, text, result, duration_ms, stage_timings=timer.timings())
+        await asave_history(row)
+    return {**result, "history_id": str(row.public_id), "duration_ms": duration_ms, "cache_hit": False}, 200
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+def _metadata_event(result):
+    return _sse("metadata", {
+        "title": result.get("title", ""),
+        "author": result.get("author", ""),
+        "published_date": result.get("published_date", ""),
+    })
+
+def _summary_event(summary):
+    return _sse("summary", {"summary": summary})
+
+def _verdict_event(verdict, confidence, details):
+    return _sse("verdict", {"fake_news_label": verdict, "fake_news_confidence": confidence, "details": details})
+
+def _stored_result_events(url, text, result, start_time, timer):
+    """Remaining events for a result that needed no inference (cached or near-duplicate)."""
+    yield _summary_event(result["summary"])
+    yield _verdict_event(result["fake_news_label"], result["fake_news_confidence"], result["details"])
+    duration_ms = int((time.time() - start_time) * 1000)
+    with timer.activate(), stage("db"):
+        row = history_row(url, text, result, duration_ms, cache_hit=True, stage_timings=timer.timings())
+        save_history(row)
+    yield _sse("done", {**result, "history_id": str(row.public_id), "duration_ms": duration_ms, "cache_hit": True})
+
+async def _astored_result_events(url, text, result, start_time, timer):
+    yield _summary_event(result["summary"])
+    yield _verdict_event(result["fake_news_label"], result["fake_news_confidence"], result["details"])
+    duration_ms = int((time.time() - start_time) * 1000)
+    with timer.activate(), stage("db"):
+        row = history_row(url, text, result, duration_ms, cache_hit=True, stage_timings=timer.timings())
+        await asave_history(row)
+    yield _sse("done", {**result, "history_id": str(row.public_id), "duration_ms": duration_ms, "cache_hit": True})
+
+def _stream_analysis(url, text, start_time):
+    """
+    Yields SSE events for one analysis: "metadata" as soon as the article is fetched,
+    then "summary", then "verdict", then "done" with the full result and duration_ms.
+    A failure ends the stream with an "error" event. History is written as for
+    POST /api/analyze/.
+    """
+    timer = StageTimer()
+    status, cache_hit = 200, False
+    try:
+        error = input_error(url, text)
+        if error:
+            status = 400
+            yield _sse("error", {"error": error})
+            return
+        cache_key = result_cache_key(url=url) if url else result_cache_key(text=text)
+        with timer.activate(), stage("cache"):
+            cached = get_cached_result(cache_key)
+        if cached is not None:
+            cache_hit = True
+            yield _metadata_event(cached)
+            yield from _stored_result_events(url, text, cached, start_time, timer)
+            return
+        if url:
+            try:
+                with timer.activate():
+                    article = get_text_from_url(url)
+            except Exception as e:
+                print("AnalyzeStreamView URL fetch error:", e, file=sys.stderr)
+                status = 400
+                yield _sse("error", {"error": FETCH_ERROR.format(str(e))})
+                return
+            text = article["text"]
+            if not text:
+                status = 400
+                yield _sse("error", {"error": EMPTY_ARTICLE_ERROR})
+                return
+        else:
+            article = {}
+        yield _metadata_event(analysis_result(article, "", "", 0, {}))
+        with timer.activate():
+            reused = near_duplicate_result(article, text)
+        if reused is not None:
+            cache_hit = True
+            set_cached_result(cache_key, reused)
+            yield from _stored_result_events(url, text, reused, start_time, timer)
+            return
+        try:
+            with timer.activate():
+                started, summary_future, verdict_future = start_inference(text)
+                summary, summary_engine = summary_outcome(text, started, summary_future)
+            yield _summary_event(summary)
+            with timer.activate():
+                verdict, confidence, details, classify_engine = verdict_outcome(text, started, verdict_future)
+        except Exception as e:
+            print("AnalyzeStreamView pipeline error:", e, file=sys.stderr)
+            status = 500
+            yield _sse("error", {"error": f"AI failed: {str(e)}"})
+            return
+        details = with_engines(details, summary_engine, classify_engine)
+        yield _verdict_event(verdict, confidence, details)
+        result = analysis_result(article, summary, verdict, confidence, details)
+        set_cached_result(cache_key, result)
+        with timer.activate():
+            remember_result(text, result)
+        duration_ms = int((time.time() - start_time) * 1000)
+        with timer.activate(), stage("db"):
+            row = history_row(url, text, result, duration_ms, stage_timings=timer.timings())
+            save_history(row)
+        yield _sse("done", {**result, "history_id": str(row.public_id), "duration_ms": duration_ms, "cache_hit": False})
+    finally:
+        observe_request(status, cache_hit, time.time() - start_time)
+
+async def _astream_analysis(url, text, start_time):
+    """asyncio version of _stream_analysis for ASGI deployments."""
+    timer = StageTimer()
+    status, cache_hit = 200, False
+    try:
+        error = input_error(url, text)
+        if error:
+            status = 400
+            yield _sse("error", {"error": error})
+            return
+        cache_key = result_cache_key(url=url) if url else result_cache_key(text=text)
+        with timer.activate(), stage("cache"):
+            cached = await aget_cached_result(cache_key)
+        if cached is not None:
+            cache_hit = True
+            yield _metadata_event(cached)
+            async for event in _astored_result_events(url, text, cached, start_time, timer):
+                yield event
+            return
         if url:
             try:
-                article = get_text_from_url(url)
+                with timer.activate():
+                    article = await get_text_from_url_async(url)
             except Exception as e:
-                print("AnalyzeView URL fetch error:", e, file=sys.stderr)
-                return Response(
-                    {"error": f"Failed to fetch article from the provided URL. This site may block bots, or the link is invalid. Error details: {str(e)}"},
-                    status=400
-                )
+                print("AnalyzeStreamView URL fetch error:", e, file=sys.stderr)
+                status = 400
+                yield _sse("error", {"error": FETCH_ERROR.format(str(e))})
+                return
             text = article["text"]
-            title = article.get("title", "")
-            author = article.get("author", "")
-            published_date = article.get("published_date", "")
             if not text:
-                return Response(
-                    {"error": "Could not extract article text from the provided URL. Please check the link or try another article."},
-                    status=400
-                )
-        elif text:
-            title = author = published_date = ""
-            if len(text) < 5:
-                return Response({"error": "Please provide more article text for analysis."}, status=400)
+                status = 400
+                yield _sse("error", {"error": EMPTY_ARTICLE_ERROR})
+                return
         else:
-            return Response({"error": "No input provided. Paste a news article link or text."}, status=400)
+            article = {}
+        yield _metadata_event(analysis_result(article, "", "", 0, {}))
+        with timer.activate():
+            reused = await anear_duplicate_result(article, text)
+        if reused is not None:
+            cache_hit = True
+            await aset_cached_result(cache_key, reused)
+            async for event in _astored_result_events(url, text, reused, start_time, timer):
+                yield event
+            return
+        with timer.activate():
+            started, summary_task, verdict_task = start_inference_async(text)
         try:
-            summary = summarize_text(text)
-            verdict, confidence, details = classify_fake_news_ensemble(text)
+            summary, summary_engine = await asummary_outcome(text, started, summary_task)
+            yield _summary_event(summary)
+            verdict, confidence, details, classify_engine = await averdict_outcome(text, started, verdict_task)
         except Exception as e:
-            print("AnalyzeView pipeline error:", e, file=sys.stderr)
-            return Response({"error": f"AI failed: {str(e)}"}, status=500)
+            verdict_task.cancel()
+            print("AnalyzeStreamView pipeline error:", e, file=sys.stderr)
+            status = 500
+            yield _sse("error", {"error": f"AI failed: {str(e)}"})
+            return
+        details = with_engines(details, summary_engine, classify_engine)
+        yield _verdict_event(verdict, confidence, details)
+        result = analysis_result(article, summary, verdict, confidence, details)
+        await aset_cached_result(cache_key, result)
+        with timer.activate():
+            await aremember_result(text, result)
         duration_ms = int((time.time() - start_time) * 1000)
-        QueryHistory.objects.create(
-            input_type='url' if url else 'text',
-            input_value=url or (text[:100] + "..."),
-            summary=summary,
-            fake_news_label=verdict,
-            fake_news_confidence=confidence,
-            article_title=title,
-            duration_ms=duration_ms,
+        with timer.activate(), stage("db"):
+            row = history_row(url, text, result, duration_ms, stage_timings=timer.timings())
+            await asave_history(row)
+        yield _sse("done", {**result, "history_id": str(row.public_id), "duration_ms": duration_ms, "cache_hit": False})
+    finally:
+        observe_request(status, cache_hit, time.time() - start_time)
+
+def _sse_response(events, ticket):
+    response = AdmittedStreamingHttpResponse(events, content_type="text/event-stream", ticket=ticket)
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+class AnalyzeStreamView(APIView):
+    """
+    Progressive analyze as Server-Sent Events. POST {"url"|"text"} or, for EventSource,
+    GET ?url=... / ?text=... Events: metadata, summary, verdict, done (or error).
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        return self._stream(request.query_params)
+
+    def post(self, request):
+        return self._stream(request.data)
+
+    def _stream(self, data):
+        url = (data.get("url") or "").strip()
+        text = (data.get("text") or "").strip()
+        try:
+            ticket = analyze_admission.acquire()
+        except Overloaded as e:
+            return _overloaded(Response, e)
+        return _sse_response(_stream_analysis(url, text, time.time()), ticket)
+
+@csrf_exempt
+async def analyze_stream_async_view(request):
+    """ASGI version of AnalyzeStreamView; the events are produced by an async generator."""
+    if request.method == "GET":
+        data = request.GET
+    elif request.method == "POST":
+        try:
+            data = _request_data(request)
+        except ValueError as e:
+            return JsonResponse({"detail": f"JSON parse error - {str(e)}"}, status=400)
+    else:
+        return JsonResponse({"detail": f'Method "{request.method}" not allowed.'}, status=405)
+    url = (data.get("url") or "").strip()
+    text = (data.get("text") or "").strip()
+    try:
+        ticket = await analyze_admission.aacquire()
+    except Overloaded as e:
+        return _overloaded(JsonResponse, e)
+    return _sse_response(_astream_analysis(url, text, time.time()), ticket)
+
+def metrics_view(request):
+    """Prometheus text exposition of this process's request, stage and upstream metrics."""
+    return HttpResponse(render_metrics(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def cache_stats_view(request):
+    return Response(cache_stats())
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def stats_view(request):
+    """
+    Dashboard stats from the rollup tables: ?period=day|hour (bucket size, default day),
+    ?since= / ?until= (ISO date or datetime, default the last 30 days).
+    """
+    period = request.query_params.get("period", "day")
+    if period not in PERIODS:
+        return Response({"error": "period must be hour or day."}, status=400)
+    since = request.query_params.get("since")
+    until = request.query_params.get("until")
+    return Response(dashboard_stats(
+        period,
+        since=_parse_bound(since) if since else None,
+        until=_parse_bound(until, end_of_day=True) if until else None,
+    ))
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def accuracy_view(request):
+    """
+    Per-label agreement between the model and user feedback, plus a confusion matrix of
+    predicted label x feedback. ?since= / ?until= (ISO date or datetime) bound the feedback
+    time; ?linked=1 counts only feedback that carries a history_id.
+    """
+    since = request.query_params.get("since")
+    until = request.query_params.get("until")
+    return Response(accuracy_report(
+        since=_parse_bound(since) if since else None,
+        until=_parse_bound(until, end_of_day=True) if until else None,
+        linked_only=request.query_params.get("linked", "").lower() in ("1", "true"),
+    ))
+
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 100
+# Deepest match a page may start at; also keeps ?page= from overflowing SQL OFFSET
+SEARCH_MAX_OFFSET = 10000
+
+def _positive_int(value, default):
+    try:
+        return max(1, int(value))
+    except (TypeError, ValueError):
+        return default
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def history_search_view(request):
+    """
+    Full-text search over history titles and summaries, best match first: ?q= (words,
+    "quoted phrases", -excluded), ?page=, ?page_size= (up to 100). Each result carries its rank.
+    Pages starting past the first SEARCH_MAX_OFFSET matches are refused with a 400.
+    """
+    query = request.query_params.get("q", "").strip()
+    if not query:
+        return Response({"error": "Provide a search query with ?q=."}, status=400)
+    page = _positive_int(request.query_params.get("page"), 1)
+    page_size = min(_positive_int(request.query_params.get("page_size"), SEARCH_PAGE_SIZE), SEARCH_MAX_PAGE_SIZE)
+    offset = (page - 1) * page_size
+    if offset >= SEARCH_MAX_OFFSET:
+        return Response(
+            {"error": f"Only the first {SEARCH_MAX_OFFSET} matches can be paged through; refine the query."},
+            status=400,
         )
-        return Response({
-            "title": title,
-            "author": author,
-            "published_date": published_date,
-            "summary": summary,
-            "fake_news_label": verdict,
-            "fake_news_confidence": confidence,
-            "details": details,
-            "duration_ms": duration_ms,
-        })
+    total, matches = search_history(query, offset, page_size)
+    rows = QueryHistory.objects.in_bulk([row_id for row_id, _ in matches])
+    results = [
+        {**QueryHistorySerializer(rows[row_id]).data, "rank": rank}
+        for row_id, rank in matches if row_id in rows
+    ]
+    url = request.build_absolute_uri()
+    return Response({
+        "count": total,
+        "page": page,
+        "page_size": page_size,
+        "next": replace_query_param(url, "page", page + 1) if page * page_size < total else None,
+        "previous": replace_query_param(url, "page", page - 1) if page > 1 else None,
+        "results": results,
+    })
+
+EXPORT_CONTENT_TYPES = {"json": "application/json", "csv": "text/csv"}
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def export_view(request, table):
+    """
+    Streams every history or feedback row as a JSON array (default) or CSV (?output=csv).
+    Under ASGI the rows are read with an async iterator so the response is not buffered.
+    """
+    output = request.query_params.get("output", "json").lower()
+    if table not in EXPORTS:
+        return Response({"error": "Unknown export."}, status=404)
+    if output not in EXPORT_CONTENT_TYPES:
+        return Response({"error": "output must be json or csv."}, status=400)
+    if settings.ASGI_MODE:
+        rows = aexport_rows(table)
+        lines = acsv_lines(table, rows) if output == "csv" else ajson_lines(rows)
+    else:
+        rows = export_rows(table)
+        lines = csv_lines(table, rows) if output == "csv" else json_lines(rows)
+    response = StreamingHttpResponse(lines, content_type=EXPORT_CONTENT_TYPES[output])
+    response["Content-Disposition"] = f'attachment; filename="{table}.{output}"'
+    response["X-Accel-Buffering"] = "no"
+    return response
 
 @api_view(["POST"])
 @permission_classes([IsAdminUser])
@@ -96,18 +711,67 @@ def change_admin_password(request):
 @api_view(["POST"])
 def feedback_view(request):
     data = request.data
+    history_id = data.get("history_id") or None
+    if history_id:
+        try:
+            history_id = uuid.UUID(str(history_id))
+        except ValueError:
+            return Response({"error": "history_id must be the history_id returned by /api/analyze/."}, status=400)
     Feedback.objects.create(
         title=data.get("title", ""),
         fake_news_label=data.get("fake_news_label", ""),
-        user_feedback=data.get("user_feedback", "")
+        user_feedback=data.get("user_feedback", ""),
+        history_id=history_id,
     )
     return Response({"success": True})
 
+def _parse_bound(value, end_of_day=False):
+    """Parse an ISO date or datetime query parameter; bare dates cover the whole day."""
+    try:
+        day = parse_date(value)
+        parsed = datetime.combine(day, dt_time.max if end_of_day else dt_time.min) if day else parse_datetime(value)
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise ValidationError({"error": f"Invalid date: {value}"})
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
 class AllQueryHistoryView(ListAPIView):
-    queryset = QueryHistory.objects.all().order_by('-created_at')
+    """
+    Admin history list, newest first, paginated by cursor (?cursor=..., ?page_size=...).
+    Filters: ?fake_news_label=, ?input_type=, ?created_after= / ?created_before=
+    (ISO date or datetime, inclusive). ?omit_summary=1 leaves out the summary text.
+    Only user requests are listed unless ?source=ingest asks for feed ingestion rows.
+    """
+    queryset = QueryHistory.objects.all()
     serializer_class = QueryHistorySerializer
+    pagination_class = HistoryCursorPagination
     permission_classes = [IsAdminUser]
 
+    def _omit_summary(self):
+        return self.request.query_params.get("omit_summary", "").lower() in ("1", "true")
+
+    def get_serializer_class(self):
+        return QueryHistoryListSerializer if self._omit_summary() else QueryHistorySerializer
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        params = self.request.query_params
+        queryset = queryset.filter(source="ingest" if params.get("source") == "ingest" else "user")
+        if params.get("fake_news_label"):
+            queryset = queryset.filter(fake_news_label=params["fake_news_label"])
+        if params.get("input_type"):
+            queryset = queryset.filter(input_type=params["input_type"])
+        if params.get("created_after"):
+            queryset = queryset.filter(created_at__gte=_parse_bound(params["created_after"]))
+        if params.get("created_before"):
+            queryset = queryset.filter(created_at__lte=_parse_bound(params["created_before"], end_of_day=True))
+        if self._omit_summary():
+            queryset = queryset.defer("summary")
+        return queryset
+
 class AllFeedbackView(APIView):
     permission_classes = [IsAdminUser]
     def get(self, request):
@@ -118,6 +782,7 @@ class AllFeedbackView(APIView):
                 "fake_news_label": f.fake_news_label,
                 "user_feedback": f.user_feedback,
                 "created_at": f.created_at,
+                "history_id": f.history_id,
             }
             for f in feedbacks
         ]
@@ -0,0 +1,44 @@
+# backend/main/warmup.py
+"""
+Optional pre-warming of the heavy dependencies that the analyze path imports lazily.
+
+PREWARM_IMPORTS="background" imports them on a daemon thread as soon as Django is
+ready. The worker answers requests at once, and the imports are usually done before
+the first analysis arrives. "eager" imports them before ready() returns, which suits
+gunicorn --preload, where forked workers share the loaded pages. Unset (the default)
+leaves every import to first use.
+"""
+import importlib
+import logging
+import threading
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# What the first analysis would otherwise import on the request path
+HEAVY_MODULES = ("newspaper", "numpy", "main.local_engine")
+ASYNC_MODULES = ("httpx",)
+
+def prewarm():
+    """Import the heavy modules now; returns {module: seconds}."""
+    modules = HEAVY_MODULES + (ASYNC_MODULES if settings.ASGI_MODE else ())
+    timings = {}
+    for name in modules:
+        started = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except Exception:
+            logger.exception("Pre-warm import of %s failed", name)
+            continue
+        timings[name] = round(time.perf_counter() - started, 3)
+    logger.info("Pre-warmed imports: %s", timings)
+    return timings
+
+def start_prewarm():
+    """Apply PREWARM_IMPORTS; called from MainConfig.ready()."""
+    if settings.PREWARM_IMPORTS == "eager":
+        prewarm()
+    elif settings.PREWARM_IMPORTS == "background":
+        threading.Thread(target=prewarm, name="prewarm-imports", daemon=True).start()
@@ -3,14 +3,20 @@ ASGI config for news_summarizer project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Run it with an ASGI server, e.g.:
+
+    uvicorn news_summarizer.asgi:application --host 0.0.0.0 --port 8000 --workers 2
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
 
 import os
 
+from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "news_summarizer.settings")
+os.environ.setdefault("DJANGO_ASGI", "True")
 
-application = get_asgi_application()
+application = ASGIStaticFilesHandler(get_asgi_application())
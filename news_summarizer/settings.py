@@ -21,6 +21,14 @@ else:
         "default": {
             "ENGINE": "django.db.backends.sqlite3",
             "NAME": BASE_DIR / "db.sqlite3",
+            # WAL lets readers run alongside the writer; IMMEDIATE transactions and a busy
+            # timeout make concurrent writers wait for the lock instead of failing with
+            # "database is locked"
+            "OPTIONS": {
+                "init_command": "PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL;",
+                "transaction_mode": "IMMEDIATE",
+                "timeout": int(os.environ.get("SQLITE_BUSY_TIMEOUT", 20)),
+            },
         }
     }
 
@@ -54,6 +62,13 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# ASGI_MODE is switched on by news_summarizer/asgi.py. WhiteNoise is sync-only and
+# would push every request through a thread, so under ASGI static files are served
+# by asgi.py instead and /api/analyze/ is routed to the native async view.
+ASGI_MODE = os.environ.get("DJANGO_ASGI", "False") == "True"
+if ASGI_MODE:
+    MIDDLEWARE.remove("whitenoise.middleware.WhiteNoiseMiddleware")
+
 CORS_ALLOW_ALL_ORIGINS = False
 CORS_ALLOWED_ORIGINS = [
     "https://news-summarizer-ai.onrender.com",
@@ -116,4 +131,196 @@ CELERY_BROKER_URL = os.environ.get("CELERY_BROKER_URL", "redis://localhost:6379/
 CELERY_RESULT_BACKEND = os.environ.get("CELERY_RESULT_BACKEND", "django-db")
 CELERY_ACCEPT_CONTENT = ["json"]
 CELERY_TASK_SERIALIZER = "json"
-CELERY_RESULT_SERIALIZER = "json"
\ No newline at end of file
+CELERY_RESULT_SERIALIZER = "json"
+# Report STARTED so job polling can tell queued work from running work
+CELERY_TASK_TRACK_STARTED = True
+# How long an in-flight job ID is reused for identical inputs. The web process and the
+# worker only share the in-flight keys through CACHE_URL; without it a key is dropped
+# once its job's result says it finished.
+JOB_DEDUP_TTL = int(os.environ.get("JOB_DEDUP_TTL", 10 * 60))
+
+# Feed ingestion
+# INGEST_FEEDS is a comma-separated list of RSS/Atom feeds (or site pages that link to
+# one). Celery beat polls them every INGEST_INTERVAL seconds with conditional GET and
+# pre-analyzes up to INGEST_MAX_PER_FEED new articles per feed, INGEST_CONCURRENCY at a time.
+# The web processes only see those results through a shared CACHE_URL.
+INGEST_FEEDS = [feed.strip() for feed in os.environ.get("INGEST_FEEDS", "").split(",") if feed.strip()]
+INGEST_INTERVAL = int(os.environ.get("INGEST_INTERVAL", 15 * 60))
+INGEST_MAX_PER_FEED = int(os.environ.get("INGEST_MAX_PER_FEED", 20))
+INGEST_CONCURRENCY = int(os.environ.get("INGEST_CONCURRENCY", 4))
+INGEST_FEED_TIMEOUT = float(os.environ.get("INGEST_FEED_TIMEOUT", 15))
+CELERY_BEAT_SCHEDULE = {}
+if INGEST_FEEDS:
+    CELERY_BEAT_SCHEDULE["ingest-feeds"] = {"task": "main.tasks.ingest_feeds_task", "schedule": INGEST_INTERVAL}
+
+# Cache settings
+# Set CACHE_URL to a redis:// URL to share cached results between workers; the
+# Redis server should run with an allkeys-lru maxmemory policy so it evicts the
+# same way the local-memory fallback does.
+CACHE_URL = os.environ.get("CACHE_URL", "")
+ANALYZE_CACHE_TTL = int(os.environ.get("ANALYZE_CACHE_TTL", 6 * 60 * 60))
+ANALYZE_CACHE_MAX_ENTRIES = int(os.environ.get("ANALYZE_CACHE_MAX_ENTRIES", 1000))
+
+# Article fetch cache
+# Downloaded pages and their extracted fields are kept for ARTICLE_CACHE_TTL. Within
+# ARTICLE_CACHE_FRESH_SECONDS they are reused as-is; after that the page is revalidated
+# with If-None-Match / If-Modified-Since and only re-parsed when it changed.
+ARTICLE_CACHE_DIR = os.environ.get("ARTICLE_CACHE_DIR", os.path.join(BASE_DIR, ".article_cache"))
+ARTICLE_CACHE_TTL = int(os.environ.get("ARTICLE_CACHE_TTL", 7 * 24 * 60 * 60))
+ARTICLE_CACHE_FRESH_SECONDS = int(os.environ.get("ARTICLE_CACHE_FRESH_SECONDS", 10 * 60))
+ARTICLE_CACHE_MAX_ENTRIES = int(os.environ.get("ARTICLE_CACHE_MAX_ENTRIES", 5000))
+# "fast" skips newspaper3k's image downloads; "full" keeps its default behaviour
+ARTICLE_EXTRACTION_MODE = os.environ.get("ARTICLE_EXTRACTION_MODE", "fast")
+ARTICLE_FETCH_DEADLINE = float(os.environ.get("ARTICLE_FETCH_DEADLINE", 15))
+ARTICLE_MAX_BYTES = int(os.environ.get("ARTICLE_MAX_BYTES", 2 * 1024 * 1024))
+
+if CACHE_URL.startswith("redis"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": CACHE_URL,
+        },
+        "analyze": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": CACHE_URL,
+            "TIMEOUT": ANALYZE_CACHE_TTL,
+            "KEY_PREFIX": "analyze",
+        },
+        "articles": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": CACHE_URL,
+            "TIMEOUT": ARTICLE_CACHE_TTL,
+            "KEY_PREFIX": "articles",
+        },
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "default",
+        },
+        "analyze": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "analyze",
+            "TIMEOUT": ANALYZE_CACHE_TTL,
+            "OPTIONS": {
+                "MAX_ENTRIES": ANALYZE_CACHE_MAX_ENTRIES,
+                # Evict a single least-recently-used entry when full
+                "CULL_FREQUENCY": ANALYZE_CACHE_MAX_ENTRIES,
+            },
+        },
+        # On disk so fetched pages survive restarts and are shared by local workers
+        "articles": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": ARTICLE_CACHE_DIR,
+            "TIMEOUT": ARTICLE_CACHE_TTL,
+            "OPTIONS": {"MAX_ENTRIES": ARTICLE_CACHE_MAX_ENTRIES},
+        },
+    }
+
+# Near-duplicate reuse
+# Articles whose MinHash similarity to an earlier analysis (at most NEAR_DUPLICATE_MAX_AGE
+# seconds old) reaches NEAR_DUPLICATE_THRESHOLD reuse its summary and verdict. Texts
+# under NEAR_DUPLICATE_MIN_WORDS words are always analyzed afresh.
+NEAR_DUPLICATE_DETECTION = os.environ.get("NEAR_DUPLICATE_DETECTION", "True") == "True"
+NEAR_DUPLICATE_THRESHOLD = float(os.environ.get("NEAR_DUPLICATE_THRESHOLD", 0.9))
+NEAR_DUPLICATE_MIN_WORDS = int(os.environ.get("NEAR_DUPLICATE_MIN_WORDS", 100))
+NEAR_DUPLICATE_MAX_AGE = int(os.environ.get("NEAR_DUPLICATE_MAX_AGE", 7 * 24 * 60 * 60))
+
+# QueryHistory write settings
+# "buffered" (default) queues rows in-process and writes them with bulk_create every
+# HISTORY_FLUSH_SIZE rows or HISTORY_FLUSH_INTERVAL seconds; "sync" writes on the request
+# path; "celery" sends each flushed batch to a worker. Rows get created_at when written.
+HISTORY_WRITE_MODE = os.environ.get("HISTORY_WRITE_MODE", "buffered")
+HISTORY_FLUSH_SIZE = int(os.environ.get("HISTORY_FLUSH_SIZE", 50))
+HISTORY_FLUSH_INTERVAL = float(os.environ.get("HISTORY_FLUSH_INTERVAL", 1.0))
+HISTORY_BUFFER_MAX = int(os.environ.get("HISTORY_BUFFER_MAX", 10000))
+# After HISTORY_FLUSH_RETRIES failed flushes in a row, rows are written one at a time and
+# any the database rejects (e.g. an over-long title) are logged and dropped
+HISTORY_FLUSH_RETRIES = int(os.environ.get("HISTORY_FLUSH_RETRIES", 3))
+
+# History retention
+# With HISTORY_RETENTION_DAYS > 0, Celery beat moves QueryHistory rows older than that many
+# whole UTC days into one gzipped JSONL file per day under ARCHIVE_DIR every ARCHIVE_INTERVAL
+# seconds, ARCHIVE_BATCH_SIZE rows per delete, and drops near-duplicate fingerprints older than
+# NEAR_DUPLICATE_MAX_AGE. Point ARCHIVE_DIR at persistent storage. 0 keeps everything.
+HISTORY_RETENTION_DAYS = int(os.environ.get("HISTORY_RETENTION_DAYS", 0))
+ARCHIVE_DIR = os.environ.get("ARCHIVE_DIR", os.path.join(BASE_DIR, "history_archive"))
+ARCHIVE_BATCH_SIZE = int(os.environ.get("ARCHIVE_BATCH_SIZE", 1000))
+ARCHIVE_INTERVAL = int(os.environ.get("ARCHIVE_INTERVAL", 24 * 60 * 60))
+if HISTORY_RETENTION_DAYS > 0:
+    CELERY_BEAT_SCHEDULE["archive-history"] = {"task": "main.tasks.archive_history_task", "schedule": ARCHIVE_INTERVAL}
+
+# Startup
+# newspaper3k, numpy and httpx are imported on first use. PREWARM_IMPORTS="background"
+# loads them on a thread right after startup, "eager" before the worker starts serving.
+PREWARM_IMPORTS = os.environ.get("PREWARM_IMPORTS", "")
+
+# Admission control
+# At most ANALYZE_MAX_CONCURRENT analyses run per process and ANALYZE_MAX_QUEUED more
+# wait up to ANALYZE_QUEUE_TIMEOUT seconds; the rest get 503 with Retry-After. Keep the
+# server's threads per process above the sum of the first two so cheap endpoints stay up.
+ANALYZE_MAX_CONCURRENT = int(os.environ.get("ANALYZE_MAX_CONCURRENT", 4))
+ANALYZE_MAX_QUEUED = int(os.environ.get("ANALYZE_MAX_QUEUED", 4))
+ANALYZE_QUEUE_TIMEOUT = float(os.environ.get("ANALYZE_QUEUE_TIMEOUT", 10))
+ANALYZE_RETRY_AFTER = int(os.environ.get("ANALYZE_RETRY_AFTER", 5))
+
+# Analyze pipeline settings
+# Summarization and classification run side by side on a bounded thread pool;
+# each stage gets its own timeout measured from the start of inference.
+PIPELINE_MAX_WORKERS = int(os.environ.get("PIPELINE_MAX_WORKERS", 8))
+SUMMARY_STAGE_TIMEOUT = float(os.environ.get("SUMMARY_STAGE_TIMEOUT", 35))
+CLASSIFY_STAGE_TIMEOUT = float(os.environ.get("CLASSIFY_STAGE_TIMEOUT", 35))
+
+# Inference backend: "remote" (HuggingFace), "local" (in-process TextRank summary and
+# lexicon classifier, no network) or "fallback" (remote, local when remote fails).
+INFERENCE_BACKEND = os.environ.get("INFERENCE_BACKEND", "remote")
+LOCAL_SUMMARY_SENTENCES = int(os.environ.get("LOCAL_SUMMARY_SENTENCES", 3))
+
+# Long-document summarization
+# Articles over 1024 characters are split on sentence boundaries into chunks of
+# SUMMARY_CHUNK_CHARS, summarized SUMMARY_MAP_CONCURRENCY at a time, and the partial
+# summaries are summarized again. SUMMARY_MAX_CALLS caps upstream calls per article.
+SUMMARY_LONG_DOCUMENTS = os.environ.get("SUMMARY_LONG_DOCUMENTS", "True") == "True"
+SUMMARY_CHUNK_CHARS = int(os.environ.get("SUMMARY_CHUNK_CHARS", 3000))
+SUMMARY_MAX_CALLS = int(os.environ.get("SUMMARY_MAX_CALLS", 8))
+SUMMARY_MAP_CONCURRENCY = int(os.environ.get("SUMMARY_MAP_CONCURRENCY", 4))
+SUMMARY_MAP_MAX_TOKENS = int(os.environ.get("SUMMARY_MAP_MAX_TOKENS", 80))
+
+# Batch analyze settings
+# Texts are grouped into multi-input HuggingFace calls of up to BATCH_INFERENCE_SIZE;
+# a partial group is sent once no new article has arrived for BATCH_LINGER seconds.
+BATCH_MAX_ITEMS = int(os.environ.get("BATCH_MAX_ITEMS", 500))
+BATCH_INFERENCE_SIZE = int(os.environ.get("BATCH_INFERENCE_SIZE", 8))
+BATCH_FETCH_WORKERS = int(os.environ.get("BATCH_FETCH_WORKERS", 8))
+BATCH_LINGER = float(os.environ.get("BATCH_LINGER", 0.5))
+
+# HuggingFace inference client settings
+# One keep-alive session per process; retries on 429/5xx and "model loading"
+# honour Retry-After / estimated_time but never run past HF_REQUEST_DEADLINE.
+HF_API_BASE = os.environ.get("HF_API_BASE", "https://api-inference.huggingface.co/models")
+HF_POOL_SIZE = int(os.environ.get("HF_POOL_SIZE", 10))
+HF_MAX_RETRIES = int(os.environ.get("HF_MAX_RETRIES", 3))
+HF_REQUEST_DEADLINE = float(os.environ.get("HF_REQUEST_DEADLINE", 30))
+HF_RETRY_BACKOFF = float(os.environ.get("HF_RETRY_BACKOFF", 0.5))
+# Requests per second per model, shared by all workers through the default cache (so set
+# CACHE_URL when running several processes). 0 disables the limit. HF_RATE_LIMITS sets
+# per-model overrides, e.g. "facebook/bart-large-cnn=4,facebook/bart-large-mnli=8".
+# Fractional rates work (0.5 is one call every two seconds). HF_RATE_BURST is the token
+# bucket size: how many calls may go out back to back before they are spaced out.
+HF_RATE_LIMIT_RPS = float(os.environ.get("HF_RATE_LIMIT_RPS", 0))
+HF_RATE_BURST = float(os.environ.get("HF_RATE_BURST", 1))
+HF_RATE_LIMITS = {
+    model.strip(): float(rate)
+    for model, _, rate in (
+        item.partition("=") for item in os.environ.get("HF_RATE_LIMITS", "").split(",") if "=" in item
+    )
+}
+# A model's circuit opens after HF_BREAKER_FAILURES consecutive timeouts/5xx and calls fail
+# fast for HF_BREAKER_RESET seconds before a trial call. "Model loading" answers are
+# remembered for their estimated_time, at most HF_LOADING_CACHE_MAX seconds.
+HF_BREAKER_FAILURES = int(os.environ.get("HF_BREAKER_FAILURES", 5))
+HF_BREAKER_RESET = float(os.environ.get("HF_BREAKER_RESET", 30))
+HF_LOADING_CACHE_MAX = float(os.environ.get("HF_LOADING_CACHE_MAX", 60))
+# Identical concurrent calls within a process share one upstream request
+HF_COALESCE_CALLS = os.environ.get("HF_COALESCE_CALLS", "True") == "True"